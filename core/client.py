@@ -1,8 +1,13 @@
 import asyncio
 import socket
+import time
 from astrbot.api import logger
 from pixivpy3 import ByPassSniApi, PixivError, AppPixivAPI
 
+from ..utils.database import cache_illusts_from_response
+from ..utils.ranking_store import RankingStore
+from ..utils.records import slim_api_response
+
 
 class PixivClientWrapper:
     """Pixiv API 客户端包装器，处理认证和定期刷新 Token"""
@@ -10,6 +15,12 @@ class PixivClientWrapper:
     def __init__(self, pixiv_config):
         self.pixiv_config = pixiv_config
         self._refresh_task: asyncio.Task | None = None
+        # 全局 API 限速：下一个可用的请求时间点（time.monotonic）
+        self._next_api_slot = 0.0
+        # 后台写入作品元数据缓存的任务，持有引用防止任务被提前回收
+        self._cache_tasks: set[asyncio.Task] = set()
+        # 排行榜缓存，供排行榜命令与随机排行榜推送共享
+        self.ranking_store = RankingStore(self)
 
         # 根据是否配置代理选择不同的 API 客户端
         if pixiv_config.proxy:
@@ -194,6 +205,33 @@ class PixivClientWrapper:
         except Exception as e:
             logger.error(f"等待 Pixiv Token 刷新任务取消时发生错误: {e}")
 
+    async def wait_for_rate_limit(self) -> None:
+        """按 api_request_interval_ms 为本次请求预约一个时间槽，并等待到该时间点"""
+        interval = max(0, getattr(self.pixiv_config, "api_request_interval_ms", 0))
+        if interval <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_api_slot)
+        self._next_api_slot = slot + interval / 1000
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
     async def call_pixiv_api(self, func, *args, **kwargs):
-        """异步调用 Pixiv API 的辅助方法"""
-        return await asyncio.to_thread(func, *args, **kwargs)
+        """异步调用 Pixiv API 的辅助方法，并顺带将返回的作品写入本地元数据缓存"""
+        await self.wait_for_rate_limit()
+        result = await asyncio.to_thread(func, *args, **kwargs)
+        # 列表结果投影为精简记录，避免完整的 JsonDict 在深度搜索期间长时间驻留内存
+        result = slim_api_response(result)
+        if getattr(self.pixiv_config, "illust_cache_enabled", False):
+            # 缓存写入不影响本次结果，放到后台执行，不占用 API 调用的返回时间
+            task = asyncio.create_task(
+                asyncio.to_thread(cache_illusts_from_response, result)
+            )
+            self._cache_tasks.add(task)
+            task.add_done_callback(self._cache_tasks.discard)
+        return result
+
+    async def flush_cache_writes(self) -> None:
+        """等待进行中的元数据缓存写入完成（插件停用时调用）"""
+        if self._cache_tasks:
+            await asyncio.gather(*self._cache_tasks, return_exceptions=True)
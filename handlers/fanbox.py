@@ -14,6 +14,7 @@ from ..utils.pixiv_utils import (
     download_image,
     _build_image_from_bytes,
     _build_image_from_url,
+    release_message_files,
 )
 
 
@@ -234,6 +235,8 @@ class FanboxHandler:
             else:
                 # 纯图片模式：仅发送图片组件，不附加文本
                 yield event.chain_result([*image_components])
+            # 发送完成后释放 file 发送方式写入的临时文件
+            release_message_files(image_components)
             return
 
         yield event.plain_result(message_tail)
@@ -4,16 +4,28 @@ from astrbot.api import logger
 
 from ..utils.tag import (
     build_detail_message,
+    CompiledFilter,
     FilterConfig,
     validate_and_process_tags,
     process_and_send_illusts,
     filter_illusts_with_reason,
-    process_and_send_illusts_sorted,
+    process_and_send_top_illusts,
+    TopKCollector,
 )
-from ..utils.pixiv_utils import send_pixiv_image, send_forward_message
+from ..utils.pixiv_utils import (
+    send_pixiv_image,
+    send_forward_message,
+    remember_results,
+    get_recent_result,
+)
+from ..utils.database import search_illust_metadata
+from ..utils.ranking_store import RANKING_PAGE_SIZE
 
 from ..utils.help import get_help_message
 
+# AND 搜索收集到 return_count 的该倍数个可发送作品后停止翻页
+AND_SEARCH_MATCH_FACTOR = 3
+
 
 class IllustHandler:
     def __init__(self, client_wrapper, pixiv_config):
@@ -67,13 +79,27 @@ class IllustHandler:
             f"Pixiv 插件：正在搜索标签 - {search_tags}，排除标签 - {exclude_tags}"
         )
         try:
-            # 包装同步搜索调用
-            search_result = await self.client_wrapper.call_pixiv_api(
-                self.client.search_illust,
-                search_tags,
-                search_target="partial_match_for_tags",
-            )
-            initial_illusts = search_result.illusts if search_result.illusts else []
+            # 包装同步搜索调用，API 出错或超时时回退到本地作品缓存
+            try:
+                search_result = await self._call_with_fallback_timeout(
+                    self.client.search_illust,
+                    search_tags,
+                    search_target="partial_match_for_tags",
+                )
+                initial_illusts = search_result.illusts if search_result.illusts else []
+            except Exception as api_e:
+                if not self.pixiv_config.illust_cache_enabled:
+                    raise
+                logger.warning(
+                    f"Pixiv 插件：搜索 API 调用失败或超时，尝试使用本地缓存 - {type(api_e).__name__}: {api_e}"
+                )
+                initial_illusts = await asyncio.to_thread(
+                    search_illust_metadata, tag_result["include_tags"]
+                )
+                if initial_illusts:
+                    yield event.plain_result(
+                        f"Pixiv API 暂时不可用，以下结果来自本地缓存（{len(initial_illusts)} 个作品）。"
+                    )
 
             if not initial_illusts:
                 yield event.plain_result("未找到相关插画。")
@@ -108,6 +134,14 @@ class IllustHandler:
             logger.error(f"Pixiv 插件：搜索插画时发生错误 - {e}")
             yield event.plain_result(f"搜索插画时发生错误: {str(e)}")
 
+    async def _call_with_fallback_timeout(self, func, *args, **kwargs):
+        """调用 Pixiv API，超过 illust_cache_fallback_timeout 秒时抛出超时以便回退本地缓存"""
+        timeout = self.pixiv_config.illust_cache_fallback_timeout
+        call = self.client_wrapper.call_pixiv_api(func, *args, **kwargs)
+        if self.pixiv_config.illust_cache_enabled and timeout and timeout > 0:
+            return await asyncio.wait_for(call, timeout=timeout)
+        return await call
+
     async def pixiv_illust_new(
         self,
         event: AstrMessageEvent,
@@ -287,28 +321,70 @@ class IllustHandler:
         # 获取翻页深度配置
         deepth = self.pixiv_config.deep_search_depth
 
-        # 处理标签：分离第一个标签和其他标签
-        first_tag = include_tags[0]
+        # 查询计划：Pixiv 搜索会对空格分隔的多个词取交集，组合查询的结果集是任一单标签
+        # 结果集的子集，因此总是选择度最高的驱动查询；第一个标签仍由 API 部分匹配保证，
+        # 其余标签在本地做精确匹配，与逐页爬取单个标签再过滤的结果一致
+        first_tag_lower = include_tags[0].lower()
         other_tags = include_tags[1:]
+        driver_query = " ".join(include_tags)
+        required_other_tags_lower = {tag.lower() for tag in other_tags}
+        # 收集到足够多的可发送作品后提前停止翻页，保留一定随机选择余地
+        target_matches = (
+            max(1, self.pixiv_config.return_count) * AND_SEARCH_MATCH_FACTOR
+        )
+        config = FilterConfig(
+            r18_mode=self.pixiv_config.r18_mode,
+            ai_filter_mode=self.pixiv_config.ai_filter_mode,
+            display_tag_str=display_tag_str,
+            return_count=self.pixiv_config.return_count,
+            logger=logger,
+            show_filter_result=self.pixiv_config.show_filter_result,
+            excluded_tags=exclude_tags or [],
+            forward_threshold=self.pixiv_config.forward_threshold,
+            show_details=self.pixiv_config.show_details,
+        )
+        match_filter = CompiledFilter(config)
+
+        def is_and_match(illust) -> bool:
+            illust_tags_lower = {tag.name.lower() for tag in illust.tags}
+            return required_other_tags_lower.issubset(illust_tags_lower)
+
+        # 本地作品缓存中已有的匹配作品计入目标数量，进一步减少翻页；
+        # 缓存检索也会命中标题，这里补充校验第一个标签的部分匹配
+        cached_illusts = []
+        if self.pixiv_config.illust_cache_enabled:
+            cached_illusts = await asyncio.to_thread(
+                search_illust_metadata, include_tags
+            )
+        and_filtered_illusts = [
+            i
+            for i in cached_illusts
+            if is_and_match(i)
+            and any(first_tag_lower in tag.name.lower() for tag in i.tags)
+        ]
+        seen_ids = {i.id for i in and_filtered_illusts}
+        sendable_count = sum(1 for i in and_filtered_illusts if match_filter(i))
 
         logger.info(
-            f"Pixiv 插件：正在进行 AND 深度搜索。策略：先用标签 '{first_tag}' 深度搜索 (翻页深度: {deepth})，然后本地过滤要求同时包含: {','.join(include_tags)}，排除标签: {exclude_tags}"
+            f"Pixiv 插件：正在进行 AND 深度搜索。策略：组合查询 '{driver_query}' (翻页深度: {deepth}，"
+            f"目标 {target_matches} 个可发送作品，本地缓存命中 {sendable_count} 个)，"
+            f"本地要求同时包含: {','.join(include_tags)}，排除标签: {exclude_tags}"
         )
 
         # 搜索前发送提示消息
-        search_phase_msg = f"正在深度搜索与标签「{first_tag}」相关的作品"
+        search_phase_msg = f"正在以组合查询「{driver_query}」深度搜索作品"
         filter_phase_msg = (
             f"稍后将筛选出同时包含「{','.join(include_tags)}」所有标签的结果。"
         )
         page_limit_msg = (
-            f"将获取 {deepth} 页结果" if deepth != -1 else "将获取所有页面的结果"
+            f"最多获取 {deepth} 页结果" if deepth != -1 else "最多获取所有页面的结果"
         )
         yield event.plain_result(
-            f"{search_phase_msg}，{filter_phase_msg} {page_limit_msg}，这可能需要一些时间..."
+            f"{search_phase_msg}，{filter_phase_msg} {page_limit_msg}，找到足够作品后会提前结束..."
         )
 
         try:
-            all_illusts_from_first_tag = []
+            fetched_count = 0
             page_count = 0
             next_params = {}
 
@@ -316,20 +392,20 @@ class IllustHandler:
                 current_page_num = page_count + 1
                 try:
                     if page_count == 0:
-                        # 第一次搜索: 传入标签和搜索目标
+                        # 第一次搜索: 传入组合查询和搜索目标
                         logger.debug(
-                            f"Pixiv API Call (Page 1): search_illust(word='{first_tag}', search_target='partial_match_for_tags')"
+                            f"Pixiv API Call (Page 1): search_illust(word='{driver_query}', search_target='partial_match_for_tags')"
                         )
                         json_result = await self.client_wrapper.call_pixiv_api(
                             self.client.search_illust,
-                            first_tag,
+                            driver_query,
                             search_target="partial_match_for_tags",
                         )
                     else:
                         # 后续翻页: 使用从 next_url 解析出的参数再次调用 search_illust
                         if not next_params:
                             logger.warning(
-                                f"Pixiv 插件：尝试为 '{first_tag}' 翻页至第 {current_page_num} 页，但 next_params 为空，中止翻页。"
+                                f"Pixiv 插件：尝试为 '{driver_query}' 翻页至第 {current_page_num} 页，但 next_params 为空，中止翻页。"
                             )
                             break
                         logger.debug(
@@ -345,20 +421,32 @@ class IllustHandler:
                             f"Pixiv API 返回错误 (页码 {current_page_num}): {json_result.error}"
                         )
                         yield event.plain_result(
-                            f"搜索 '{first_tag}' 的第 {current_page_num} 页时 API 返回错误: {json_result.error.get('message', '未知错误')}"
+                            f"搜索 '{driver_query}' 的第 {current_page_num} 页时 API 返回错误: {json_result.error.get('message', '未知错误')}"
                         )
                         break
 
-                    # 处理有效结果
-                    if json_result.illusts:
-                        logger.info(
-                            f"Pixiv 插件：AND 搜索 (阶段1: '{first_tag}') 第 {current_page_num} 页找到 {len(json_result.illusts)} 个插画。"
-                        )
-                        all_illusts_from_first_tag.extend(json_result.illusts)
-                    else:
+                    # 处理有效结果：逐页做本地 AND 过滤，只保留匹配的作品
+                    page_illusts = json_result.illusts or []
+                    fetched_count += len(page_illusts)
+                    page_matches = 0
+                    for illust in page_illusts:
+                        if illust.id in seen_ids or not is_and_match(illust):
+                            continue
+                        seen_ids.add(illust.id)
+                        and_filtered_illusts.append(illust)
+                        page_matches += 1
+                        if match_filter(illust):
+                            sendable_count += 1
+                    logger.info(
+                        f"Pixiv 插件：AND 搜索 ('{driver_query}') 第 {current_page_num} 页找到 {len(page_illusts)} 个插画，"
+                        f"其中 {page_matches} 个同时包含所有标签。"
+                    )
+
+                    if sendable_count >= target_matches:
                         logger.info(
-                            f"Pixiv 插件：AND 搜索 (阶段1: '{first_tag}') 第 {current_page_num} 页没有找到插画。"
+                            f"Pixiv 插件：AND 搜索已收集到 {sendable_count} 个可发送作品，提前结束翻页。"
                         )
+                        break
 
                     # 获取下一页参数
                     if hasattr(json_result, "next_url") and json_result.next_url:
@@ -366,17 +454,17 @@ class IllustHandler:
                         page_count += 1
                     else:
                         logger.info(
-                            f"Pixiv 插件：AND 搜索 (阶段1: '{first_tag}') 在第 {current_page_num} 页后没有获取到下一页链接或达到深度限制，API 搜索结束。"
+                            f"Pixiv 插件：AND 搜索 ('{driver_query}') 在第 {current_page_num} 页后没有获取到下一页链接或达到深度限制，API 搜索结束。"
                         )
                         break
 
                 except Exception as api_e:
                     # 捕获更具体的 API 调用异常或属性访问异常
                     logger.error(
-                        f"Pixiv 插件：调用 search_illust API 时出错 (基于 '{first_tag}', 页码 {current_page_num}) - {type(api_e).__name__}: {api_e}"
+                        f"Pixiv 插件：调用 search_illust API 时出错 (基于 '{driver_query}', 页码 {current_page_num}) - {type(api_e).__name__}: {api_e}"
                     )
                     yield event.plain_result(
-                        f"搜索 '{first_tag}' 的第 {current_page_num} 页时遇到 API 错误，搜索中止。"
+                        f"搜索 '{driver_query}' 的第 {current_page_num} 页时遇到 API 错误，搜索中止。"
                     )
                     import traceback
 
@@ -384,37 +472,15 @@ class IllustHandler:
                     break
 
             logger.info(
-                f"Pixiv 插件：AND 搜索 (阶段1: '{first_tag}') 完成，共获取 {len(all_illusts_from_first_tag)} 个插画，现在开始本地 AND 过滤..."
+                f"Pixiv 插件：AND 搜索 ('{driver_query}') 完成，共获取 {fetched_count} 个插画。"
             )
 
-            # 本地 AND 过滤
-            and_filtered_illusts = []
-            if all_illusts_from_first_tag:
-                required_other_tags_lower = {tag.lower() for tag in other_tags}
-                for illust in all_illusts_from_first_tag:
-                    illust_tags_lower = {tag.name.lower() for tag in illust.tags}
-                    # 检查是否包含所有其他必需标签 (第一个标签已通过 API 搜索保证存在)
-                    if required_other_tags_lower.issubset(illust_tags_lower):
-                        and_filtered_illusts.append(illust)
-
             initial_count = len(and_filtered_illusts)
             logger.info(
                 f"Pixiv 插件：本地 AND 过滤完成，找到 {initial_count} 个同时包含「{','.join(include_tags)}」所有标签的作品。"
             )
 
             # 使用统一的作品处理和发送函数
-            config = FilterConfig(
-                r18_mode=self.pixiv_config.r18_mode,
-                ai_filter_mode=self.pixiv_config.ai_filter_mode,
-                display_tag_str=display_tag_str,
-                return_count=self.pixiv_config.return_count,
-                logger=logger,
-                show_filter_result=self.pixiv_config.show_filter_result,
-                excluded_tags=exclude_tags or [],
-                forward_threshold=self.pixiv_config.forward_threshold,
-                show_details=self.pixiv_config.show_details,
-            )
-
             async for result in process_and_send_illusts(
                 and_filtered_illusts,  # 传入所有过滤后的作品，让process_and_send_illusts内部处理选择
                 config,
@@ -488,6 +554,9 @@ class IllustHandler:
             if not filtered_illusts:
                 return
 
+            # 记为本会话的最近结果，之后可用 /pixiv_original 1 [页码] 获取原图
+            remember_results(event, filtered_illusts)
+
             # 根据转发消息设置决定发送方式
             if self.pixiv_config.forward_threshold:
                 # 启用转发时使用转发消息发送
@@ -519,6 +588,49 @@ class IllustHandler:
 
             logger.error(traceback.format_exc())
 
+    async def pixiv_original(self, event: AstrMessageEvent, args: str = ""):
+        """按编号发送本会话最近一次结果中作品的原图"""
+        parts = args.split()
+        if len(parts) > 2 or not all(part.isdigit() for part in parts):
+            yield event.plain_result(
+                "用法: /pixiv_original <编号> [页码]，编号为最近一次结果中的序号。"
+            )
+            return
+        index = int(parts[0]) if parts else 1
+        page = int(parts[1]) if len(parts) > 1 else None
+
+        illust, total = get_recent_result(event, index)
+        if total == 0:
+            yield event.plain_result("本会话没有可用的最近结果，请先搜索作品。")
+            return
+        if illust is None:
+            yield event.plain_result(f"编号超出范围，最近一次结果共 {total} 个作品。")
+            return
+
+        page_count = illust.page_count or 1
+        if page is not None and not 1 <= page <= page_count:
+            yield event.plain_result(f"页码超出范围，该作品共 {page_count} 页。")
+            return
+
+        logger.info(
+            f"Pixiv 插件：发送最近结果第 {index} 个作品的原图 - ID: {illust.id}"
+            + (f"，第 {page} 页" if page else "")
+        )
+        try:
+            async for result in send_pixiv_image(
+                self.client,
+                event,
+                illust,
+                build_detail_message(illust, is_novel=False),
+                show_details=self.pixiv_config.show_details,
+                page=page,
+                original=True,
+            ):
+                yield result
+        except Exception as e:
+            logger.error(f"Pixiv 插件：发送原图时发生错误 - {e}")
+            yield event.plain_result(f"发送原图时发生错误: {str(e)}")
+
     async def pixiv_ranking(self, event: AstrMessageEvent, args: str = ""):
         """获取 Pixiv 排行榜作品"""
         args_list = args.strip().split() if args.strip() else []
@@ -588,11 +700,10 @@ class IllustHandler:
             return
 
         try:
-            # 调用 Pixiv API 获取排行榜
-            ranking_result = await self.client_wrapper.call_pixiv_api(
-                self.client.illust_ranking, mode=mode, date=date
+            # 优先读取排行榜缓存，同一排行榜每个更新周期只请求一次 API
+            initial_illusts = await self.client_wrapper.ranking_store.get_ranking(
+                mode, date, depth=RANKING_PAGE_SIZE
             )
-            initial_illusts = ranking_result.illusts if ranking_result.illusts else []
 
             if not initial_illusts:
                 yield event.plain_result(f"未能获取到 {date} 的 {mode} 排行榜数据。")
@@ -1332,7 +1443,19 @@ class IllustHandler:
         )
 
         try:
-            all_illusts = []
+            # 逐页过滤并只保留收藏数最高的候选，翻页数只影响耗时而不影响内存
+            config = FilterConfig(
+                r18_mode=self.pixiv_config.r18_mode,
+                ai_filter_mode=self.pixiv_config.ai_filter_mode,
+                display_tag_str=display_tags,
+                return_count=self.pixiv_config.return_count,
+                logger=logger,
+                show_filter_result=self.pixiv_config.show_filter_result,
+                excluded_tags=exclude_tags or [],
+                forward_threshold=self.pixiv_config.forward_threshold,
+                show_details=self.pixiv_config.show_details,
+            )
+            collector = TopKCollector(config, self.pixiv_config.return_count)
             page_count = 0
             next_params = None
 
@@ -1363,7 +1486,7 @@ class IllustHandler:
 
                     current_illusts = json_result.illusts
                     if current_illusts:
-                        all_illusts.extend(current_illusts)
+                        collector.add(current_illusts)
                         page_count += 1
                         logger.info(
                             f"热度搜索：已获取第 {page_count} 页，本页 {len(current_illusts)} 个"
@@ -1382,44 +1505,24 @@ class IllustHandler:
                     logger.error(f"热度搜索第 {page_count + 1} 页出错: {e}")
                     break
 
-            if not all_illusts:
+            if not collector.seen_count:
                 yield event.plain_result(
                     f"未找到与「{display_tags}」相关的{duration_display[duration_param]}作品。"
                 )
                 return
 
-            # 按收藏数降序排序
-            sorted_illusts = sorted(
-                all_illusts,
-                key=lambda x: getattr(x, "total_bookmarks", 0),
-                reverse=True,
-            )
-
             logger.info(
-                f"热度搜索完成，共 {len(sorted_illusts)} 个作品，已按收藏数排序"
+                f"热度搜索完成，共 {collector.seen_count} 个作品，"
+                f"{collector.passed_count} 个通过过滤，保留前 {len(collector)} 个候选"
             )
 
-            top_bookmark = getattr(sorted_illusts[0], "total_bookmarks", 0)
             yield event.plain_result(
-                f"✅ 搜索完成！共找到 {len(sorted_illusts)} 个作品\n"
-                f"🏆 最高收藏数: {top_bookmark}\n正在发送热门作品..."
-            )
-
-            config = FilterConfig(
-                r18_mode=self.pixiv_config.r18_mode,
-                ai_filter_mode=self.pixiv_config.ai_filter_mode,
-                display_tag_str=display_tags,
-                return_count=self.pixiv_config.return_count,
-                logger=logger,
-                show_filter_result=self.pixiv_config.show_filter_result,
-                excluded_tags=exclude_tags or [],
-                forward_threshold=self.pixiv_config.forward_threshold,
-                show_details=self.pixiv_config.show_details,
+                f"✅ 搜索完成！共找到 {collector.seen_count} 个作品\n"
+                f"🏆 最高收藏数: {collector.top_bookmark}\n正在发送热门作品..."
             )
 
-            async for result in process_and_send_illusts_sorted(
-                sorted_illusts,
-                config,
+            async for result in process_and_send_top_illusts(
+                collector,
                 self.client,
                 event,
                 build_detail_message,
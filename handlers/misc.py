@@ -1,6 +1,13 @@
 from astrbot.api.event import AstrMessageEvent
 from astrbot.api import logger
 from ..utils.help import get_help_message
+from ..utils.collage import collage_available
+from ..utils.pixiv_utils import send_collage, remember_results
+
+# 趋势标签拼图末尾的提示
+TRENDING_COLLAGE_FOOTER = (
+    "使用 /pixiv <标签> 搜索相关作品，或 /pixiv_original <编号> 获取原图"
+)
 
 
 class MiscHandler:
@@ -47,6 +54,26 @@ class MiscHandler:
                 yield event.plain_result("未能解析任何趋势标签。")
                 return
 
+            # 拼图模式：以各标签的代表作品缩略图组成网格，标签名作为说明
+            if self.pixiv_config.collage_mode and collage_available():
+                trend_items = [
+                    tag_info for tag_info in result.trend_tags if tag_info.get("illust")
+                ]
+                if trend_items:
+                    trend_illusts = [tag_info.illust for tag_info in trend_items]
+                    remember_results(event, trend_illusts)
+                    async for response in send_collage(
+                        self.client,
+                        event,
+                        trend_illusts,
+                        captions=[
+                            tag_info.get("tag", "未知标签") for tag_info in trend_items
+                        ],
+                        footer=TRENDING_COLLAGE_FOOTER,
+                    ):
+                        yield response
+                    return
+
             # 构建最终消息
             message = "# Pixiv 插画趋势标签\n\n"
             message += "\n".join(tags_list)
@@ -49,6 +49,9 @@ class RandomIllustHandler:
         session_id = event.unified_msg_origin
 
         success, message = add_random_tag(chat_id, session_id, cleaned_tags)
+        if success:
+            # 已按旧配置提前准备的推送不再适用
+            self.random_search_service.invalidate_prepared_push(chat_id)
         yield event.plain_result(message)
 
     async def pixiv_random_del(self, event: AstrMessageEvent, index: str = ""):
@@ -63,6 +66,9 @@ class RandomIllustHandler:
         chat_id = event.get_group_id() or event.get_sender_id()
 
         success, message = remove_random_tag(chat_id, idx)
+        if success:
+            # 已按旧配置提前准备的推送不再适用
+            self.random_search_service.invalidate_prepared_push(chat_id)
         yield event.plain_result(message)
 
     async def pixiv_random_list(self, event: AstrMessageEvent, args: str = ""):
@@ -127,6 +133,7 @@ class RandomIllustHandler:
         msg = "随机搜索队列状态：\n"
         msg += f"队列大小: {status['queue_size']}\n"
         msg += f"队列处理器运行中: {'是' if status['is_queue_processor_running'] else '否'}\n"
+        msg += f"并行处理器数量: {status['worker_count']}\n"
         msg += f"活跃群组数量: {len(status['active_groups'])}\n"
 
         if status["active_groups"]:
@@ -204,6 +211,9 @@ class RandomIllustHandler:
         session_id = event.unified_msg_origin
 
         success, message = add_random_ranking(chat_id, session_id, mode, date)
+        if success:
+            # 已按旧配置提前准备的推送不再适用
+            self.random_search_service.invalidate_prepared_push(chat_id)
         yield event.plain_result(message)
 
     async def pixiv_random_ranking_del(self, event: AstrMessageEvent, index: str = ""):
@@ -218,6 +228,9 @@ class RandomIllustHandler:
         chat_id = event.get_group_id() or event.get_sender_id()
 
         success, message = remove_random_ranking(chat_id, idx)
+        if success:
+            # 已按旧配置提前准备的推送不再适用
+            self.random_search_service.invalidate_prepared_push(chat_id)
         yield event.plain_result(message)
 
     async def pixiv_random_ranking_list(self, event: AstrMessageEvent, args: str = ""):
@@ -9,7 +9,9 @@ from astrbot.api.all import command
 
 from .utils.database import initialize_database
 from .utils.subscription import SubscriptionService
-from .utils.pixiv_utils import init_pixiv_utils
+from .utils.pixiv_utils import init_pixiv_utils, download_image
+from .utils.image_relay import ImageRelayServer
+from .utils.recent_results import RecentResults
 from .utils.help import init_help_manager, get_help_message
 from .utils.llm_tool import create_pixiv_llm_tools
 from .utils.tag import set_filter_config_source
@@ -73,8 +75,29 @@ class PixivSearchPlugin(Star):
         self.temp_dir = data_dir / "temp"
         self.temp_dir.mkdir(parents=True, exist_ok=True)
 
+        # 可选的本地图片中转服务（目录不放在 temp 下，避免被临时目录清理误删）
+        self.image_relay = None
+        if self.pixiv_config.image_relay_enabled:
+            self.image_relay = ImageRelayServer(
+                data_dir / "relay",
+                host=self.pixiv_config.image_relay_host,
+                port=self.pixiv_config.image_relay_port,
+                public_url=self.pixiv_config.image_relay_public_url,
+                fetch=download_image,
+            )
+            self.image_relay.start()
+
+        # 会话最近结果与原图缓存（/pixiv_original 与渐进发送使用）
+        self.recent_results = RecentResults(fetch=download_image)
+
         # 初始化 PixivUtils 模块
-        init_pixiv_utils(self.client, self.pixiv_config, self.temp_dir)
+        init_pixiv_utils(
+            self.client,
+            self.pixiv_config,
+            self.temp_dir,
+            self.image_relay,
+            self.recent_results,
+        )
         set_filter_config_source(self.pixiv_config)
 
         # 初始化帮助消息管理器
@@ -170,6 +193,15 @@ class PixivSearchPlugin(Star):
         async for result in self.illust_handler.pixiv_specific(event, illust_id):
             yield result
 
+    @command("pixiv_original", alias={"原图"})
+    async def pixiv_original(
+        self, event: AstrMessageEvent, index: str = "", page: str = ""
+    ):
+        """按编号获取最近一次结果中作品的原图"""
+        args = " ".join([x for x in [index, page] if x])
+        async for result in self.illust_handler.pixiv_original(event, args):
+            yield result
+
     @command("pixiv_ranking")
     async def pixiv_ranking(
         self, event: AstrMessageEvent, mode: str = "", date: str = ""
@@ -464,6 +496,13 @@ class PixivSearchPlugin(Star):
         # 取消后台刷新任务
         await self.client_wrapper.stop_refresh_task()
         self._refresh_task = self.client_wrapper._refresh_task
+        # 等待后台的作品元数据缓存写入完成
+        await self.client_wrapper.flush_cache_writes()
+        # 停止图片中转服务
+        if self.image_relay:
+            await self.image_relay.stop()
+        # 取消原图预取并释放缓存
+        await self.recent_results.close()
 
         logger.info("Pixiv 搜索插件已停用。")
         # 关闭HTTP会话
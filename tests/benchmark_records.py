@@ -0,0 +1,137 @@
+"""
+精简作品记录内存基准：对比 5000 个完整 API 插画对象与投影后的精简记录的内存占用。
+
+在仓库根目录运行: python -m tests.benchmark_records
+"""
+
+import random
+import tracemalloc
+
+from utils.records import IllustRecord
+
+ILLUST_COUNT = 5000
+TAG_POOL = [f"tag_{i}" for i in range(800)] + ["R-18", "原神", "オリジナル", "女の子"]
+
+
+class JsonDict(dict):
+    """与 pixivpy3 JsonDict 相同：支持属性访问的 dict"""
+
+    def __getattr__(self, attr):
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError(attr)
+
+
+def _to_json_dict(value):
+    if isinstance(value, dict):
+        return JsonDict({k: _to_json_dict(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_json_dict(v) for v in value]
+    return value
+
+
+def _image_url(illust_id: int, page: int, size: str) -> str:
+    return (
+        f"https://i.pximg.net/c/{size}/img-master/img/2024/05/01/12/00/00/"
+        f"{illust_id}_p{page}_master1200.jpg"
+    )
+
+
+def make_api_illust(illust_id: int) -> JsonDict:
+    """构造字段与 search_illust 返回结果一致的插画对象"""
+    page_count = random.choice([1, 1, 1, 2, 3, 5])
+    pages = [
+        {
+            "image_urls": {
+                "square_medium": _image_url(illust_id, p, "360x360_70"),
+                "medium": _image_url(illust_id, p, "540x540_70"),
+                "large": _image_url(illust_id, p, "600x1200_90"),
+                "original": _image_url(illust_id, p, "original"),
+            }
+        }
+        for p in range(page_count)
+    ]
+    return _to_json_dict(
+        {
+            "id": illust_id,
+            "title": f"作品标题 {illust_id}",
+            "type": "illust",
+            "image_urls": {
+                "square_medium": _image_url(illust_id, 0, "360x360_70"),
+                "medium": _image_url(illust_id, 0, "540x540_70"),
+                "large": _image_url(illust_id, 0, "600x1200_90"),
+            },
+            "caption": "作品简介<br />" * random.randint(1, 20),
+            "restrict": 0,
+            "user": {
+                "id": random.randint(1, 10**8),
+                "name": f"画师{illust_id % 997}",
+                "account": f"artist_{illust_id % 997}",
+                "profile_image_urls": {
+                    "medium": "https://i.pximg.net/user-profile/img/2020/01/01/"
+                    f"00/00/00/{illust_id}_170.jpg"
+                },
+                "is_followed": False,
+            },
+            "tags": [
+                {"name": name, "translated_name": None}
+                for name in random.sample(TAG_POOL, random.randint(4, 12))
+            ],
+            "tools": ["CLIP STUDIO PAINT"],
+            "create_date": "2024-05-01T12:00:00+09:00",
+            "page_count": page_count,
+            "width": 1200,
+            "height": 1700,
+            "sanity_level": 2,
+            "x_restrict": 0,
+            "series": None,
+            "meta_single_page": (
+                {"original_image_url": _image_url(illust_id, 0, "original")}
+                if page_count == 1
+                else {}
+            ),
+            "meta_pages": pages if page_count > 1 else [],
+            "total_view": random.randint(100, 100000),
+            "total_bookmarks": random.randint(0, 20000),
+            "is_bookmarked": False,
+            "visible": True,
+            "is_muted": False,
+            "illust_ai_type": 1,
+            "illust_book_style": 0,
+        }
+    )
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    random.seed(0)
+    raw_bytes = measure(
+        lambda: [make_api_illust(i) for i in range(1, ILLUST_COUNT + 1)]
+    )
+
+    # 与 API 边界一致：逐页投影后丢弃原始对象，只保留精简记录
+    random.seed(0)
+    slim_bytes = measure(
+        lambda: [
+            IllustRecord.from_api(make_api_illust(i))
+            for i in range(1, ILLUST_COUNT + 1)
+        ]
+    )
+
+    print(f"{ILLUST_COUNT} 个作品")
+    print(f"完整 API 对象: {raw_bytes / 1024 / 1024:.2f} MiB")
+    print(f"精简记录:     {slim_bytes / 1024 / 1024:.2f} MiB")
+    print(f"内存占用降低: {(1 - slim_bytes / raw_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import unittest
+from types import SimpleNamespace
+
+from utils.records import IllustRecord, NovelRecord, slim_api_response
+from utils.tag import FilterConfig, build_detail_message, filter_illusts_with_reason
+
+
+def make_api_illust(illust_id: int, page_count: int = 1):
+    pages = [
+        {
+            "image_urls": {
+                "square_medium": f"sq_{p}",
+                "medium": f"m_{p}",
+                "large": f"l_{p}",
+                "original": f"o_{p}",
+            }
+        }
+        for p in range(page_count)
+    ]
+    return {
+        "id": illust_id,
+        "title": f"illust-{illust_id}",
+        "type": "illust",
+        "caption": "long caption",
+        "user": {"id": 7, "name": "tester", "account": "tester"},
+        "tags": [{"name": "R-18", "translated_name": None}, {"name": "原神"}],
+        "image_urls": {"square_medium": "sq_0", "medium": "m_0", "large": "l_0"},
+        "meta_single_page": {"original_image_url": "o_0"} if page_count == 1 else {},
+        "meta_pages": pages if page_count > 1 else [],
+        "page_count": page_count,
+        "total_bookmarks": 120,
+        "total_view": 3000,
+        "x_restrict": 1,
+        "illust_ai_type": 0,
+    }
+
+
+class IllustRecordTests(unittest.TestCase):
+    def test_single_page_urls_are_compatible(self):
+        record = IllustRecord.from_api(make_api_illust(1))
+
+        self.assertEqual(record.meta_single_page.original_image_url, "o_0")
+        self.assertEqual(record.image_urls.large, "l_0")
+        self.assertEqual(record.image_urls.medium, "m_0")
+        self.assertEqual(record.meta_pages, [])
+        self.assertFalse(hasattr(record, "caption"))
+
+    def test_multi_page_urls_are_compatible(self):
+        record = IllustRecord.from_api(make_api_illust(2, page_count=3))
+
+        self.assertEqual(
+            [page.image_urls.original for page in record.meta_pages],
+            ["o_0", "o_1", "o_2"],
+        )
+        self.assertEqual(record.meta_pages[2].image_urls.medium, "m_2")
+
+    def test_records_work_with_filters_and_details(self):
+        record = IllustRecord.from_api(make_api_illust(3))
+        config = FilterConfig(
+            r18_mode="过滤 R18", ai_filter_mode="显示 AI 作品", show_filter_result=False
+        )
+
+        self.assertEqual(filter_illusts_with_reason([record], config)[0], [])
+        self.assertIn("作者: tester", build_detail_message(record))
+        self.assertIn("R-18, 原神", build_detail_message(record))
+
+    def test_slim_api_response_replaces_list_items(self):
+        result = SimpleNamespace(
+            illusts=[make_api_illust(4)], next_url="next", illust=None
+        )
+
+        slim_api_response(result)
+
+        self.assertIsInstance(result.illusts[0], IllustRecord)
+        self.assertEqual(result.next_url, "next")
+
+    def test_novel_series_title_is_kept(self):
+        novel = NovelRecord.from_api(
+            {
+                "id": 5,
+                "title": "novel",
+                "user": {"id": 1, "name": "writer"},
+                "tags": [],
+                "text_length": 1200,
+                "series": {"id": 9, "title": "series"},
+            }
+        )
+
+        self.assertIn("系列: series", build_detail_message(novel, is_novel=True))
+        self.assertIn("字数: 1200", build_detail_message(novel, is_novel=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
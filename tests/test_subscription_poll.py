@@ -0,0 +1,33 @@
+import unittest
+from datetime import datetime, timedelta
+
+from utils.poll_schedule import POLL_ACTIVE_GAP_MINUTES, estimate_poll_interval
+
+
+class EstimatePollIntervalTests(unittest.TestCase):
+    now = datetime(2024, 6, 1, 12, 0)
+
+    def posted_every(self, gap: timedelta, count: int = 10, since_last=None):
+        latest = self.now - (since_last if since_last is not None else gap / 2)
+        return [latest - gap * i for i in range(count)]
+
+    def test_daily_poster_stays_at_minimum_interval(self):
+        dates = self.posted_every(timedelta(days=1))
+        self.assertEqual(estimate_poll_interval(dates, 30, 360, now=self.now), 30)
+
+    def test_frequent_poster_after_short_pause_stays_at_minimum(self):
+        dates = self.posted_every(timedelta(hours=6), since_last=timedelta(days=3))
+        self.assertEqual(estimate_poll_interval(dates, 30, 360, now=self.now), 30)
+
+    def test_dormant_artist_backs_off_up_to_maximum(self):
+        monthly = self.posted_every(timedelta(days=30))
+        interval = estimate_poll_interval(monthly, 30, 360, now=self.now)
+        self.assertGreater(interval, 30)
+        self.assertLessEqual(interval, 360)
+
+        dormant = self.posted_every(timedelta(days=30), since_last=timedelta(days=365))
+        self.assertEqual(estimate_poll_interval(dormant, 30, 360, now=self.now), 360)
+        self.assertGreater(POLL_ACTIVE_GAP_MINUTES, 24 * 60)
+
+    def test_no_history_uses_maximum(self):
+        self.assertEqual(estimate_poll_interval([], 30, 360, now=self.now), 360)
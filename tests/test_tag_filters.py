@@ -1,7 +1,18 @@
 import unittest
 from types import SimpleNamespace
+from unittest import mock
 
-from utils.tag import FilterConfig, filter_illusts_with_reason
+from utils import tag
+from utils.tag import (
+    CompiledFilter,
+    FilterConfig,
+    FilterStats,
+    filter_illusts_with_reason,
+    has_excluded_tags,
+    is_ai,
+    is_r18,
+    TopKCollector,
+)
 
 
 def make_illust(
@@ -124,5 +135,127 @@ class TagFilterThresholdTests(unittest.TestCase):
         self.assertEqual([item.id for item in filtered], [1])
 
 
+class CompiledFilterTests(unittest.TestCase):
+    @staticmethod
+    def make_tagged(illust_id: int, *tag_names: str):
+        illust = make_illust(illust_id=illust_id)
+        illust.tags = [SimpleNamespace(name=name) for name in tag_names]
+        return illust
+
+    def test_badwords_match_whole_words_only(self):
+        self.assertTrue(is_r18(self.make_tagged(1, "R-18")))
+        self.assertTrue(is_r18(self.make_tagged(2, "原神", "foo R18")))
+        self.assertFalse(is_r18(self.make_tagged(3, "R18风")))
+        self.assertTrue(is_ai(self.make_tagged(4, "AI生成")))
+        self.assertFalse(is_ai(self.make_tagged(5, "FAIRY")))
+
+    def test_excluded_tags_match_substrings_within_single_tag(self):
+        illust = self.make_tagged(1, "ブルーアーカイブ", "水着")
+        self.assertTrue(has_excluded_tags(illust, ["水"]))
+        self.assertFalse(has_excluded_tags(illust, ["着ブ"]))
+        self.assertTrue(has_excluded_tags({"tags": [{"name": "Fate"}]}, ["fate"]))
+
+    def test_compiled_filter_applies_modes_and_exclusions(self):
+        predicate = CompiledFilter(
+            FilterConfig(
+                r18_mode="仅 R18",
+                ai_filter_mode="过滤 AI 作品",
+                excluded_tags=["漫画"],
+            )
+        )
+        illusts = [
+            self.make_tagged(1, "R-18"),
+            self.make_tagged(2, "R-18", "AI"),
+            self.make_tagged(3, "R-18", "4コマ漫画"),
+            self.make_tagged(4, "オリジナル"),
+        ]
+
+        self.assertEqual([item.id for item in illusts if predicate(item)], [1])
+
+    def test_inspect_counts_every_matching_reason(self):
+        predicate = CompiledFilter(
+            FilterConfig(
+                r18_mode="过滤 R18",
+                ai_filter_mode="过滤 AI 作品",
+                excluded_tags=["漫画"],
+                min_bookmarks=100,
+            )
+        )
+        illusts = [
+            self.make_tagged(1, "R-18", "AI", "漫画"),
+            self.make_tagged(2, "AI"),
+            self.make_tagged(3, "オリジナル"),
+        ]
+        illusts[2].total_bookmarks = 500
+        stats = FilterStats()
+
+        passed = [item.id for item in illusts if predicate.inspect(item, stats)]
+
+        self.assertEqual(passed, [3])
+        self.assertEqual(
+            (stats.r18, stats.ai, stats.excluded, stats.low_bookmarks), (1, 2, 1, 2)
+        )
+        self.assertEqual(predicate.low_stat_reasons(stats), ["书签数低于 100"])
+
+
+class TopKCollectorTests(unittest.TestCase):
+    def make_pages(self):
+        illusts = []
+        for i in range(90):
+            illust = make_illust(illust_id=i, total_bookmarks=(i * 53) % 40 * 10)
+            illust.tags = [SimpleNamespace(name=["R-18", "AI", "原神"][i % 3])]
+            illusts.append(illust)
+        return [illusts[i : i + 30] for i in range(0, len(illusts), 30)]
+
+    def test_keeps_stable_top_k_across_pages(self):
+        pages = self.make_pages()
+        config = FilterConfig(
+            r18_mode="过滤 R18",
+            ai_filter_mode="显示 AI 作品",
+            display_tag_str="热度",
+            return_count=4,
+            min_bookmarks=50,
+        )
+        collector = TopKCollector(config, 4)
+        for page in pages:
+            collector.add(page)
+
+        all_illusts = [item for page in pages for item in page]
+        filtered, messages = filter_illusts_with_reason(all_illusts, config)
+        expected = sorted(filtered, key=lambda x: x.total_bookmarks, reverse=True)
+
+        self.assertEqual(len(collector), 8)
+        self.assertEqual(collector.results(), expected[:8])
+        self.assertEqual(collector.passed_count, len(filtered))
+        self.assertEqual(collector.filter_messages(), messages)
+        self.assertEqual(
+            collector.top_bookmark, max(x.total_bookmarks for x in all_illusts)
+        )
+
+
+class CollageModeTests(unittest.TestCase):
+    def make_config(self, **kwargs):
+        return FilterConfig(
+            r18_mode="过滤 R18", ai_filter_mode="显示 AI 作品", **kwargs
+        )
+
+    def test_collage_follows_live_config_and_item_count(self):
+        items = [make_illust(illust_id=i) for i in range(3)]
+        source = SimpleNamespace(collage_mode=True)
+        with (
+            mock.patch.object(tag, "_FILTER_CONFIG_SOURCE", source),
+            mock.patch.object(tag, "collage_available", return_value=True),
+        ):
+            self.assertTrue(tag._use_collage(self.make_config(), items))
+            self.assertFalse(tag._use_collage(self.make_config(), items[:1]))
+            self.assertFalse(tag._use_collage(self.make_config(), items, is_novel=True))
+            self.assertFalse(tag._use_collage(self.make_config(collage=False), items))
+
+    def test_collage_requires_renderer(self):
+        items = [make_illust(illust_id=i) for i in range(3)]
+        with mock.patch.object(tag, "collage_available", return_value=False):
+            self.assertFalse(tag._use_collage(self.make_config(collage=True), items))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,138 @@
+"""
+collage.py
+拼图（缩略图网格）渲染：把多个作品的缩略图排成一张带编号的网格图，
+每格标注作品 ID 与标题，用户再按编号或 ID 获取完整作品。
+渲染为同步 CPU 操作，调用方应放在线程中执行。
+"""
+
+import io
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+try:
+    from PIL import Image as PILImage, ImageDraw, ImageFont, ImageOps
+except Exception:
+    PILImage = None
+
+# 单元格缩略图边长（像素）
+COLLAGE_CELL_SIZE = 240
+# 单元格下方文字区高度（像素）
+COLLAGE_LABEL_HEIGHT = 44
+# 单元格间距（像素）
+COLLAGE_GAP = 6
+# 网格最多列数
+COLLAGE_MAX_COLUMNS = 5
+# 输出 JPEG 质量
+COLLAGE_JPEG_QUALITY = 85
+# 可显示中日文标题的字体，按顺序尝试；都不可用时只标注编号与 ID
+COLLAGE_FONT_CANDIDATES = (
+    "NotoSansCJK-Regular.ttc",
+    "NotoSansCJKsc-Regular.otf",
+    "SourceHanSansSC-Regular.otf",
+    "wqy-microhei.ttc",
+    "wqy-zenhei.ttc",
+    "msyh.ttc",
+    "simhei.ttf",
+    "PingFang.ttc",
+)
+
+
+@dataclass
+class CollageCell:
+    """拼图中的一格"""
+
+    image_data: Optional[bytes]
+    label: str = ""
+    sublabel: str = ""
+
+
+def collage_available() -> bool:
+    """是否可以渲染拼图（需要 Pillow）"""
+    return PILImage is not None
+
+
+@lru_cache(maxsize=4)
+def _load_font(size: int):
+    """返回 (字体, 是否支持中日文)"""
+    for name in COLLAGE_FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size), True
+        except Exception:
+            continue
+    try:
+        return ImageFont.load_default(size=size), False
+    except TypeError:
+        # Pillow < 10.1 的默认字体不支持指定字号
+        return ImageFont.load_default(), False
+
+
+def _fit_text(draw, text: str, font, max_width: int) -> str:
+    """按像素宽度截断文本，超出部分以省略号表示"""
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…" if text else ""
+
+
+def _render_thumbnail(image_data: Optional[bytes], size: int):
+    """居中裁剪为正方形缩略图；数据缺失或损坏时返回灰色占位图"""
+    if image_data:
+        try:
+            with PILImage.open(io.BytesIO(image_data)) as img:
+                return ImageOps.fit(img.convert("RGB"), (size, size))
+        except Exception:
+            pass
+    return PILImage.new("RGB", (size, size), (200, 200, 200))
+
+
+def render_collage(cells: List[CollageCell]) -> bytes:
+    """
+    将若干单元格渲染为一张 JPEG 网格图
+
+    每格左上角绘制从 1 开始的编号，下方依次为标签（标题）与副标签（ID）。
+    """
+    if not cells:
+        raise ValueError("cells 不能为空")
+    if PILImage is None:
+        raise RuntimeError("未安装 Pillow，无法渲染拼图")
+
+    cell = COLLAGE_CELL_SIZE
+    columns = min(COLLAGE_MAX_COLUMNS, math.ceil(math.sqrt(len(cells))))
+    rows = math.ceil(len(cells) / columns)
+    cell_height = cell + COLLAGE_LABEL_HEIGHT
+    width = columns * cell + (columns + 1) * COLLAGE_GAP
+    height = rows * cell_height + (rows + 1) * COLLAGE_GAP
+
+    canvas = PILImage.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(canvas)
+    label_font, supports_cjk = _load_font(16)
+    badge_font, _ = _load_font(22)
+
+    for index, item in enumerate(cells):
+        row, column = divmod(index, columns)
+        x = COLLAGE_GAP + column * (cell + COLLAGE_GAP)
+        y = COLLAGE_GAP + row * (cell_height + COLLAGE_GAP)
+        canvas.paste(_render_thumbnail(item.image_data, cell), (x, y))
+
+        # 左上角编号
+        number = str(index + 1)
+        badge_width = int(draw.textlength(number, font=badge_font)) + 14
+        draw.rectangle((x, y, x + badge_width, y + 30), fill=(0, 150, 250))
+        draw.text((x + 7, y + 3), number, font=badge_font, fill=(255, 255, 255))
+
+        # 下方文字：默认字体无法显示中日文，此时只保留 ASCII 标签
+        label = item.label if supports_cjk or item.label.isascii() else ""
+        text_y = y + cell + 2
+        for text in (label, item.sublabel):
+            if not text:
+                continue
+            text = _fit_text(draw, text, label_font, cell - 4)
+            draw.text((x + 2, text_y), text, font=label_font, fill=(40, 40, 40))
+            text_y += 20
+
+    with io.BytesIO() as buf:
+        canvas.save(buf, format="JPEG", quality=COLLAGE_JPEG_QUALITY, optimize=True)
+        return buf.getvalue()
@@ -1,78 +1,9 @@
 import os
-import shutil
-import asyncio
 from astrbot.api import logger
-from pathlib import Path
 from typing import Dict, Any
 from dataclasses import dataclass
 
 
-async def clean_temp_dir(temp_dir: Path, max_files: int = 20) -> None:
-    """
-    异步清理临时目录，保持文件数量在指定限制内。
-
-    Args:
-        temp_dir: 要清理的目录的 Path 对象。
-        max_files: 最大保留文件数量。
-    """
-    if not temp_dir.exists():
-        return
-
-    try:
-        # 使用 asyncio.to_thread 进行异步文件操作
-        entries = await asyncio.to_thread(_get_temp_entries, temp_dir)
-
-        if len(entries) > max_files:
-            # 按创建时间排序，删除最旧的文件
-            entries_to_delete = await asyncio.to_thread(_sort_files_by_ctime, entries)
-            num_to_delete = len(entries_to_delete) - max_files
-
-            for i in range(num_to_delete):
-                target = entries_to_delete[i]
-                try:
-                    if os.path.isdir(target):
-                        await asyncio.to_thread(shutil.rmtree, target, True)
-                    else:
-                        await asyncio.to_thread(os.remove, target)
-                    logger.debug(f"[PixivPlugin] 已删除临时项: {target}")
-                except OSError as e:
-                    logger.warning(f"[PixivPlugin] 删除临时项失败: {target}，原因: {e}")
-
-            logger.info(
-                f"[PixivPlugin] 临时目录清理完成，删除了 {num_to_delete} 个条目"
-            )
-
-    except Exception as e:
-        logger.error(f"[PixivPlugin] 清理临时目录时发生错误: {e}", exc_info=True)
-
-
-def _get_temp_entries(temp_dir: Path) -> list[str]:
-    """获取临时目录中的所有条目路径（文件和目录）。"""
-    return [str(f) for f in temp_dir.iterdir()]
-
-
-def _sort_files_by_ctime(files: list[str]) -> list[str]:
-    """按创建时间排序文件列表"""
-    return sorted(files, key=lambda x: os.path.getctime(x))
-
-
-async def smart_clean_temp_dir(
-    temp_dir: Path, probability: float = 0.1, max_files: int = 20
-) -> None:
-    """
-    智能清理临时目录，使用概率性触发以减少频繁的文件系统操作。
-
-    Args:
-        temp_dir: 要清理的目录的 Path 对象。
-        probability: 触发清理的概率 (0.0-1.0)。
-        max_files: 最大保留文件数量。
-    """
-    import random
-
-    if random.random() < probability:
-        await clean_temp_dir(temp_dir, max_files)
-
-
 @dataclass
 class PixivConfig:
     """Pixiv 插件配置管理类"""
@@ -96,7 +27,10 @@ class PixivConfig:
         self.show_details = self.config.get("show_details", True)
         self.deep_search_depth = self.config.get("deep_search_depth", 3)
         self.forward_threshold = self.config.get("forward_threshold", False)
-        raw_send_method = str(self.config.get("image_send_method", "") or "").strip().lower()
+        self.collage_mode = self.config.get("collage_mode", False)
+        raw_send_method = (
+            str(self.config.get("image_send_method", "") or "").strip().lower()
+        )
         legacy_is_fromfilesystem = self.config.get("is_fromfilesystem", None)
         if raw_send_method in {"url", "file", "byte"}:
             self.image_send_method = raw_send_method
@@ -113,9 +47,23 @@ class PixivConfig:
         else:
             self.image_send_method = "url"
         self.image_quality = self.config.get("image_quality", "original")
+        self.progressive_delivery = self.config.get("progressive_delivery", False)
         # 本地 PIL 压缩：仅在 image_send_method 为 file/byte 时生效
         self.pil_compress_quality = self.config.get("pil_compress_quality", 100)
         self.pil_compress_target_kb = self.config.get("pil_compress_target_kb", 0)
+        # 单条转发消息内嵌图片的载荷预算，0 表示不限制
+        self.forward_payload_budget_kb = self.config.get(
+            "forward_payload_budget_kb", 15360
+        )
+        # 本地图片中转服务：url/byte 发送方式下由适配器通过内网 URL 拉取图片
+        self.image_relay_enabled = self.config.get("image_relay_enabled", False)
+        self.image_relay_host = str(
+            self.config.get("image_relay_host", "127.0.0.1") or "127.0.0.1"
+        ).strip()
+        self.image_relay_port = self.config.get("image_relay_port", 6199)
+        self.image_relay_public_url = str(
+            self.config.get("image_relay_public_url", "") or ""
+        ).strip()
         self.refresh_interval = self.config.get("refresh_token_interval_minutes", 180)
         self.subscription_enabled = self.config.get("subscription_enabled", True)
         self.subscription_check_interval_minutes = self.config.get(
@@ -130,6 +78,38 @@ class PixivConfig:
         self.random_sent_illust_retention_days = self.config.get(
             "random_sent_illust_retention_days", 7
         )
+        self.illust_cache_enabled = self.config.get("illust_cache_enabled", True)
+        self.illust_cache_fallback_timeout = self.config.get(
+            "illust_cache_fallback_timeout", 20
+        )
+        self.illust_cache_retention_days = self.config.get(
+            "illust_cache_retention_days", 30
+        )
+        self.subscription_check_concurrency = self.config.get(
+            "subscription_check_concurrency", 4
+        )
+        self.api_request_interval_ms = self.config.get("api_request_interval_ms", 500)
+        self.subscription_follow_feed_mode = self.config.get(
+            "subscription_follow_feed_mode", False
+        )
+        self.subscription_adaptive_interval = self.config.get(
+            "subscription_adaptive_interval", True
+        )
+        self.subscription_max_check_interval_minutes = self.config.get(
+            "subscription_max_check_interval_minutes", 360
+        )
+        self.random_search_worker_count = self.config.get(
+            "random_search_worker_count", 3
+        )
+        self.random_search_job_timeout_seconds = self.config.get(
+            "random_search_job_timeout_seconds", 600
+        )
+        self.random_search_pool_ttl_minutes = self.config.get(
+            "random_search_pool_ttl_minutes", 60
+        )
+        self.random_search_prefetch_lead_minutes = self.config.get(
+            "random_search_prefetch_lead_minutes", 5
+        )
         self.fanbox_sessid = self.config.get("fanbox_sessid", "").strip()
         self.fanbox_cookie = self.config.get("fanbox_cookie", "").strip()
         self.fanbox_user_agent = self.config.get("fanbox_user_agent", "").strip()
@@ -207,12 +187,19 @@ class PixivConfigManager:
             "show_details": {"type": "bool"},
             "deep_search_depth": {"type": "int", "min": -1, "max": 50},
             "forward_threshold": {"type": "bool"},
+            "collage_mode": {"type": "bool"},
             "image_quality": {
                 "type": "enum",
                 "choices": ["original", "large", "medium"],
             },
+            "progressive_delivery": {"type": "bool"},
             "pil_compress_quality": {"type": "int", "min": 1, "max": 100},
             "pil_compress_target_kb": {"type": "int", "min": 0, "max": 20480},
+            "forward_payload_budget_kb": {"type": "int", "min": 0, "max": 102400},
+            "image_relay_enabled": {"type": "bool", "hidden": True},
+            "image_relay_host": {"type": "string", "hidden": True},
+            "image_relay_port": {"type": "int", "min": 1, "max": 65535, "hidden": True},
+            "image_relay_public_url": {"type": "string", "hidden": True},
             "subscription_enabled": {"type": "bool"},
             "fanbox_data_source": {
                 "type": "enum",
@@ -242,6 +229,26 @@ class PixivConfigManager:
             "fanbox_sessid": {"type": "string", "hidden": True},
             "fanbox_cookie": {"type": "string", "hidden": True},
             "random_sent_illust_retention_days": {"type": "int", "min": 1, "max": 365},
+            "illust_cache_enabled": {"type": "bool"},
+            "illust_cache_fallback_timeout": {"type": "int", "min": 0, "max": 300},
+            "illust_cache_retention_days": {"type": "int", "min": 1, "max": 3650},
+            "subscription_check_concurrency": {"type": "int", "min": 1, "max": 16},
+            "api_request_interval_ms": {"type": "int", "min": 0, "max": 10000},
+            "subscription_follow_feed_mode": {"type": "bool"},
+            "subscription_adaptive_interval": {"type": "bool"},
+            "subscription_max_check_interval_minutes": {
+                "type": "int",
+                "min": 5,
+                "max": 10080,
+            },
+            "random_search_worker_count": {"type": "int", "min": 1, "max": 10},
+            "random_search_job_timeout_seconds": {
+                "type": "int",
+                "min": 30,
+                "max": 7200,
+            },
+            "random_search_pool_ttl_minutes": {"type": "int", "min": 0, "max": 1440},
+            "random_search_prefetch_lead_minutes": {"type": "int", "min": 0, "max": 60},
         }
 
     def get_help_text(self) -> str:
@@ -267,16 +274,31 @@ class PixivConfigManager:
             "show_details",
             "deep_search_depth",
             "forward_threshold",
+            "collage_mode",
             "image_quality",
+            "progressive_delivery",
             "image_send_method",
             "pil_compress_quality",
             "pil_compress_target_kb",
+            "forward_payload_budget_kb",
             "subscription_enabled",
             "fanbox_data_source",
             "fanbox_user_agent",
             "random_search_min_interval",
             "random_search_max_interval",
             "random_sent_illust_retention_days",
+            "illust_cache_enabled",
+            "illust_cache_fallback_timeout",
+            "illust_cache_retention_days",
+            "subscription_check_concurrency",
+            "api_request_interval_ms",
+            "subscription_follow_feed_mode",
+            "subscription_adaptive_interval",
+            "subscription_max_check_interval_minutes",
+            "random_search_worker_count",
+            "random_search_job_timeout_seconds",
+            "random_search_pool_ttl_minutes",
+            "random_search_prefetch_lead_minutes",
         ]
 
         current = {}
@@ -1,5 +1,8 @@
+import json
 import peewee as pw
-from datetime import datetime, timedelta
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Optional
 from astrbot.api import logger
 from astrbot.api.star import StarTools
 
@@ -9,7 +12,11 @@ data_dir.mkdir(parents=True, exist_ok=True)
 
 # 数据库文件路径
 db_path = data_dir / "subscriptions.db"
-db = pw.SqliteDatabase(str(db_path))
+# WAL 让清理等写操作不阻塞读取；INCREMENTAL auto_vacuum 允许分批回收空闲页
+db = pw.SqliteDatabase(
+    str(db_path),
+    pragmas={"journal_mode": "wal", "auto_vacuum": "incremental"},
+)
 
 
 class BaseModel(pw.Model):
@@ -26,6 +33,7 @@ class Subscription(BaseModel):
     target_id = pw.CharField()  # 订阅目标 ID (画师ID)
     target_name = pw.CharField(null=True)  # 订阅目标的名称（画师名）
     last_notified_illust_id = pw.BigIntegerField(default=0)  # 最后通知的作品 ID
+    last_checked_at = pw.DateTimeField(null=True)  # 最后一次检查更新的时间
 
     class Meta:
         primary_key = pw.CompositeKey("chat_id", "sub_type", "target_id")
@@ -48,7 +56,7 @@ class SentIllust(BaseModel):
 
     illust_id = pw.BigIntegerField()  # 作品ID
     chat_id = pw.CharField()  # 群聊ID
-    sent_at = pw.DateTimeField()  # 发送时间
+    sent_at = pw.DateTimeField(index=True)  # 发送时间
 
     class Meta:
         primary_key = pw.CompositeKey("illust_id", "chat_id")
@@ -67,6 +75,59 @@ class RandomRankingConfig(BaseModel):
         primary_key = pw.CompositeKey("chat_id", "mode")
 
 
+class IllustMeta(BaseModel):
+    """作品元数据缓存模型，从 API 响应中顺带记录，用于离线搜索和兜底推送"""
+
+    illust_id = pw.BigIntegerField(primary_key=True)  # 作品ID
+    title = pw.TextField(default="")  # 标题
+    illust_type = pw.CharField(default="illust")  # 作品类型: illust/manga/ugoira
+    user_id = pw.BigIntegerField(default=0)  # 画师ID
+    user_name = pw.TextField(default="")  # 画师名
+    tags = pw.TextField(default="[]")  # 标签 JSON: [[name, translated_name], ...]
+    total_bookmarks = pw.IntegerField(default=0)  # 收藏数
+    total_view = pw.IntegerField(default=0)  # 阅读量
+    x_restrict = pw.IntegerField(default=0)  # R18 标记
+    illust_ai_type = pw.IntegerField(default=0)  # AI 标记
+    page_count = pw.IntegerField(default=1)  # 页数
+    page_urls = pw.TextField(default="[]")  # 各页图片 JSON: [[原图, 大图, ...], ...]
+    create_date = pw.CharField(null=True)  # 作品发布时间 (ISO 字符串)
+    updated_at = pw.DateTimeField(index=True)  # 最近一次从 API 看到该作品的时间
+
+
+class TagReservoir(BaseModel):
+    """随机标签候选池模型，记录每个搜索词下可供抽样的作品"""
+
+    search_tags = pw.CharField()  # 搜索词
+    illust_id = pw.BigIntegerField()  # 作品ID，详情见 IllustMeta
+    total_bookmarks = pw.IntegerField(default=0)  # 最近一次看到时的收藏数
+    added_at = pw.DateTimeField()  # 加入候选池的时间
+
+    class Meta:
+        primary_key = pw.CompositeKey("search_tags", "illust_id")
+
+
+class TagReservoirState(BaseModel):
+    """随机标签候选池的刷新状态"""
+
+    search_tags = pw.CharField(primary_key=True)  # 搜索词
+    newest_illust_id = pw.BigIntegerField(default=0)  # 候选池中已知的最新作品ID
+    crawled_at = pw.DateTimeField()  # 最近一次按热度深度搜索的时间
+    refreshed_at = pw.DateTimeField()  # 最近一次增量刷新的时间
+
+
+class RankingCache(BaseModel):
+    """排行榜缓存模型，按 (模式, 日期) 记录排行榜作品顺序"""
+
+    mode = pw.CharField()  # 排行榜模式
+    date_key = pw.CharField()  # 排行榜日期，空字符串表示最新排行榜
+    illust_ids = pw.TextField(default="[]")  # 按名次排列的作品ID JSON
+    complete = pw.BooleanField(default=False)  # 是否已翻到排行榜末尾
+    fetched_at = pw.DateTimeField(index=True)  # 首次拉取该排行榜的时间
+
+    class Meta:
+        primary_key = pw.CompositeKey("mode", "date_key")
+
+
 class RandomSearchSchedule(BaseModel):
     """随机搜索调度时间模型"""
 
@@ -77,6 +138,15 @@ class RandomSearchSchedule(BaseModel):
         primary_key = pw.CompositeKey("chat_id")
 
 
+class ArtistPollState(BaseModel):
+    """画师轮询状态模型，用于按发布频率自适应调整订阅检查间隔"""
+
+    target_id = pw.CharField(primary_key=True)  # 画师ID
+    next_check_at = pw.DateTimeField(index=True)  # 下次检查时间
+    interval_minutes = pw.IntegerField()  # 当前检查间隔（分钟）
+    last_post_at = pw.DateTimeField(null=True)  # 最近一次发布作品的时间
+
+
 def _coerce_schedule_time(value, chat_id: str = ""):
     """将数据库中的调度时间统一转换为 datetime。"""
     if value is None:
@@ -122,10 +192,41 @@ def _coerce_schedule_time(value, chat_id: str = ""):
     return None
 
 
+_ILLUST_META_FTS_TABLE = "illustmeta_fts"
+_illust_meta_fts_available = False
+
+
+def _initialize_illust_meta_fts():
+    """创建作品元数据的 FTS5 索引（标题 + 标签），SQLite 不支持 FTS5 时回退到 LIKE 查询"""
+    global _illust_meta_fts_available
+    try:
+        db.execute_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {_ILLUST_META_FTS_TABLE} "
+            "USING fts5(title, tags, tokenize='unicode61')"
+        )
+        _illust_meta_fts_available = True
+    except Exception as e:
+        _illust_meta_fts_available = False
+        logger.warning(f"当前 SQLite 不支持 FTS5，本地作品搜索将回退为 LIKE 查询: {e}")
+
+
+def _log_auto_vacuum_status():
+    """旧数据库默认未开启 auto_vacuum，切换需要一次完整 VACUUM，留给后台清理任务执行"""
+    try:
+        mode = db.execute_sql("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2:
+            logger.info(
+                "数据库尚未切换为 auto_vacuum=INCREMENTAL 模式，将在下次定期清理任务中完成切换。"
+            )
+    except Exception as e:
+        logger.warning(f"读取数据库 auto_vacuum 模式失败: {e}")
+
+
 def initialize_database():
     """初始化数据库，创建表"""
     try:
         db.connect(reuse_if_open=True)
+        _log_auto_vacuum_status()
         if not Subscription.table_exists():
             db.create_tables([Subscription])
             logger.info("数据库初始化成功，数据表 subscription 已创建。")
@@ -159,15 +260,37 @@ def initialize_database():
         if not SentIllust.table_exists():
             db.create_tables([SentIllust])
             logger.info("数据库初始化成功，数据表 sent_illust 已创建。")
+        else:
+            # 旧版表缺少 sent_at 索引，分批清理时需要按时间定位
+            db.execute_sql(
+                "CREATE INDEX IF NOT EXISTS sentillust_sent_at ON sentillust (sent_at)"
+            )
 
         if not RandomSearchSchedule.table_exists():
             db.create_tables([RandomSearchSchedule])
             logger.info("数据库初始化成功，数据表 random_search_schedule 已创建。")
 
+        if not ArtistPollState.table_exists():
+            db.create_tables([ArtistPollState])
+            logger.info("数据库初始化成功，数据表 artist_poll_state 已创建。")
+
+        if not TagReservoir.table_exists():
+            db.create_tables([TagReservoir, TagReservoirState])
+            logger.info("数据库初始化成功，数据表 tag_reservoir 已创建。")
+
+        if not RankingCache.table_exists():
+            db.create_tables([RankingCache])
+            logger.info("数据库初始化成功，数据表 ranking_cache 已创建。")
+
         if not RandomRankingConfig.table_exists():
             db.create_tables([RandomRankingConfig])
             logger.info("数据库初始化成功，数据表 random_ranking_config 已创建。")
 
+        if not IllustMeta.table_exists():
+            db.create_tables([IllustMeta])
+            logger.info("数据库初始化成功，数据表 illust_meta 已创建。")
+        _initialize_illust_meta_fts()
+
         # 兼容旧版，检查并添加 chat_id 列
         if Subscription.table_exists():
             columns = [c.name for c in db.get_columns("subscription")]
@@ -179,6 +302,12 @@ def initialize_database():
                     )
                 )
                 logger.info("数据库表结构更新完成。")
+            if "last_checked_at" not in columns:
+                logger.info("正在更新数据库表结构，添加 last_checked_at 列...")
+                db.execute_sql(
+                    "ALTER TABLE subscription ADD COLUMN last_checked_at DATETIME"
+                )
+                logger.info("数据库表结构更新完成。")
 
     except Exception as e:
         logger.error(f"数据库初始化或迁移失败: {e}")
@@ -296,6 +425,90 @@ def update_last_notified_id(chat_id: str, sub_type: str, target_id: str, new_id:
         logger.error(f"更新 last_notified_illust_id 时出错: {e}")
 
 
+def update_last_notified_ids(updates) -> int:
+    """
+    在一个事务中批量更新多条订阅的最后通知作品ID
+
+    :param updates: [(chat_id, sub_type, target_id, new_id), ...]
+    :return: 更新的订阅数量
+    """
+    if not updates:
+        return 0
+    try:
+        with db.atomic():
+            for chat_id, sub_type, target_id, new_id in updates:
+                Subscription.update(last_notified_illust_id=new_id).where(
+                    (Subscription.chat_id == chat_id)
+                    & (Subscription.sub_type == sub_type)
+                    & (Subscription.target_id == target_id)
+                ).execute()
+        return len(updates)
+    except Exception as e:
+        logger.error(f"批量更新 last_notified_illust_id 时出错: {e}")
+        return 0
+
+
+def mark_subscriptions_checked(
+    sub_type: str, target_ids, checked_at: datetime, chunk_size: int = 500
+) -> int:
+    """
+    批量记录订阅目标的最后检查时间
+
+    :param target_ids: 本次检查过的订阅目标ID
+    :return: 更新的订阅数量
+    """
+    target_ids = list(target_ids)
+    if not target_ids:
+        return 0
+    try:
+        updated = 0
+        with db.atomic():
+            for start in range(0, len(target_ids), chunk_size):
+                updated += (
+                    Subscription.update(last_checked_at=checked_at)
+                    .where(
+                        (Subscription.sub_type == sub_type)
+                        & (
+                            Subscription.target_id.in_(
+                                target_ids[start : start + chunk_size]
+                            )
+                        )
+                    )
+                    .execute()
+                )
+        return updated
+    except Exception as e:
+        logger.error(f"记录订阅检查时间时出错: {e}")
+        return 0
+
+
+def get_artist_poll_states() -> dict:
+    """获取所有画师的轮询状态，返回 {target_id: ArtistPollState}"""
+    try:
+        return {state.target_id: state for state in ArtistPollState.select()}
+    except Exception as e:
+        logger.error(f"获取画师轮询状态时出错: {e}")
+        return {}
+
+
+def save_artist_poll_state(
+    target_id: str,
+    next_check_at: datetime,
+    interval_minutes: int,
+    last_post_at: datetime = None,
+):
+    """保存画师的下次检查时间与检查间隔"""
+    try:
+        ArtistPollState.insert(
+            target_id=target_id,
+            next_check_at=next_check_at,
+            interval_minutes=interval_minutes,
+            last_post_at=last_post_at,
+        ).on_conflict_replace().execute()
+    except Exception as e:
+        logger.error(f"保存画师 {target_id} 轮询状态时出错: {e}")
+
+
 def add_random_tag(chat_id: str, session_id: str, tag: str) -> (bool, str):
     """添加随机搜索标签"""
     try:
@@ -444,16 +657,119 @@ def is_illust_sent(illust_id: int, chat_id: str) -> bool:
         return False
 
 
-def cleanup_old_sent_illusts(days: int = 1):
-    """清理指定天数前的已发送作品记录"""
+def delete_old_sent_illusts_chunk(cutoff: datetime, chunk_size: int = 500) -> int:
+    """
+    删除一批发送时间早于 cutoff 的已发送作品记录
+
+    每批单独提交，调用方在批次之间让出事件循环，避免长时间持有写锁。
+
+    :param cutoff: 截止时间
+    :param chunk_size: 单批最多删除的条数
+    :return: 本批删除的条数
+    """
     try:
-        cutoff_date = datetime.now() - timedelta(days=days)
-        query = SentIllust.delete().where(SentIllust.sent_at < cutoff_date)
-        deleted_count = query.execute()
-        if deleted_count > 0:
-            logger.info(f"清理了 {deleted_count} 条超过 {days} 天的已发送作品记录")
+        batch = (
+            SentIllust.select(pw.SQL("rowid"))
+            .where(SentIllust.sent_at < cutoff)
+            .limit(chunk_size)
+        )
+        with db.atomic():
+            return SentIllust.delete().where(pw.SQL("rowid").in_(batch)).execute()
+    except Exception as e:
+        logger.error(f"分批清理过期已发送作品记录失败: {e}")
+        return 0
+
+
+def delete_stale_illust_metadata_chunk(cutoff: datetime, chunk_size: int = 500) -> int:
+    """
+    删除一批最近一次出现时间早于 cutoff 的作品元数据缓存（同时清理 FTS 索引）
+
+    标签候选池只保存作品ID并依赖元数据缓存，仍在候选池中的作品不会被清理。
+
+    :param cutoff: 截止时间
+    :param chunk_size: 单批最多删除的条数
+    :return: 本批删除的条数
+    """
+    try:
+        ids = [
+            row.illust_id
+            for row in IllustMeta.select(IllustMeta.illust_id)
+            .where(
+                (IllustMeta.updated_at < cutoff)
+                & IllustMeta.illust_id.not_in(
+                    TagReservoir.select(TagReservoir.illust_id)
+                )
+            )
+            .limit(chunk_size)
+        ]
+        if not ids:
+            return 0
+        with db.atomic():
+            IllustMeta.delete().where(IllustMeta.illust_id.in_(ids)).execute()
+            if _illust_meta_fts_available:
+                placeholders = ",".join("?" * len(ids))
+                db.execute_sql(
+                    f"DELETE FROM {_ILLUST_META_FTS_TABLE} WHERE rowid IN ({placeholders})",
+                    ids,
+                )
+        return len(ids)
+    except Exception as e:
+        logger.error(f"分批清理过期作品元数据缓存失败: {e}")
+        return 0
+
+
+def convert_to_incremental_auto_vacuum() -> bool:
+    """
+    将数据库切换为 auto_vacuum=INCREMENTAL 模式（需执行一次完整 VACUUM）
+
+    :return: 本次是否执行了切换（已是 INCREMENTAL 模式时返回 False）
+    """
+    try:
+        mode = db.execute_sql("PRAGMA auto_vacuum").fetchone()[0]
+        if mode == 2:
+            return False
+        logger.info(
+            "正在将数据库切换为 auto_vacuum=INCREMENTAL 模式（仅需执行一次）..."
+        )
+        db.execute_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        db.execute_sql("VACUUM")
+        # WAL 模式下 VACUUM 的结果先写入 WAL，检查点后主文件才会缩小
+        db.execute_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        logger.info("数据库 auto_vacuum 模式切换完成。")
+        return True
+    except Exception as e:
+        logger.warning(f"切换数据库 auto_vacuum 模式失败，将无法增量回收空间: {e}")
+        return False
+
+
+def incremental_vacuum_step(pages: int = 256) -> int:
+    """
+    增量回收最多 pages 个空闲页
+
+    :return: 本次实际回收的页数（auto_vacuum 未启用时恒为 0）
+    """
+    try:
+        before = db.execute_sql("PRAGMA freelist_count").fetchone()[0]
+        if before <= 0:
+            return 0
+        # sqlite3 的 execute 只会单步执行该 PRAGMA，这里用 executescript 执行到底
+        db.connection().executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        after = db.execute_sql("PRAGMA freelist_count").fetchone()[0]
+        return max(0, before - after)
     except Exception as e:
-        logger.error(f"清理过期已发送作品记录失败: {e}")
+        logger.error(f"增量回收数据库空间失败: {e}")
+        return 0
+
+
+def get_database_file_size() -> int:
+    """获取数据库文件大小（字节），包含尚未检查点合并的 WAL 文件"""
+    total = 0
+    for path in (db_path, db_path.with_name(db_path.name + "-wal")):
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return total
 
 
 def filter_sent_illusts(illusts, chat_id: str) -> list:
@@ -663,3 +979,443 @@ def list_random_rankings(chat_id: str) -> list:
     except Exception as e:
         logger.error(f"列出随机排行榜配置失败: {e}")
         return []
+
+
+# 作品元数据缓存相关函数
+_IMAGE_URL_KEYS = ("original", "large", "medium", "square_medium")
+
+
+def _meta_field(source, key, default=None):
+    """从 dict 或对象形式的 Pixiv 数据中读取字段"""
+    if source is None:
+        return default
+    if isinstance(source, dict):
+        value = source.get(key, default)
+    else:
+        value = getattr(source, key, default)
+    return default if value is None else value
+
+
+def _meta_int(value, default: int = 0) -> int:
+    """尽量将字段转换为整数"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _project_illust_meta(illust) -> Optional[dict]:
+    """从 API 返回的作品对象中提取需要缓存的字段"""
+    illust_id = _meta_int(_meta_field(illust, "id"), 0)
+    if illust_id <= 0:
+        return None
+
+    tags = []
+    for tag in _meta_field(illust, "tags", []) or []:
+        if isinstance(tag, str):
+            name, translated_name = tag, ""
+        else:
+            name = _meta_field(tag, "name", "")
+            translated_name = _meta_field(tag, "translated_name", "")
+        if name:
+            tags.append([str(name), str(translated_name or "")])
+
+    page_urls = []
+    for page in _meta_field(illust, "meta_pages", []) or []:
+        urls = _meta_field(page, "image_urls")
+        page_urls.append([str(_meta_field(urls, key, "")) for key in _IMAGE_URL_KEYS])
+    if not page_urls:
+        image_urls = _meta_field(illust, "image_urls")
+        single_page = _meta_field(illust, "meta_single_page")
+        page_urls.append(
+            [
+                str(_meta_field(single_page, "original_image_url", "")),
+                str(_meta_field(image_urls, "large", "")),
+                str(_meta_field(image_urls, "medium", "")),
+                str(_meta_field(image_urls, "square_medium", "")),
+            ]
+        )
+
+    user = _meta_field(illust, "user")
+    return {
+        "illust_id": illust_id,
+        "title": str(_meta_field(illust, "title", "")),
+        "illust_type": str(_meta_field(illust, "type", "illust")),
+        "user_id": _meta_int(_meta_field(user, "id"), 0),
+        "user_name": str(_meta_field(user, "name", "")),
+        "tags": json.dumps(tags, ensure_ascii=False),
+        "total_bookmarks": _meta_int(_meta_field(illust, "total_bookmarks"), 0),
+        "total_view": _meta_int(_meta_field(illust, "total_view"), 0),
+        "x_restrict": _meta_int(_meta_field(illust, "x_restrict"), 0),
+        "illust_ai_type": _meta_int(_meta_field(illust, "illust_ai_type"), 0),
+        "page_count": max(1, _meta_int(_meta_field(illust, "page_count"), 1)),
+        "page_urls": json.dumps(page_urls, ensure_ascii=False),
+        "create_date": _meta_field(illust, "create_date"),
+    }
+
+
+def _rehydrate_illust_meta(row: IllustMeta):
+    """将缓存记录还原为与 API 返回结构兼容的作品对象"""
+    try:
+        tags = json.loads(row.tags or "[]")
+    except ValueError:
+        tags = []
+    try:
+        page_urls = json.loads(row.page_urls or "[]")
+    except ValueError:
+        page_urls = []
+
+    pages = [
+        SimpleNamespace(
+            image_urls=SimpleNamespace(
+                **{
+                    key: (urls[i] if i < len(urls) else "") or None
+                    for i, key in enumerate(_IMAGE_URL_KEYS)
+                }
+            )
+        )
+        for urls in page_urls
+    ]
+    first_page = (
+        pages[0].image_urls
+        if pages
+        else SimpleNamespace(**{key: None for key in _IMAGE_URL_KEYS})
+    )
+
+    return SimpleNamespace(
+        id=row.illust_id,
+        title=row.title,
+        type=row.illust_type,
+        user=SimpleNamespace(id=row.user_id, name=row.user_name),
+        tags=[
+            SimpleNamespace(name=name, translated_name=translated_name or None)
+            for name, translated_name in tags
+        ],
+        total_bookmarks=row.total_bookmarks,
+        total_view=row.total_view,
+        x_restrict=row.x_restrict,
+        illust_ai_type=row.illust_ai_type,
+        page_count=row.page_count,
+        create_date=row.create_date,
+        image_urls=SimpleNamespace(
+            square_medium=first_page.square_medium,
+            medium=first_page.medium,
+            large=first_page.large,
+        ),
+        meta_single_page=SimpleNamespace(original_image_url=first_page.original),
+        meta_pages=pages if row.page_count > 1 else [],
+        from_local_cache=True,
+    )
+
+
+def upsert_illust_metadata(illusts) -> int:
+    """
+    写入或更新作品元数据缓存，并同步 FTS5 索引
+
+    :param illusts: API 返回的作品对象列表
+    :return: 写入的作品数量
+    """
+    rows = {}
+    for illust in illusts or []:
+        row = _project_illust_meta(illust)
+        if row:
+            rows[row["illust_id"]] = row
+    if not rows:
+        return 0
+
+    now = datetime.now()
+    try:
+        with db.atomic():
+            for batch in pw.chunked(list(rows.values()), 100):
+                IllustMeta.insert_many(
+                    [dict(row, updated_at=now) for row in batch]
+                ).on_conflict_replace().execute()
+
+            if _illust_meta_fts_available:
+                for batch_ids in pw.chunked(list(rows.keys()), 500):
+                    placeholders = ",".join("?" * len(batch_ids))
+                    db.execute_sql(
+                        f"DELETE FROM {_ILLUST_META_FTS_TABLE} WHERE rowid IN ({placeholders})",
+                        list(batch_ids),
+                    )
+                db.cursor().executemany(
+                    f"INSERT INTO {_ILLUST_META_FTS_TABLE}(rowid, title, tags) VALUES (?, ?, ?)",
+                    [
+                        (
+                            illust_id,
+                            row["title"],
+                            " ".join(
+                                " ".join(filter(None, pair))
+                                for pair in json.loads(row["tags"])
+                            ),
+                        )
+                        for illust_id, row in rows.items()
+                    ],
+                )
+        return len(rows)
+    except Exception as e:
+        logger.error(f"写入作品元数据缓存失败: {e}")
+        return 0
+
+
+def cache_illusts_from_response(result) -> int:
+    """从任意 API 响应中提取作品（illusts 列表或单个 illust）写入本地缓存"""
+    if not result:
+        return 0
+    try:
+        illusts = _meta_field(result, "illusts")
+        if illusts is None:
+            single = _meta_field(result, "illust")
+            illusts = [single] if single else []
+        if not isinstance(illusts, (list, tuple)):
+            return 0
+        return upsert_illust_metadata(illusts)
+    except Exception as e:
+        logger.error(f"缓存 API 响应中的作品失败: {e}")
+        return 0
+
+
+def search_illust_metadata(words, limit: int = 300, match_all: bool = True) -> list:
+    """
+    在本地作品缓存中按标签/标题搜索
+
+    :param words: 搜索词列表
+    :param limit: 返回数量上限
+    :param match_all: True 表示所有词都需命中，False 表示任一词命中
+    :return: 与 API 返回结构兼容的作品对象列表
+    """
+    words = [w.strip() for w in words or [] if w and w.strip()]
+    if not words:
+        return []
+
+    try:
+        if _illust_meta_fts_available:
+            joiner = " AND " if match_all else " OR "
+            match_expr = joiner.join('"' + w.replace('"', '""') + '"*' for w in words)
+            cursor = db.execute_sql(
+                f"SELECT rowid FROM {_ILLUST_META_FTS_TABLE} "
+                f"WHERE {_ILLUST_META_FTS_TABLE} MATCH ? ORDER BY rank LIMIT ?",
+                (match_expr, limit),
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return []
+            rows = {
+                row.illust_id: row
+                for row in IllustMeta.select().where(IllustMeta.illust_id.in_(ids))
+            }
+            return [_rehydrate_illust_meta(rows[i]) for i in ids if i in rows]
+
+        conditions = None
+        for w in words:
+            cond = IllustMeta.tags.contains(w) | IllustMeta.title.contains(w)
+            if conditions is None:
+                conditions = cond
+            elif match_all:
+                conditions = conditions & cond
+            else:
+                conditions = conditions | cond
+        query = (
+            IllustMeta.select()
+            .where(conditions)
+            .order_by(IllustMeta.total_bookmarks.desc())
+            .limit(limit)
+        )
+        return [_rehydrate_illust_meta(row) for row in query]
+    except Exception as e:
+        logger.error(f"搜索本地作品缓存失败: {e}")
+        return []
+
+
+def get_tag_reservoir_state(search_tags: str):
+    """获取搜索词候选池的刷新状态，不存在时返回 None"""
+    try:
+        return TagReservoirState.get_or_none(
+            TagReservoirState.search_tags == search_tags
+        )
+    except Exception as e:
+        logger.error(f"获取候选池状态时出错: {e}")
+        return None
+
+
+def save_tag_reservoir(
+    search_tags: str, illusts, crawled: bool = False, max_size: int = 3000
+) -> int:
+    """
+    将作品加入搜索词的候选池，并更新刷新状态
+
+    :param illusts: API 返回的作品对象列表，可以为空（仅更新刷新时间）
+    :param crawled: 是否为按热度的深度搜索结果
+    :param max_size: 候选池上限，超出时淘汰本次未出现的作品中收藏数最低的
+    :return: 写入的作品数量
+    """
+    now = datetime.now()
+    rows = {}
+    for illust in illusts or []:
+        row = _project_illust_meta(illust)
+        if row:
+            rows[row["illust_id"]] = row
+    try:
+        upsert_illust_metadata(illusts)
+        with db.atomic():
+            for batch in pw.chunked(list(rows.values()), 100):
+                # 已在池中的作品只刷新收藏数，保留原加入时间
+                TagReservoir.insert_many(
+                    [
+                        {
+                            "search_tags": search_tags,
+                            "illust_id": row["illust_id"],
+                            "total_bookmarks": row["total_bookmarks"],
+                            "added_at": now,
+                        }
+                        for row in batch
+                    ]
+                ).on_conflict(
+                    conflict_target=[TagReservoir.search_tags, TagReservoir.illust_id],
+                    preserve=[TagReservoir.total_bookmarks],
+                ).execute()
+
+            state = TagReservoirState.get_or_none(
+                TagReservoirState.search_tags == search_tags
+            )
+            newest_id = max(rows, default=0)
+            if state:
+                state.newest_illust_id = max(state.newest_illust_id, newest_id)
+                state.refreshed_at = now
+                if crawled:
+                    state.crawled_at = now
+                state.save()
+            else:
+                TagReservoirState.create(
+                    search_tags=search_tags,
+                    newest_illust_id=newest_id,
+                    crawled_at=now,
+                    refreshed_at=now,
+                )
+
+            # 超出上限时优先保留本次写入的作品：按时间增量拉取的新作收藏数很低，
+            # 若参与收藏数排序会被立即淘汰，而水位线已前移，之后不会再被拉取
+            stored = (
+                TagReservoir.select(
+                    TagReservoir.illust_id, TagReservoir.total_bookmarks
+                )
+                .where(TagReservoir.search_tags == search_tags)
+                .tuples()
+            )
+            others = sorted(
+                (
+                    (bookmarks, illust_id)
+                    for illust_id, bookmarks in stored
+                    if illust_id not in rows
+                ),
+                reverse=True,
+            )
+            current = sorted(
+                (
+                    (row["total_bookmarks"], illust_id)
+                    for illust_id, row in rows.items()
+                ),
+                reverse=True,
+            )
+            overflow = [illust_id for _, illust_id in (current + others)[max_size:]]
+            for batch in pw.chunked(overflow, 500):
+                TagReservoir.delete().where(
+                    (TagReservoir.search_tags == search_tags)
+                    & (TagReservoir.illust_id.in_(batch))
+                ).execute()
+        return len(rows)
+    except Exception as e:
+        logger.error(f"写入候选池 {search_tags} 时出错: {e}")
+        return 0
+
+
+def delete_orphan_tag_reservoir_rows() -> int:
+    """删除元数据缓存中已不存在的候选池作品，避免其继续占用候选池上限"""
+    try:
+        return (
+            TagReservoir.delete()
+            .where(
+                TagReservoir.illust_id.not_in(IllustMeta.select(IllustMeta.illust_id))
+            )
+            .execute()
+        )
+    except Exception as e:
+        logger.error(f"清理候选池中失效的作品时出错: {e}")
+        return 0
+
+
+def load_tag_reservoir(search_tags: str) -> list:
+    """读取搜索词候选池中的作品，返回与 API 返回结构兼容的作品对象列表"""
+    try:
+        query = (
+            IllustMeta.select()
+            .join(TagReservoir, on=(TagReservoir.illust_id == IllustMeta.illust_id))
+            .where(TagReservoir.search_tags == search_tags)
+            .order_by(TagReservoir.total_bookmarks.desc())
+        )
+        return [_rehydrate_illust_meta(row) for row in query]
+    except Exception as e:
+        logger.error(f"读取候选池 {search_tags} 时出错: {e}")
+        return []
+
+
+def get_ranking_cache(mode: str, date_key: str):
+    """获取排行榜缓存，不存在时返回 None"""
+    try:
+        return RankingCache.get_or_none(
+            (RankingCache.mode == mode) & (RankingCache.date_key == date_key)
+        )
+    except Exception as e:
+        logger.error(f"获取排行榜缓存时出错: {e}")
+        return None
+
+
+def save_ranking_cache(
+    mode: str,
+    date_key: str,
+    illusts,
+    illust_ids: list,
+    complete: bool,
+    fetched_at: datetime,
+) -> bool:
+    """
+    保存排行榜缓存，并将本次拉取到的作品写入元数据缓存
+
+    :param illusts: 本次新拉取的作品对象列表
+    :param illust_ids: 截至目前按名次排列的全部作品ID
+    """
+    try:
+        upsert_illust_metadata(illusts)
+        RankingCache.insert(
+            mode=mode,
+            date_key=date_key,
+            illust_ids=json.dumps(illust_ids),
+            complete=complete,
+            fetched_at=fetched_at,
+        ).on_conflict_replace().execute()
+        return True
+    except Exception as e:
+        logger.error(f"保存排行榜缓存 {mode} {date_key} 时出错: {e}")
+        return False
+
+
+def load_illusts_by_ids(illust_ids: list) -> list:
+    """按给定顺序从元数据缓存中读取作品，缺失的作品会被跳过"""
+    try:
+        rows = {}
+        for batch in pw.chunked(illust_ids, 500):
+            for row in IllustMeta.select().where(IllustMeta.illust_id.in_(batch)):
+                rows[row.illust_id] = row
+        return [_rehydrate_illust_meta(rows[i]) for i in illust_ids if i in rows]
+    except Exception as e:
+        logger.error(f"读取作品元数据缓存时出错: {e}")
+        return []
+
+
+def delete_old_ranking_cache(cutoff: datetime) -> int:
+    """删除早于 cutoff 拉取的排行榜缓存"""
+    try:
+        return RankingCache.delete().where(RankingCache.fetched_at < cutoff).execute()
+    except Exception as e:
+        logger.error(f"清理排行榜缓存时出错: {e}")
+        return 0
@@ -0,0 +1,230 @@
+"""
+image_relay.py
+本地图片中转服务：内嵌的 aiohttp 服务器按不透明令牌提供已缓存的图片，
+适配器（如本机/局域网内的 OneBot 实现）通过内网 URL 拉取图片。
+图片只下载一次并保存在本地磁盘，不经过 base64 编码，也不需要平台访问公共反代。
+"""
+
+import asyncio
+import os
+import secrets
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import aiofiles
+import aiohttp
+from aiohttp import web
+from astrbot.api import logger
+
+# 中转条目的保留时间（秒），平台通常在发送后很快拉取图片
+RELAY_ENTRY_TTL_SECONDS = 30 * 60
+# 两次过期清理之间的最短间隔（秒）
+RELAY_PURGE_INTERVAL_SECONDS = 60
+# 中转服务允许代拉取的图片域名（其余 URL 需要额外的鉴权头，保持原有发送方式）
+RELAY_REMOTE_HOSTS = ("i.pximg.net",)
+
+# 下载函数签名：(session, url) -> 图片字节或 None
+Fetcher = Callable[[aiohttp.ClientSession, str], Awaitable[Optional[bytes]]]
+
+
+class _RelayEntry:
+    __slots__ = ("path", "remote_url", "content_type", "expires_at", "lock", "ready")
+
+    def __init__(self, path: Path, remote_url=None, content_type=None):
+        self.path = path
+        self.remote_url = remote_url
+        self.content_type = content_type
+        self.expires_at = time.monotonic() + RELAY_ENTRY_TTL_SECONDS
+        self.lock = asyncio.Lock()
+        # 文件完整写入并就位后才置为 True，之前的请求不会读到写了一半的文件
+        self.ready = False
+
+
+def _guess_content_type(ext: str) -> str:
+    ext = str(ext or "").lower()
+    return {
+        ".png": "image/png",
+        ".gif": "image/gif",
+        ".webp": "image/webp",
+    }.get(ext, "image/jpeg")
+
+
+async def _write_atomic(path: Path, data: bytes) -> None:
+    """先写入 .part 临时文件，完成后再原子替换到目标路径"""
+    part_path = path.with_suffix(path.suffix + ".part")
+    async with aiofiles.open(part_path, "wb") as f:
+        await f.write(data)
+    os.replace(part_path, path)
+
+
+def _url_ext(url: str) -> str:
+    suffix = Path(url.split("?", 1)[0]).suffix.lower()
+    return suffix if suffix in (".jpg", ".jpeg", ".png", ".gif", ".webp") else ".jpg"
+
+
+class ImageRelayServer:
+    """
+    本地图片中转服务器
+
+    - register_bytes: 已下载的图片写入本地目录，返回中转 URL
+    - register_remote: 记录远程图片地址，首次被拉取时下载并落盘，之后直接从磁盘提供
+    """
+
+    def __init__(
+        self,
+        storage_dir: Path,
+        host: str = "127.0.0.1",
+        port: int = 6199,
+        public_url: str = "",
+        fetch: Optional[Fetcher] = None,
+    ):
+        self.storage_dir = Path(storage_dir)
+        self.host = host
+        self.port = port
+        base_host = "127.0.0.1" if host in ("", "0.0.0.0", "::") else host
+        self.public_url = (public_url or f"http://{base_host}:{port}").rstrip("/")
+        self._fetch = fetch
+        self._entries: dict[str, _RelayEntry] = {}
+        self._remote_tokens: dict[str, str] = {}
+        self._last_purge = time.monotonic()
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._start_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    def start(self) -> None:
+        """在后台启动 HTTP 服务"""
+        if self._start_task and not self._start_task.done():
+            return
+        self._start_task = asyncio.create_task(self._serve())
+
+    async def _serve(self) -> None:
+        # 启动时清理上次运行遗留的文件，此前的令牌均已失效
+        await asyncio.to_thread(shutil.rmtree, self.storage_dir, True)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+
+        app = web.Application()
+        app.router.add_get("/pixiv/{token}", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        try:
+            await runner.setup()
+            site = web.TCPSite(runner, self.host, self.port)
+            await site.start()
+        except Exception as e:
+            await runner.cleanup()
+            logger.error(
+                f"Pixiv 插件：图片中转服务启动失败 ({self.host}:{self.port}) - {e}"
+            )
+            return
+        self._runner = runner
+        logger.info(
+            f"Pixiv 插件：图片中转服务已启动，监听 {self.host}:{self.port}，对外地址 {self.public_url}"
+        )
+
+    async def stop(self) -> None:
+        """停止 HTTP 服务并删除缓存文件"""
+        if self._start_task and not self._start_task.done():
+            self._start_task.cancel()
+            try:
+                await self._start_task
+            except asyncio.CancelledError:
+                pass
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Pixiv 插件：图片中转服务已停止。")
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._entries.clear()
+        self._remote_tokens.clear()
+        await asyncio.to_thread(shutil.rmtree, self.storage_dir, True)
+
+    def accepts_remote(self, url: str) -> bool:
+        """该远程地址是否可以由中转服务代为拉取"""
+        return (
+            self.running
+            and self._fetch is not None
+            and bool(url)
+            and any(host in url for host in RELAY_REMOTE_HOSTS)
+        )
+
+    def _url_for(self, token: str) -> str:
+        return f"{self.public_url}/pixiv/{token}"
+
+    def _new_entry(self, ext: str, remote_url=None) -> str:
+        self._purge_expired()
+        token = secrets.token_urlsafe(16)
+        path = self.storage_dir / f"{uuid.uuid4().hex}{ext}"
+        self._entries[token] = _RelayEntry(path, remote_url, _guess_content_type(ext))
+        return token
+
+    async def register_bytes(self, img_data: bytes, ext: str = ".jpg") -> str:
+        """保存已下载的图片并返回中转 URL"""
+        token = self._new_entry(ext)
+        entry = self._entries[token]
+        await _write_atomic(entry.path, img_data)
+        entry.ready = True
+        return self._url_for(token)
+
+    def register_remote(self, url: str) -> str:
+        """登记远程图片并返回中转 URL；同一地址在有效期内复用同一令牌与本地文件"""
+        token = self._remote_tokens.get(url)
+        entry = self._entries.get(token) if token else None
+        if entry:
+            entry.expires_at = time.monotonic() + RELAY_ENTRY_TTL_SECONDS
+            return self._url_for(token)
+        token = self._new_entry(_url_ext(url), remote_url=url)
+        self._remote_tokens[url] = token
+        return self._url_for(token)
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < RELAY_PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        expired = [t for t, e in self._entries.items() if e.expires_at <= now]
+        for token in expired:
+            entry = self._entries.pop(token)
+            if entry.remote_url:
+                self._remote_tokens.pop(entry.remote_url, None)
+            entry.path.unlink(missing_ok=True)
+        if expired:
+            logger.debug(f"Pixiv 插件：图片中转服务清理了 {len(expired)} 个过期条目")
+
+    async def _ensure_local(self, entry: _RelayEntry) -> bool:
+        """远程条目首次被请求时下载落盘；并发请求只下载一次"""
+        if entry.ready:
+            return True
+        if not entry.remote_url:
+            return False
+        async with entry.lock:
+            if entry.ready:
+                return True
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession()
+            img_data = await self._fetch(self._session, entry.remote_url)
+            if not img_data:
+                return False
+            await _write_atomic(entry.path, img_data)
+            entry.ready = True
+            return True
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        entry = self._entries.get(request.match_info["token"])
+        if entry is None or entry.expires_at <= time.monotonic():
+            raise web.HTTPNotFound()
+        if not await self._ensure_local(entry):
+            raise web.HTTPBadGateway()
+        return web.FileResponse(
+            entry.path,
+            headers={
+                "Content-Type": entry.content_type,
+                "Cache-Control": f"private, max-age={RELAY_ENTRY_TTL_SECONDS}",
+            },
+        )
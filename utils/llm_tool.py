@@ -15,8 +15,8 @@ from astrbot.api import logger
 from .tag import (
     build_detail_message,
     FilterConfig,
-    filter_illusts_with_reason,
-    process_and_send_illusts_sorted,
+    process_and_send_top_illusts,
+    TopKCollector,
 )
 from .pixiv_utils import (
     send_pixiv_image,
@@ -102,7 +102,10 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
         """按热度（收藏数）搜索插画 - 一周内"""
         import asyncio
 
-        all_illusts = []
+        # 逐页过滤并只保留收藏数最高的候选；文本结果最多列出 5 个
+        collector = TopKCollector(
+            self._build_hot_search_config(query, count), max(count, 5)
+        )
         page_count = 0
         next_params = None
         pages_to_fetch = 5
@@ -110,7 +113,7 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
         while page_count < pages_to_fetch:
             try:
                 if page_count == 0:
-                    search_result = await asyncio.to_thread(
+                    search_result = await self.pixiv_client_wrapper.call_pixiv_api(
                         self.pixiv_client.search_illust,
                         tags,
                         search_target="partial_match_for_tags",
@@ -121,7 +124,7 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
                 else:
                     if not next_params:
                         break
-                    search_result = await asyncio.to_thread(
+                    search_result = await self.pixiv_client_wrapper.call_pixiv_api(
                         self.pixiv_client.search_illust, **next_params
                     )
 
@@ -129,7 +132,7 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
                     break
 
                 if search_result.illusts:
-                    all_illusts.extend(search_result.illusts)
+                    collector.add(search_result.illusts)
                     page_count += 1
                 else:
                     break
@@ -144,25 +147,18 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
                 logger.error(f"热度搜索第 {page_count + 1} 页出错: {e}")
                 break
 
-        if not all_illusts:
+        if not collector.seen_count:
             return f"未找到关于 '{query}' 的插画。"
 
-        sorted_illusts = sorted(
-            all_illusts, key=lambda x: getattr(x, "total_bookmarks", 0), reverse=True
-        )
-
         event = self._get_event(context)
         if event:
-            return await self._send_pixiv_result(
-                event, sorted_illusts, query, tags, count
-            )
+            return await self._send_pixiv_result(event, collector, query, tags)
         else:
-            return self._format_text_results(sorted_illusts, query, tags)
+            return self._format_text_results(collector.results(), query, tags)
 
-    async def _send_pixiv_result(self, event, items, query, tags, count=1):
-        """发送按热度排序的结果"""
-        logger.info(f"PixivIllustSearchTool: 准备发送 {count} 张图片")
-        config = FilterConfig(
+    def _build_hot_search_config(self, query, count) -> FilterConfig:
+        """构建热度搜索使用的过滤配置"""
+        return FilterConfig(
             r18_mode=self.pixiv_config.r18_mode if self.pixiv_config else "过滤 R18",
             ai_filter_mode=self.pixiv_config.ai_filter_mode
             if self.pixiv_config
@@ -178,7 +174,12 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
             show_details=self.pixiv_config.show_details if self.pixiv_config else True,
         )
 
-        filtered_items, _ = filter_illusts_with_reason(items, config)
+    async def _send_pixiv_result(self, event, collector: TopKCollector, query, tags):
+        """发送按热度排序的结果"""
+        config = collector.config
+        logger.info(f"PixivIllustSearchTool: 准备发送 {config.return_count} 张图片")
+
+        filtered_items = collector.results()
         if not filtered_items:
             return "找到插画但被过滤了 (可能是R18或AI作品)。"
 
@@ -189,9 +190,8 @@ class PixivIllustSearchTool(FunctionTool[AstrAgentContext]):
         sent_batches = 0
 
         try:
-            async for result in process_and_send_illusts_sorted(
-                items,
-                config,
+            async for result in process_and_send_top_illusts(
+                collector,
                 self.pixiv_client,
                 event,
                 build_detail_message,
@@ -1,12 +1,10 @@
 import asyncio
+import functools
 import aiohttp
 import aiofiles
 import io
-import shutil
 import subprocess
-import uuid
 import zipfile
-import tempfile
 from pathlib import Path
 from typing import Any, Optional
 from astrbot.api import logger
@@ -15,7 +13,9 @@ from pixivpy3 import AppPixivAPI
 
 from .config import PixivConfig
 from .tag import filter_illusts_with_reason, FilterConfig
-from .config import smart_clean_temp_dir, clean_temp_dir
+from .temp_files import TempFileManager
+from .collage import CollageCell, render_collage
+from .recent_results import RecentResults
 
 try:
     from PIL import Image as PILImage
@@ -26,14 +26,119 @@ except Exception:
 # 全局变量，需要在模块初始化时设置
 _config = None
 _temp_dir = None
+_image_relay = None
+_temp_files: Optional[TempFileManager] = None
+_recent_results: Optional[RecentResults] = None
 PIXIV_IMAGE_PROXY = "i.pixiv.re"
-
-
-def init_pixiv_utils(client: AppPixivAPI, config: PixivConfig, temp_dir: Path):
+# 转发消息每批包含的节点数
+FORWARD_BATCH_SIZE = 10
+# 转发消息预取深度：发送当前批次时最多提前组装好的批次数
+FORWARD_PREFETCH_DEPTH = 1
+# 图片字节降到 JPEG 质量下限后仍超出预算时，不再尝试压缩
+FORWARD_MIN_TARGET_KB = 32
+# 拼图缩略图的并发下载数
+COLLAGE_DOWNLOAD_CONCURRENCY = 6
+# 图片质量从高到低的尝试顺序
+QUALITY_PREFERENCE = ("original", "large", "medium")
+
+
+def init_pixiv_utils(
+    client: AppPixivAPI,
+    config: PixivConfig,
+    temp_dir: Path,
+    image_relay=None,
+    recent_results=None,
+):
     """初始化 PixivUtils 模块的全局变量"""
-    global _config, _temp_dir
+    global _config, _temp_dir, _image_relay, _temp_files, _recent_results
     _config = config
     _temp_dir = temp_dir
+    _image_relay = image_relay
+    _recent_results = recent_results
+    _temp_files = TempFileManager(temp_dir) if temp_dir else None
+    if _temp_files is not None:
+        _temp_files.cleanup_orphans()
+
+
+def hold_message_files(*messages) -> None:
+    """延后发送的消息链在发送完成前为其临时文件增加引用"""
+    if _temp_files is not None:
+        _temp_files.hold(*messages)
+
+
+def release_message_files(*messages) -> None:
+    """消息发送完成（或被丢弃）后释放其临时文件引用"""
+    if _temp_files is not None:
+        _temp_files.release_message(*messages)
+
+
+def remember_results(event, illusts) -> None:
+    """
+    记录会话最近一次发送的作品，供 /pixiv_original 按编号取回原图。
+    渐进发送且由插件下载图片时，同时在后台预取这些作品的原图。
+    """
+    session_id = getattr(event, "unified_msg_origin", None)
+    if _recent_results is None or not session_id or not illusts:
+        return
+    prefetch = _original_cache_enabled() and _config.image_send_method != "url"
+    _recent_results.remember(session_id, illusts, prefetch=prefetch)
+
+
+def _original_cache_enabled() -> bool:
+    """原图缓存仅在启用渐进发送时使用，未启用时保持原有下载方式"""
+    return _recent_results is not None and bool(
+        getattr(_config, "progressive_delivery", False)
+    )
+
+
+def get_recent_result(event, index: int):
+    """按编号（从 1 开始）取回会话最近结果中的作品，返回 (作品, 结果总数)"""
+    session_id = getattr(event, "unified_msg_origin", None)
+    if _recent_results is None or not session_id:
+        return None, 0
+    return _recent_results.get(session_id, index), _recent_results.size(session_id)
+
+
+def _qualities_to_try(original: bool = False):
+    """
+    按配置返回图片质量的尝试顺序。
+    渐进发送模式下首次发送不使用原图，原图由 /pixiv_original 按需获取。
+    """
+    if original:
+        return list(QUALITY_PREFERENCE)
+    start_index = (
+        QUALITY_PREFERENCE.index(_config.image_quality)
+        if _config.image_quality in QUALITY_PREFERENCE
+        else 0
+    )
+    if getattr(_config, "progressive_delivery", False):
+        start_index = max(start_index, 1)
+    return list(QUALITY_PREFERENCE[start_index:])
+
+
+def _releases_temp_files(func):
+    """
+    装饰发送生成器：每条结果被平台发送、生成器恢复执行后释放其引用的临时文件。
+    需要延后发送的调用方应在继续迭代前调用 hold_message_files。
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async for result in func(*args, **kwargs):
+            yield result
+            release_message_files(result)
+
+    return wrapper
+
+
+def _relay_active() -> bool:
+    """url/byte 发送方式下，图片是否改由本地中转服务提供"""
+    return bool(
+        _image_relay
+        and _image_relay.running
+        and _config
+        and _config.image_send_method in ("url", "byte")
+    )
 
 
 def get_proxied_image_url(original_url: str, use_proxy: bool = True) -> str:
@@ -139,6 +244,7 @@ def _build_image_from_url(url: str) -> Optional[Image]:
     """
         根据 URL 构建 Image 组件（不下载图片，直接通过 URL 发送）。
     仅当 image_send_method="url" 时可用，将反代后的 URL 直接传给 Image.fromURL()。
+    启用本地图片中转服务时改为交给适配器内网中转 URL，由插件下载一次后从磁盘提供。
 
 
         Args:
@@ -149,6 +255,8 @@ def _build_image_from_url(url: str) -> Optional[Image]:
     """
     if not url:
         return None
+    if _relay_active() and _image_relay.accepts_remote(url):
+        return Image.fromURL(_image_relay.register_remote(url))
     # URL 发送由平台侧拉取图片，不会复用插件下载代理；这里按配置独立控制反代
     use_image_proxy = bool(getattr(_config, "use_image_proxy", True)) if _config else True
     actual_url = get_proxied_image_url(url, use_proxy=use_image_proxy)
@@ -338,32 +446,35 @@ async def _maybe_compress_image_with_pil(img_data: bytes, ext: str = ".jpg") ->
         return img_data
 
 
-async def _build_image_from_bytes(img_data: bytes, ext: str = ".jpg") -> Image:
+async def _build_image_from_bytes(
+    img_data: bytes, ext: str = ".jpg", compress: bool = True
+) -> Image:
     """
     根据 image_send_method 配置，从字节数据构建 Image 组件。
 
     - image_send_method="file": 将图片字节写入临时文件，使用 Image.fromFileSystem() 发送（file:/// 协议）
     - image_send_method="byte": 使用 Image.fromBytes() 发送（base64:// 协议）
+    - 启用本地图片中转服务时（url/byte）：写入中转目录，以内网 URL 发送，不做 base64 编码
 
     Args:
         img_data: 图片字节数据
         ext: 文件扩展名，默认 ".jpg"
+        compress: 是否按配置进行本地 PIL 压缩；调用方已压缩时传 False
 
     Returns:
         构建好的 Image 组件
     """
     # 仅在 file/byte 路径中按配置启用本地 PIL 压缩
-    if _config and _config.image_send_method in ("file", "byte"):
+    if compress and _config and _config.image_send_method in ("file", "byte"):
         img_data = await _maybe_compress_image_with_pil(img_data, ext=ext)
 
-    if _config and _config.image_send_method == "file" and _temp_dir:
-        # 写入临时文件，通过文件路径发送
-        file_name = f"pixiv_{uuid.uuid4().hex}{ext}"
-        file_path = Path(_temp_dir) / file_name
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(img_data)
+    if _config and _config.image_send_method == "file" and _temp_files is not None:
+        # 写入登记的临时文件，通过文件路径发送；消息发送完成后释放
+        file_path = await _temp_files.write(img_data, ext=ext)
         logger.debug(f"Pixiv 插件：使用文件路径发送图片 - {file_path}")
         return Image.fromFileSystem(str(file_path))
+    elif _relay_active():
+        return Image.fromURL(await _image_relay.register_bytes(img_data, ext=ext))
     else:
         # 直接使用 base64 发送
         return Image.fromBytes(img_data)
@@ -496,6 +607,7 @@ async def authenticate(client: AppPixivAPI) -> bool:
         return False
 
 
+@_releases_temp_files
 async def send_pixiv_image(
     client: AppPixivAPI,
     event: Any,
@@ -503,23 +615,25 @@ async def send_pixiv_image(
     detail_message: str = None,
     show_details: bool = True,
     send_all_pages: bool = False,
+    page: Optional[int] = None,
+    original: bool = False,
 ):
     """
     通用Pixiv图片下载与发送函数。
-    根据`send_all_pages`参数决定是发送多页作品的所有页面还是仅发送第一页。
-    自动选择最佳图片链接（original>large>medium），采用本地文件缓存，自动清理缓存目录，发送后删除临时文件。
+    根据`send_all_pages`参数决定是发送多页作品的所有页面还是仅发送第一页，
+    `page` 指定时只发送该页（从 1 开始）。
+    自动选择最佳图片链接（original>large>medium），file 发送方式下的临时文件在发送后释放。
+    `original` 为 True 时从原图开始尝试，并优先使用渐进发送预取的原图缓存。
     """
-    # 检查是否为动图
+    # 检查是否为动图；使用未装饰的版本，临时文件由本函数统一释放
     if hasattr(illust, "type") and illust.type == "ugoira":
         logger.info(f"Pixiv 插件：检测到动图作品 - ID: {illust.id}")
-        async for result in send_ugoira(
+        async for result in send_ugoira.__wrapped__(
             client, event, illust, detail_message, show_details=show_details
         ):
             yield result
         return
 
-    await smart_clean_temp_dir(_temp_dir, probability=0.1, max_files=20)
-
     url_sources = []  # 元组列表: (url_object, detail_message_for_page)
 
     # 辅助类，用于统一单页插画的URL结构
@@ -529,11 +643,14 @@ async def send_pixiv_image(
             self.large = getattr(illust.image_urls, "large", None)
             self.medium = getattr(illust.image_urls, "medium", None)
 
-    if send_all_pages and illust.page_count > 1:
-        for i, page in enumerate(illust.meta_pages):
+    if page is not None and illust.page_count > 1:
+        page_detail = f"第 {page}/{illust.page_count} 页\n{detail_message or ''}"
+        url_sources.append((illust.meta_pages[page - 1].image_urls, page_detail))
+    elif send_all_pages and illust.page_count > 1:
+        for i, page_info in enumerate(illust.meta_pages):
             page_detail = f"第 {i + 1}/{illust.page_count} 页\n{detail_message or ''}"
-            # 对于多页作品，page.image_urls 包含 original, large, medium
-            url_sources.append((page.image_urls, page_detail))
+            # 对于多页作品，page_info.image_urls 包含 original, large, medium
+            url_sources.append((page_info.image_urls, page_detail))
     else:
         if illust.page_count > 1:
             # 多页作品的第一页
@@ -543,15 +660,8 @@ async def send_pixiv_image(
             url_obj = SinglePageUrls(illust)
         url_sources.append((url_obj, detail_message))
 
+    qualities_to_try = _qualities_to_try(original)
     for url_obj, msg in url_sources:
-        quality_preference = ["original", "large", "medium"]
-        start_index = (
-            quality_preference.index(_config.image_quality)
-            if _config.image_quality in quality_preference
-            else 0
-        )
-        qualities_to_try = quality_preference[start_index:]
-
         image_sent_for_source = False
         for quality in qualities_to_try:
             image_url = getattr(url_obj, quality, None)
@@ -573,7 +683,12 @@ async def send_pixiv_image(
 
                 # URL 发送不可用或配置为文件发送，则下载后发送
                 async with aiohttp.ClientSession() as session:
-                    img_data = await download_image(session, image_url)
+                    img_data = None
+                    if original and quality == "original" and _original_cache_enabled():
+                        # 渐进发送模式下优先使用后台预取的原图
+                        img_data = await _recent_results.fetch_original(image_url)
+                    if not img_data:
+                        img_data = await download_image(session, image_url)
                     if img_data:
                         img_comp = await _build_image_from_bytes(img_data)
                         if show_details and msg:
@@ -596,6 +711,7 @@ async def send_pixiv_image(
             yield event.plain_result(f"图片下载失败，仅发送信息：\n{msg or ''}")
 
 
+@_releases_temp_files
 async def send_ugoira(
     client: AppPixivAPI,
     event: Any,
@@ -607,9 +723,6 @@ async def send_ugoira(
     处理动图（ugoira）的下载和发送，优先转换为GIF格式
     """
 
-    # 在处理新的动图之前，先清理可能存在的旧文件
-    await smart_clean_temp_dir(_temp_dir, probability=0.1, max_files=20)
-
     try:
         async with aiohttp.ClientSession() as session:
             # 使用通用函数处理动图
@@ -641,6 +754,68 @@ async def send_ugoira(
         yield event.plain_result(f"处理动图时发生错误: {str(e)}")
 
 
+def _thumbnail_url(illust) -> Optional[str]:
+    """拼图使用的缩略图地址：优先 square_medium，精简记录中不保留时退回 medium"""
+    image_urls = getattr(illust, "image_urls", None)
+    for key in ("square_medium", "medium", "large"):
+        url = getattr(image_urls, key, None)
+        if url:
+            return url
+    return None
+
+
+@_releases_temp_files
+async def send_collage(client, event, illusts, captions=None, footer=None):
+    """
+    并发下载缩略图并拼成一张带编号的网格图发送，附带编号与作品的对应列表
+
+    Args:
+        illusts: 作品列表，编号从 1 开始
+        captions: 每格的说明文字，默认使用作品标题
+        footer: 列表末尾的提示文字
+    """
+    if captions is None:
+        captions = [getattr(illust, "title", "") or "" for illust in illusts]
+
+    headers = {"Referer": "https://www.pixiv.net/"}
+    semaphore = asyncio.Semaphore(COLLAGE_DOWNLOAD_CONCURRENCY)
+
+    async with aiohttp.ClientSession() as session:
+
+        async def fetch(illust):
+            url = _thumbnail_url(illust)
+            if not url:
+                return None
+            async with semaphore:
+                return await download_image(session, url, headers)
+
+        thumbnails = await asyncio.gather(*(fetch(illust) for illust in illusts))
+
+    cells = [
+        CollageCell(thumbnail, caption, f"ID: {getattr(illust, 'id', '')}")
+        for illust, thumbnail, caption in zip(illusts, thumbnails, captions)
+    ]
+    lines = [
+        f"{index}. {caption} (ID: {getattr(illust, 'id', '')})"
+        for index, (illust, caption) in enumerate(zip(illusts, captions), 1)
+    ]
+    if footer:
+        lines.append(footer)
+
+    try:
+        collage_data = await asyncio.to_thread(render_collage, cells)
+    except Exception as e:
+        logger.error(f"Pixiv 插件：渲染拼图失败 - {e}")
+        yield event.plain_result("\n".join(lines))
+        return
+
+    logger.info(
+        f"Pixiv 插件：拼图渲染完成，{len(cells)} 格，{len(collage_data) // 1024}KB"
+    )
+    img_comp = await _build_image_from_bytes(collage_data, ext=".jpg", compress=False)
+    yield event.chain_result([img_comp, Plain("\n".join(lines))])
+
+
 async def _convert_ugoira_to_gif(zip_data, metadata, safe_title, illust_id):
     """
     将动图ZIP文件转换为GIF格式
@@ -661,7 +836,7 @@ async def _convert_ugoira_to_gif(zip_data, metadata, safe_title, illust_id):
             return None
 
         # 创建临时目录
-        temp_dir = tempfile.mkdtemp(prefix=f"pixiv_ugoira_{illust_id}_", dir=_temp_dir)
+        temp_dir = await _temp_files.mkdtemp(prefix=f"pixiv_ugoira_{illust_id}_")
 
         # 解压ZIP文件
         zip_path = Path(temp_dir) / f"{safe_title}_{illust_id}.zip"
@@ -781,12 +956,237 @@ async def _convert_ugoira_to_gif(zip_data, metadata, safe_title, illust_id):
         return None
     finally:
         if temp_dir:
-            try:
-                await asyncio.to_thread(shutil.rmtree, temp_dir, True)
-            except Exception as e:
-                logger.warning(f"Pixiv 插件：清理动图临时目录失败 - {e}")
+            await _temp_files.discard(temp_dir)
+
+
+def _embeds_image_bytes() -> bool:
+    """图片是否以 base64 形式内嵌在消息中（与 _build_image_from_bytes 的分支一致）"""
+    if _config and _config.image_send_method == "file" and _temp_dir:
+        return False
+    return not _relay_active()
+
+
+def _base64_size(size: int) -> int:
+    """字节数据编码为 base64 后的长度"""
+    return (size + 2) // 3 * 4
+
+
+def _text_size(texts) -> int:
+    """文字段编码后的总字节数"""
+    return sum(len(t.encode()) for t in texts if t)
+
+
+def _forward_payload_budget() -> int:
+    """单条转发消息的载荷预算（字节），0 表示不限制；仅在图片内嵌为 base64 时生效"""
+    if not _config or not _embeds_image_bytes():
+        return 0
+    return _normalize_target_kb(getattr(_config, "forward_payload_budget_kb", 0)) * 1024
 
 
+class ForwardBatchBuilder:
+    """
+    将转发节点按节点数与载荷预算分组为多条转发消息
+
+    budget_bytes 为 0 时只按节点数分组；单个节点超出预算时独占一条消息。
+    """
+
+    def __init__(self, max_nodes: int = FORWARD_BATCH_SIZE, budget_bytes: int = 0):
+        self.max_nodes = max(1, max_nodes)
+        self.budget_bytes = max(0, budget_bytes)
+        self._nodes = []
+        self._used = 0
+
+    def add(self, node, size: int) -> Optional[list]:
+        """加入一个节点；当前消息放不下时先返回已组装好的节点列表"""
+        full = None
+        if self._nodes and (
+            len(self._nodes) >= self.max_nodes
+            or (self.budget_bytes and self._used + size > self.budget_bytes)
+        ):
+            full = self.flush()
+        self._nodes.append(node)
+        self._used += size
+        return full
+
+    def flush(self) -> list:
+        """取出当前消息的全部节点"""
+        nodes, self._nodes, self._used = self._nodes, [], 0
+        return nodes
+
+
+async def _fit_image_to_budget(
+    img_data: bytes, limit: int, ext: str = ".jpg"
+) -> Optional[bytes]:
+    """
+    使图片编码后不超过 limit 字节：先按目标大小做 PIL 压缩，仍超出则返回 None。
+    limit 为 0 表示不限制。
+    """
+    if not limit or _base64_size(len(img_data)) <= limit:
+        return img_data
+    target_kb = limit * 3 // 4 // 1024
+    if not PILImage or str(ext).lower() == ".gif" or target_kb < FORWARD_MIN_TARGET_KB:
+        return None
+    quality = _normalize_pil_quality(getattr(_config, "pil_compress_quality", 100))
+    try:
+        compressed = await asyncio.to_thread(
+            _compress_image_with_pil_sync, img_data, quality, target_kb
+        )
+    except Exception as e:
+        logger.warning(f"Pixiv 插件：转发消息图片压缩失败 - {e}")
+        return None
+    if _base64_size(len(compressed)) <= limit:
+        logger.info(
+            f"Pixiv 插件：转发消息图片超出预算，已压缩 {len(img_data) // 1024}KB -> {len(compressed) // 1024}KB"
+        )
+        return compressed
+    return None
+
+
+async def _pipeline_batches(batches, depth: int = FORWARD_PREFETCH_DEPTH):
+    """
+    流水线组装批次：后台任务提前构建后续批次，调用方发送当前批次的同时下一批已在下载。
+    batches 为异步迭代器；队列容量为 depth，已构建但尚未发送的批次数不会超过该值，以限制内存占用。
+    """
+    queue = asyncio.Queue(maxsize=max(1, depth))
+    done = object()
+
+    async def producer():
+        try:
+            async for batch in batches:
+                await queue.put(batch)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(done)
+
+    task = asyncio.create_task(producer())
+    try:
+        while True:
+            result = await queue.get()
+            if result is done:
+                break
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        # 调用方提前结束或出错时停止预取，避免后台继续下载
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def _build_forward_node(client, session, item, nickname: str, budget: int = 0):
+    """
+    下载单个转发条目的图片（或动图）并组装为 Node
+
+    budget > 0 时图片编码后需与文字一起放进该预算：先压缩，仍放不下则降级画质，
+    全部失败时只发送文字。返回 (Node, 节点载荷字节数)。
+    """
+    item_type, img, url_obj, detail_message = item
+    embeds = _embeds_image_bytes()
+    texts = []
+    node_content = []
+    payload = 0
+
+    if item_type == "ugoira":
+        # 使用通用函数处理动图
+        content = await process_ugoira_for_content(client, session, img, detail_message)
+        if content:
+            # 成功获取到GIF内容
+            gif_data = content["gif_data"]
+            ugoira_info = content["ugoira_info"]
+            if _config.show_details and ugoira_info:
+                texts.append(ugoira_info)
+            limit = max(1, budget - _text_size(texts)) if budget else 0
+            gif_data = await _fit_image_to_budget(gif_data, limit, ext=".gif")
+            if gif_data is not None:
+                node_content.append(await _build_image_from_bytes(gif_data, ext=".gif"))
+                payload += _base64_size(len(gif_data)) if embeds else 0
+            else:
+                texts.insert(0, "动图超出转发消息大小限制，仅发送信息")
+        else:
+            texts.append("动图处理失败")
+        node_content.extend(Plain(t) for t in texts)
+        payload += _text_size(texts)
+        return Node(name=nickname, content=node_content), payload
+
+    # 处理普通图片
+    # 使用与普通消息相同的质量降级逻辑
+    qualities_to_try = _qualities_to_try()
+
+    headers = {
+        "Referer": "https://www.pixiv.net/",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    }
+    if _config.show_details:
+        texts.append(detail_message)
+    limit = max(1, budget - _text_size(texts)) if budget else 0
+    image_sent = False
+    too_large = False
+
+    # 按质量优先级尝试下载图片，与普通消息保持一致
+    for quality in qualities_to_try:
+        image_url = getattr(url_obj, quality, None)
+        if not image_url:
+            continue
+
+        logger.info(
+            f"Pixiv 插件：转发消息尝试发送图片，质量: {quality}, URL: {image_url}"
+        )
+        img_data = await download_image(session, image_url, headers)
+        if not img_data:
+            logger.warning(
+                f"Pixiv 插件：转发消息图片下载失败 (质量: {quality})。尝试下一质量..."
+            )
+            continue
+
+        img_data = await _maybe_compress_image_with_pil(img_data)
+        fitted = await _fit_image_to_budget(img_data, limit)
+        if fitted is None:
+            too_large = True
+            logger.warning(
+                f"Pixiv 插件：转发消息图片超出载荷预算 (质量: {quality})。尝试下一质量..."
+            )
+            continue
+
+        # 直接使用字节数据发送图片，避免文件系统路径问题
+        node_content.append(await _build_image_from_bytes(fitted, compress=False))
+        payload += _base64_size(len(fitted)) if embeds else 0
+        image_sent = True
+        break  # 成功下载，跳出质量循环
+
+    if not image_sent:
+        texts.insert(
+            0,
+            "图片超出转发消息大小限制，仅发送信息"
+            if too_large
+            else "图片下载失败，仅发送信息",
+        )
+
+    # 与原先一致：show_details 时即使详情为空也附带文字段
+    node_content.extend(Plain(t) for t in texts)
+    payload += _text_size(texts)
+    return Node(name=nickname, content=node_content), payload
+
+
+async def _assemble_forward_batches(client, session, image_items, nickname: str):
+    """逐个组装节点，按节点数和载荷预算切分为多条转发消息"""
+    builder = ForwardBatchBuilder(FORWARD_BATCH_SIZE, _forward_payload_budget())
+    for item in image_items:
+        node, size = await _build_forward_node(
+            client, session, item, nickname, builder.budget_bytes
+        )
+        full = builder.add(node, size)
+        if full:
+            yield full
+    rest = builder.flush()
+    if rest:
+        yield rest
+
+
+@_releases_temp_files
 async def send_forward_message(
     client: AppPixivAPI,
     event,
@@ -797,11 +1197,10 @@ async def send_forward_message(
     """
     直接下载图片并组装 nodes，避免不兼容消息类型。
     自动检测动图并使用相应的处理方式。
+    每条转发消息最多 FORWARD_BATCH_SIZE 个节点，图片内嵌为 base64 时还受
+    forward_payload_budget_kb 限制；发送当前消息时后台预取后续批次。
     """
-    batch_size = 10
     nickname = "PixivBot"
-    # 在处理转发消息之前，先清理可能存在的旧文件
-    await clean_temp_dir(_temp_dir, max_files=20)
     class SinglePageUrls:
         def __init__(self, illust):
             self.original = getattr(illust.meta_single_page, "original_image_url", None)
@@ -831,73 +1230,15 @@ async def send_forward_message(
                 url_obj = SinglePageUrls(img)
             image_items.append(("image", img, url_obj, detail_message))
 
-    for i in range(0, len(image_items), batch_size):
-        batch_items = image_items[i : i + batch_size]
-        nodes_list = []
-        async with aiohttp.ClientSession() as session:
-            for item_type, img, url_obj, detail_message in batch_items:
-                if item_type == "ugoira":
-                    # 使用通用函数处理动图
-                    content = await process_ugoira_for_content(
-                        client, session, img, detail_message
-                    )
-                    if content:
-                        # 成功获取到GIF内容
-                        gif_data = content["gif_data"]
-                        ugoira_info = content["ugoira_info"]
-                        gif_comp = await _build_image_from_bytes(gif_data, ext=".gif")
-                        node_content = [gif_comp]
-                        if _config.show_details and ugoira_info:
-                            node_content.append(Plain(ugoira_info))
-                    else:
-                        node_content = [Plain("动图处理失败")]
-                else:
-                    # 处理普通图片
-                    # 使用与普通消息相同的质量降级逻辑
-                    quality_preference = ["original", "large", "medium"]
-                    start_index = (
-                        quality_preference.index(_config.image_quality)
-                        if _config.image_quality in quality_preference
-                        else 0
-                    )
-                    qualities_to_try = quality_preference[start_index:]
-
-                    headers = {
-                        "Referer": "https://www.pixiv.net/",
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                    }
-                    node_content = []
-                    image_sent = False
-
-                    # 按质量优先级尝试下载图片，与普通消息保持一致
-                    for quality in qualities_to_try:
-                        image_url = getattr(url_obj, quality, None)
-                        if not image_url:
-                            continue
-
-                        logger.info(
-                            f"Pixiv 插件：转发消息尝试发送图片，质量: {quality}, URL: {image_url}"
-                        )
-                        img_data = await download_image(session, image_url, headers)
-                        if img_data:
-                            # 直接使用字节数据发送图片，避免文件系统路径问题
-                            img_comp = await _build_image_from_bytes(img_data)
-                            node_content.append(img_comp)
-                            image_sent = True
-                            break  # 成功下载，跳出质量循环
-                        else:
-                            logger.warning(
-                                f"Pixiv 插件：转发消息图片下载失败 (质量: {quality})。尝试下一质量..."
-                            )
-
-                    if not image_sent:
-                        node_content.append(Plain("图片下载失败，仅发送信息"))
-
-                    if _config.show_details:
-                        node_content.append(Plain(detail_message))
-
-                node = Node(name=nickname, content=node_content)
-                nodes_list.append(node)
-        if nodes_list:
-            nodes_obj = Nodes(nodes=nodes_list)
-            yield event.chain_result([nodes_obj])
+    async with aiohttp.ClientSession() as session:
+        pipeline = _pipeline_batches(
+            _assemble_forward_batches(client, session, image_items, nickname)
+        )
+        try:
+            async for nodes_list in pipeline:
+                if nodes_list:
+                    nodes_obj = Nodes(nodes=nodes_list)
+                    yield event.chain_result([nodes_obj])
+        finally:
+            # 确保预取任务在会话关闭前结束
+            await pipeline.aclose()
@@ -0,0 +1,41 @@
+"""
+poll_schedule.py
+订阅自适应检查间隔的估算：根据画师近期作品的发布时间推算下次检查前的等待时长。
+纯计算模块，不依赖 AstrBot 与 Pixiv 客户端。
+"""
+
+from datetime import datetime
+
+# 自适应检查：预计发布间隔不超过该值（分钟）的画师视为活跃，始终按最短间隔检查
+POLL_ACTIVE_GAP_MINUTES = 7 * 24 * 60
+# 自适应检查：参与估算的最近作品数
+POLL_ESTIMATE_SAMPLE = 10
+
+
+def estimate_poll_interval(
+    create_dates: list, min_minutes: int, max_minutes: int, now: datetime = None
+) -> int:
+    """
+    根据画师最近作品的发布时间估算检查间隔（分钟）
+
+    取最近几次发布间隔的中位数与距上次发布的时间中较大者作为预计发布间隔。
+    预计间隔不超过 POLL_ACTIVE_GAP_MINUTES 的活跃画师按 min_minutes 检查，
+    更不活跃的画师按预计间隔超出活跃阈值的倍数放宽，最长 max_minutes。
+    """
+    now = now or datetime.now()
+    dates = sorted((d for d in create_dates if d), reverse=True)[:POLL_ESTIMATE_SAMPLE]
+    if not dates:
+        return max_minutes
+
+    gaps = sorted(
+        (newer - older).total_seconds() / 60 for newer, older in zip(dates, dates[1:])
+    )
+    since_last = max(0.0, (now - dates[0]).total_seconds() / 60)
+    expected_gap = since_last
+    if gaps:
+        expected_gap = max(gaps[len(gaps) // 2], since_last)
+
+    if expected_gap <= POLL_ACTIVE_GAP_MINUTES:
+        return min_minutes
+    interval = int(min_minutes * expected_gap / POLL_ACTIVE_GAP_MINUTES)
+    return max(min_minutes, min(max_minutes, interval))
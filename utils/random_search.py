@@ -1,5 +1,6 @@
 import asyncio
 import random
+import time
 from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from astrbot.api import logger
@@ -10,13 +11,23 @@ from .database import (
     get_random_tags,
     filter_sent_illusts,
     add_sent_illust,
-    cleanup_old_sent_illusts,
+    delete_old_sent_illusts_chunk,
+    delete_stale_illust_metadata_chunk,
+    delete_orphan_tag_reservoir_rows,
+    convert_to_incremental_auto_vacuum,
+    incremental_vacuum_step,
+    get_database_file_size,
     get_schedule_time,
     set_schedule_time,
     remove_schedule_time,
     get_all_schedule_times,
     get_all_random_ranking_groups,
     get_random_rankings,
+    search_illust_metadata,
+    get_tag_reservoir_state,
+    save_tag_reservoir,
+    load_tag_reservoir,
+    delete_old_ranking_cache,
 )
 from .tag import (
     build_detail_message,
@@ -24,7 +35,25 @@ from .tag import (
     validate_and_process_tags,
     process_and_send_illusts,
 )
-from .pixiv_utils import send_pixiv_image, send_forward_message
+from .pixiv_utils import (
+    send_pixiv_image,
+    send_forward_message,
+    hold_message_files,
+    release_message_files,
+)
+from .ranking_store import RANKING_MAX_ENTRIES
+
+# 过期记录清理：每批删除的行数、每步回收的空闲页数，以及批次之间让出的时间
+CLEANUP_CHUNK_SIZE = 500
+CLEANUP_VACUUM_PAGES = 256
+CLEANUP_PAUSE_SECONDS = 0.2
+# 排行榜缓存保留天数
+RANKING_CACHE_RETENTION_DAYS = 7
+# 标签候选池：重新按热度深度搜索的间隔（天），以及增量刷新的最大翻页数
+RESERVOIR_RERANK_DAYS = 7
+RESERVOIR_REFRESH_MAX_PAGES = 3
+# 提前准备的推送在提前量之外额外允许保留的时间（分钟），超过后视为过期重新准备
+PREPARED_PUSH_GRACE_MINUTES = 10
 
 
 class RandomSearchService:
@@ -37,19 +66,29 @@ class RandomSearchService:
         self.scheduler = AsyncIOScheduler(timezone="Asia/Shanghai")
         self.job = None
         # 使用数据库存储调度时间，不再使用内存字典
-        # 防止并发执行的锁: {chat_id: bool}
+        # 防止同一群组并发执行的锁: {chat_id: asyncio.Lock}
         self.execution_locks = {}
 
-        self.global_execution_lock = asyncio.Lock()  # 全局执行锁
-        self.task_queue = asyncio.Queue()  # 任务队列
-        self.is_queue_processor_running = False  # 队列处理器运行状态
-        self._queue_processor_task: asyncio.Task | None = None
+        # 任务队列: (群组ID, 是否为提前准备任务)
+        self.task_queue = asyncio.Queue()
+        self._queued_chats = set()  # 已在队列中等待的群组，保证每个群组最多占一个位置
+        self._queued_prefetches = set()  # 已在队列中等待提前准备推送的群组
+        self._worker_tasks: list[asyncio.Task] = []  # 并行的队列处理器
         self._is_running = False
+        # 提前准备好的推送: {chat_id: (准备完成时间, session_id, [(消息链, 作品ID列表), ...])}
+        self._prepared_pushes = {}
+        # 正在队列处理器中执行的提前准备任务，配置变化时取消
+        self._prefetch_tasks: dict[str, asyncio.Task] = {}
+        # 同一搜索词的候选池同一时间只刷新一次: {search_tags: asyncio.Lock}
+        self._candidate_pool_locks = {}
+        # 启动后首次 tick 需要把停机期间已过期的群组错开，避免重启后集中执行
+        self._stagger_overdue_on_boot = False
 
     def start(self):
         """启动后台任务"""
         if not self.scheduler.running:
             self._is_running = True
+            self._stagger_overdue_on_boot = True
             self.job = self.scheduler.add_job(
                 self._scheduler_tick,
                 "interval",
@@ -85,16 +124,63 @@ class RandomSearchService:
             self.scheduler.shutdown()
             logger.info("Pixiv 随机搜索服务已停止。")
 
-        if self._queue_processor_task and not self._queue_processor_task.done():
-            self._queue_processor_task.cancel()
+        for task in self._worker_tasks:
+            if not task.done():
+                task.cancel()
+        for task in self._worker_tasks:
             try:
-                await self._queue_processor_task
+                await task
             except asyncio.CancelledError:
                 pass
             except Exception as e:
                 logger.error(f"等待随机搜索队列处理器停止时出错: {e}")
-        self._queue_processor_task = None
-        self.is_queue_processor_running = False
+        self._worker_tasks = []
+        for chat_id in set(self._prefetch_tasks) | set(self._prepared_pushes):
+            self._discard_prepared_push(chat_id)
+
+    def _get_execution_lock(self, chat_id: str) -> asyncio.Lock:
+        """获取指定群组的执行锁"""
+        lock = self.execution_locks.get(chat_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.execution_locks[chat_id] = lock
+        return lock
+
+    def _ensure_workers(self):
+        """按配置的并行数补齐队列工作协程"""
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        worker_count = max(1, int(self.pixiv_config.random_search_worker_count))
+        started = 0
+        while len(self._worker_tasks) < worker_count:
+            self._worker_tasks.append(
+                asyncio.create_task(self._task_queue_processor(len(self._worker_tasks)))
+            )
+            started += 1
+        if started:
+            logger.info(f"RandomSearchService 已启动 {started} 个队列处理器")
+
+    async def _enqueue_group(self, chat_id: str) -> bool:
+        """将群组加入执行队列；已在队列中或正在执行的群组不重复加入"""
+        if chat_id in self._queued_chats or self._get_execution_lock(chat_id).locked():
+            return False
+        self._queued_chats.add(chat_id)
+        await self.task_queue.put((chat_id, False))
+        return True
+
+    async def _enqueue_prefetch(self, chat_id: str) -> bool:
+        """将群组的提前准备任务加入执行队列，与正式推送共用队列处理器、执行锁与超时"""
+        if self.pixiv_config.random_search_prefetch_lead_minutes <= 0:
+            return False
+        if (
+            chat_id in self._prepared_pushes
+            or chat_id in self._queued_prefetches
+            or chat_id in self._queued_chats
+            or self._get_execution_lock(chat_id).locked()
+        ):
+            return False
+        self._queued_prefetches.add(chat_id)
+        await self.task_queue.put((chat_id, True))
+        return True
 
     async def _scheduler_tick(self):
         """
@@ -105,16 +191,7 @@ class RandomSearchService:
 
         try:
             # 启动队列处理器（如果尚未运行）
-            if (
-                not self._queue_processor_task
-                or self._queue_processor_task.done()
-                or not self.is_queue_processor_running
-            ):
-                self._queue_processor_task = asyncio.create_task(
-                    self._task_queue_processor()
-                )
-                self.is_queue_processor_running = True
-                logger.info("RandomSearchService 队列处理器已启动")
+            self._ensure_workers()
 
             # 获取所有配置了标签的群组
             # groups = get_all_random_search_groups()
@@ -125,12 +202,12 @@ class RandomSearchService:
             now = datetime.now()
 
             pending_groups = []
+            staggered_count = 0
+            # 停机期间过期的群组在最短间隔内随机错开，而不是启动后立即全部执行
+            stagger_seconds = max(1, self.pixiv_config.random_search_min_interval) * 60
+            prefetch_lead = self.pixiv_config.random_search_prefetch_lead_minutes
 
             for chat_id in groups:
-                # 初始化执行锁
-                if chat_id not in self.execution_locks:
-                    self.execution_locks[chat_id] = False
-
                 # 从数据库获取下次执行时间
                 next_execution_time = get_schedule_time(chat_id)
 
@@ -151,100 +228,279 @@ class RandomSearchService:
                     )
                     continue
 
-                # 检查是否到了运行时间且当前没有执行任务
-                if now >= next_execution_time and not self.execution_locks[chat_id]:
-                    pending_groups.append(chat_id)
+                if self._stagger_overdue_on_boot and now >= next_execution_time:
+                    next_execution_time = now + timedelta(
+                        seconds=random.uniform(0, stagger_seconds)
+                    )
+                    set_schedule_time(chat_id, next_execution_time)
+                    staggered_count += 1
+                    continue
+
+                # 检查是否到了运行时间
+                if now >= next_execution_time:
+                    pending_groups.append((next_execution_time, chat_id))
+                elif now >= next_execution_time - timedelta(minutes=prefetch_lead):
+                    await self._enqueue_prefetch(chat_id)
 
-            # 将所有待执行的群组加入队列
-            for chat_id in pending_groups:
+            if self._stagger_overdue_on_boot:
+                self._stagger_overdue_on_boot = False
+                if staggered_count:
+                    logger.info(
+                        f"启动后有 {staggered_count} 个群组的随机搜索已过期，"
+                        f"将在 {stagger_seconds // 60} 分钟内错开执行"
+                    )
+
+            # 按到期时间先后加入队列，等待最久的群组最先执行
+            for _, chat_id in sorted(pending_groups):
                 try:
-                    await self.task_queue.put(chat_id)
-                    logger.info(f"群组 {chat_id}: 已加入随机搜索队列")
+                    if await self._enqueue_group(chat_id):
+                        logger.info(f"群组 {chat_id}: 已加入随机搜索队列")
                 except Exception as e:
                     logger.error(f"将群组 {chat_id} 加入队列失败: {e}")
 
         except Exception as e:
             logger.error(f"RandomSearchService 调度器 tick 出错: {e}")
 
-    async def _task_queue_processor(self):
+    async def _task_queue_processor(self, worker_id: int = 0):
         """
-        任务队列处理器，按顺序执行队列中的搜索任务。
+        任务队列处理器，多个处理器并行执行不同群组的搜索任务。
         """
-        logger.info("RandomSearchService 任务队列处理器开始运行")
-        try:
-            while self._is_running:
-                try:
-                    # 从队列中获取群组ID（阻塞等待）
-                    chat_id = await self.task_queue.get()
-
-                    # 使用全局锁确保同时只有一个任务执行
-                    async with self.global_execution_lock:
-                        # 再次检查群组是否仍在执行状态
-                        if self.execution_locks.get(chat_id, False):
-                            logger.warning(f"群组 {chat_id} 已在执行状态，跳过本次任务")
-                            self.task_queue.task_done()
-                            continue
+        logger.info(f"RandomSearchService 任务队列处理器 #{worker_id} 开始运行")
+        while self._is_running:
+            try:
+                # 从队列中获取群组ID（阻塞等待）
+                chat_id, is_prefetch = await self.task_queue.get()
+                if is_prefetch:
+                    # 排队期间已被丢弃（配置变化或暂停）的提前准备任务直接跳过
+                    if chat_id not in self._queued_prefetches:
+                        self.task_queue.task_done()
+                        continue
+                    self._queued_prefetches.discard(chat_id)
+                else:
+                    self._queued_chats.discard(chat_id)
 
-                        # 设置执行锁
-                        self.execution_locks[chat_id] = True
+                lock = self._get_execution_lock(chat_id)
+                if lock.locked():
+                    logger.warning(f"群组 {chat_id} 已在执行状态，跳过本次任务")
+                    self.task_queue.task_done()
+                    continue
 
+                if is_prefetch:
+                    async with lock:
                         try:
-                            logger.info(f"开始执行群组 {chat_id} 的随机搜索")
-                            await self.execute_search_for_group(chat_id)
-
-                            # 调度下次运行
-                            now = datetime.now()
-                            min_interval = self.pixiv_config.random_search_min_interval
-                            max_interval = self.pixiv_config.random_search_max_interval
-                            # 基本验证确保 max >= min
-                            if max_interval < min_interval:
-                                max_interval = min_interval
-
-                            next_interval = random.randint(min_interval, max_interval)
-                            new_execution_time = now + timedelta(minutes=next_interval)
-                            set_schedule_time(chat_id, new_execution_time)
-                            logger.info(
-                                f"群组 {chat_id}: 随机搜索已执行。下次运行在 {next_interval} 分钟后。"
-                            )
-
-                        except Exception as e:
-                            logger.error(f"执行群组 {chat_id} 的随机搜索时出错: {e}")
+                            await self._run_prefetch(chat_id)
                         finally:
-                            # 释放执行锁
-                            self.execution_locks[chat_id] = False
                             self.task_queue.task_done()
+                    continue
 
-                except asyncio.CancelledError:
-                    logger.info("RandomSearchService 任务队列处理器被取消")
-                    break
-                except Exception as e:
-                    logger.error(f"RandomSearchService 任务队列处理器出错: {e}")
-                    # 短暂延迟后继续处理下一个任务
-                    await asyncio.sleep(5)
-        finally:
-            self.is_queue_processor_running = False
-            self._queue_processor_task = None
+                async with lock:
+                    try:
+                        logger.info(f"开始执行群组 {chat_id} 的随机搜索")
+                        timeout = self.pixiv_config.random_search_job_timeout_seconds
+                        try:
+                            await asyncio.wait_for(
+                                self.execute_search_for_group(chat_id),
+                                timeout=timeout,
+                            )
+                        except asyncio.TimeoutError:
+                            logger.warning(
+                                f"群组 {chat_id} 的随机搜索超过 {timeout} 秒未完成，已取消"
+                            )
+
+                        # 调度下次运行
+                        now = datetime.now()
+                        min_interval = self.pixiv_config.random_search_min_interval
+                        max_interval = self.pixiv_config.random_search_max_interval
+                        # 基本验证确保 max >= min
+                        if max_interval < min_interval:
+                            max_interval = min_interval
+
+                        next_interval = random.randint(min_interval, max_interval)
+                        new_execution_time = now + timedelta(minutes=next_interval)
+                        set_schedule_time(chat_id, new_execution_time)
+                        logger.info(
+                            f"群组 {chat_id}: 随机搜索已执行。下次运行在 {next_interval} 分钟后。"
+                        )
+
+                    except Exception as e:
+                        logger.error(f"执行群组 {chat_id} 的随机搜索时出错: {e}")
+                    finally:
+                        self.task_queue.task_done()
+
+            except asyncio.CancelledError:
+                logger.info(f"RandomSearchService 任务队列处理器 #{worker_id} 被取消")
+                break
+            except Exception as e:
+                logger.error(f"RandomSearchService 任务队列处理器出错: {e}")
+                # 短暂延迟后继续处理下一个任务
+                await asyncio.sleep(5)
 
     async def _cleanup_task(self):
-        """定期清理过期记录的任务"""
+        """定期清理过期记录的任务：分批删除并增量回收空间，避免长时间占用写锁"""
         try:
             logger.info("开始清理过期的已发送作品记录...")
-            # 获取配置
-            days = self.pixiv_config.random_sent_illust_retention_days
+            started_at = time.monotonic()
+            size_before = await asyncio.to_thread(get_database_file_size)
+            now = datetime.now()
 
-            # 使用 to_thread 防止数据库操作阻塞异步循环
-            await asyncio.to_thread(cleanup_old_sent_illusts, days=days)
-            logger.info("清理过期记录任务完成。")
+            sent_cutoff = now - timedelta(
+                days=self.pixiv_config.random_sent_illust_retention_days
+            )
+            removed_sent = await self._delete_in_chunks(
+                delete_old_sent_illusts_chunk, sent_cutoff
+            )
+
+            removed_meta = 0
+            if self.pixiv_config.illust_cache_enabled:
+                meta_cutoff = now - timedelta(
+                    days=self.pixiv_config.illust_cache_retention_days
+                )
+                removed_meta = await self._delete_in_chunks(
+                    delete_stale_illust_metadata_chunk, meta_cutoff
+                )
+            # 候选池只保存作品ID，元数据已不存在的条目无法再被抽取
+            removed_orphans = await asyncio.to_thread(delete_orphan_tag_reservoir_rows)
+
+            removed_ranking = await asyncio.to_thread(
+                delete_old_ranking_cache,
+                now - timedelta(days=RANKING_CACHE_RETENTION_DAYS),
+            )
+
+            # 旧数据库首次清理时完成 auto_vacuum 模式切换，此后改为增量回收
+            converted = await asyncio.to_thread(convert_to_incremental_auto_vacuum)
+
+            # 分步回收空闲页，每步之间让出事件循环
+            reclaimed_pages = 0
+            while self._is_running:
+                freed = await asyncio.to_thread(
+                    incremental_vacuum_step, CLEANUP_VACUUM_PAGES
+                )
+                if freed <= 0:
+                    break
+                reclaimed_pages += freed
+                await asyncio.sleep(CLEANUP_PAUSE_SECONDS)
+
+            size_after = await asyncio.to_thread(get_database_file_size)
+            elapsed = time.monotonic() - started_at
+            logger.info(
+                f"清理过期记录任务完成：删除已发送记录 {removed_sent} 条、作品缓存 {removed_meta} 条、"
+                f"失效候选池作品 {removed_orphans} 条、"
+                f"排行榜缓存 {removed_ranking} 条，"
+                f"{'完成 auto_vacuum 模式切换，' if converted else ''}"
+                f"回收 {reclaimed_pages} 页，耗时 {elapsed:.2f} 秒，"
+                f"数据库大小 {size_before / 1024:.0f}KB -> {size_after / 1024:.0f}KB"
+            )
         except Exception as e:
             logger.error(f"清理过期记录任务出错: {e}")
 
+    async def _delete_in_chunks(self, delete_chunk_func, cutoff: datetime) -> int:
+        """循环调用分批删除函数直到没有过期数据，批次之间让出事件循环"""
+        total = 0
+        while self._is_running:
+            # 使用 to_thread 防止数据库操作阻塞异步循环
+            deleted = await asyncio.to_thread(
+                delete_chunk_func, cutoff, CLEANUP_CHUNK_SIZE
+            )
+            total += deleted
+            if deleted < CLEANUP_CHUNK_SIZE:
+                break
+            await asyncio.sleep(CLEANUP_PAUSE_SECONDS)
+        return total
+
+    async def _run_prefetch(self, chat_id: str):
+        """
+        在队列处理器中执行提前准备，受执行锁与 random_search_job_timeout_seconds 约束。
+        超时或被取消时准备任务随之取消，不会在之后写入已准备的推送。
+        """
+        timeout = self.pixiv_config.random_search_job_timeout_seconds
+        task = asyncio.create_task(self._prefetch_group(chat_id))
+        self._prefetch_tasks[chat_id] = task
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+            if not done:
+                logger.warning(
+                    f"群组 {chat_id} 提前准备随机推送超过 {timeout} 秒未完成，已取消"
+                )
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.wait({task})
+            if self._prefetch_tasks.get(chat_id) is task:
+                del self._prefetch_tasks[chat_id]
+
+    async def _prefetch_group(self, chat_id: str):
+        """选图、下载压缩图片并构建消息链，结果保存到 _prepared_pushes"""
+        try:
+            logger.info(f"群组 {chat_id}: 开始提前准备随机推送")
+            prepared = await self.prepare_push_for_group(chat_id)
+            if prepared:
+                self._prepared_pushes[chat_id] = (datetime.now(), *prepared)
+                logger.info(
+                    f"群组 {chat_id}: 随机推送已准备完成，共 {len(prepared[1])} 条消息"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"群组 {chat_id} 提前准备随机推送时出错: {e}")
+
+    async def _take_prepared_push(self, chat_id: str):
+        """取出群组已准备好的推送，过期的结果会被丢弃"""
+        # 提前准备与正式推送持有同一执行锁，这里不会有进行中的准备任务
+        self._queued_prefetches.discard(chat_id)
+        prepared = self._prepared_pushes.pop(chat_id, None)
+        if not prepared:
+            return None
+        prepared_at, session_id, messages = prepared
+        max_age = timedelta(
+            minutes=self.pixiv_config.random_search_prefetch_lead_minutes
+            + PREPARED_PUSH_GRACE_MINUTES
+        )
+        if datetime.now() - prepared_at > max_age:
+            logger.info(f"群组 {chat_id}: 提前准备的推送已过期，重新准备")
+            self._release_messages(messages)
+            return None
+        return session_id, messages
+
+    @staticmethod
+    def _release_messages(messages: list):
+        """释放已准备消息链引用的临时文件"""
+        release_message_files([message_chain for message_chain, _ in messages])
+
+    def _discard_prepared_push(self, chat_id: str):
+        """丢弃群组已准备、排队中或正在准备的推送"""
+        self._queued_prefetches.discard(chat_id)
+        prepared = self._prepared_pushes.pop(chat_id, None)
+        if prepared:
+            self._release_messages(prepared[2])
+        task = self._prefetch_tasks.get(chat_id)
+        if task and not task.done():
+            task.cancel()
+
+    def invalidate_prepared_push(self, chat_id: str):
+        """群组的随机搜索配置变化后丢弃按旧配置准备的推送"""
+        self._discard_prepared_push(chat_id)
+
     async def execute_search_for_group(self, chat_id: str):
-        """为特定群组执行随机搜索（标签或排行榜）"""
+        """为特定群组执行随机搜索（标签或排行榜），优先使用提前准备好的推送"""
+        prepared = await self._take_prepared_push(chat_id)
+        if prepared:
+            logger.info(f"群组 {chat_id}: 使用提前准备好的随机推送")
+        else:
+            prepared = await self.prepare_push_for_group(chat_id)
+        if prepared:
+            await self._deliver_push(chat_id, *prepared)
+
+    async def prepare_push_for_group(self, chat_id: str):
+        """
+        为群组准备一次随机推送（标签或排行榜）
+
+        :return: (session_id, [(消息链, 作品ID列表), ...])，无可推送内容时返回 None
+        """
         tags = get_random_tags(chat_id)
         rankings = get_random_rankings(chat_id)
 
         if not tags and not rankings:
-            return
+            return None
 
         # 随机选择执行标签搜索或排行榜搜索
         all_options = []
@@ -256,12 +512,183 @@ class RandomSearchService:
         selected = random.choice(all_options)
 
         if selected[0] == "tag":
-            await self._execute_tag_search(chat_id, selected[1])
+            return await self._prepare_tag_push(chat_id, selected[1])
         else:
-            await self._execute_ranking_search(chat_id, selected[1])
+            return await self._prepare_ranking_push(chat_id, selected[1])
+
+    async def _deliver_push(self, chat_id: str, session_id: str, messages: list):
+        """发送已构建好的消息链，并记录已发送的作品"""
+        sent_illust_ids = set()
+        for message_chain, related_illust_ids in messages:
+            try:
+                await self.context.send_message(session_id, message_chain)
+                sent_illust_ids.update(related_illust_ids or [])
+                logger.info(f"消息已发送至 {session_id}")
+            except Exception as e:
+                logger.error(f"向 {session_id} 发送消息失败: {e}")
+            finally:
+                release_message_files(message_chain)
+
+        # 记录已发送的作品ID到数据库
+        for illust_id in sent_illust_ids:
+            add_sent_illust(illust_id, chat_id)
+        if sent_illust_ids:
+            logger.info(
+                f"群组 {chat_id}: 已记录 {len(sent_illust_ids)} 个作品的发送记录"
+            )
+
+    @staticmethod
+    def _to_message_chain(message_content):
+        """将 process_and_send_illusts 的输出统一转换为 MessageChain"""
+        if hasattr(message_content, "chain") or isinstance(
+            message_content, MessageChain
+        ):
+            return message_content
+        if isinstance(message_content, list):
+            logger.warning("在 random_search 中收到列表而不是 MessageChain")
+            return None
+        # 尝试字符串转换
+        return MessageChain().message(str(message_content))
+
+    async def _get_tag_candidates(self, search_tags: str, raw_tag: str) -> list:
+        """
+        获取标签的候选作品。候选池持久化在数据库中，由所有群组共享：
+        首次按热度深度搜索填充，之后只按时间倒序增量拉取新作品，
+        并每隔 RESERVOIR_RERANK_DAYS 天重新深度搜索以更新收藏数排序。
+        """
+        lock = self._candidate_pool_locks.setdefault(search_tags, asyncio.Lock())
+        async with lock:
+            state = await asyncio.to_thread(get_tag_reservoir_state, search_tags)
+            now = datetime.now()
+            refresh_minutes = self.pixiv_config.random_search_pool_ttl_minutes
+            fetched = []
+
+            if state is None or state.crawled_at <= now - timedelta(
+                days=RESERVOIR_RERANK_DAYS
+            ):
+                fetched = await self._fetch_tag_candidates(search_tags, raw_tag)
+                if fetched:
+                    await asyncio.to_thread(
+                        save_tag_reservoir, search_tags, fetched, True
+                    )
+            elif state.refreshed_at <= now - timedelta(minutes=refresh_minutes):
+                fetched = await self._fetch_new_tag_illusts(
+                    search_tags, raw_tag, state.newest_illust_id
+                )
+                await asyncio.to_thread(save_tag_reservoir, search_tags, fetched)
+
+            candidates = await asyncio.to_thread(load_tag_reservoir, search_tags)
+            if candidates:
+                logger.info(f"标签 {raw_tag} 的候选池中共有 {len(candidates)} 个作品")
+                return candidates
+            return fetched
+
+    async def _fetch_new_tag_illusts(
+        self, search_tags: str, raw_tag: str, known_illust_id: int
+    ) -> list:
+        """按时间倒序拉取标签的新作品，直到遇到候选池中已知的最新作品为止"""
+        new_illusts = []
+        next_params = {
+            "word": search_tags,
+            "search_target": "partial_match_for_tags",
+            "sort": "date_desc",
+            "filter": "for_ios",
+            "req_auth": True,
+        }
+        for _ in range(RESERVOIR_REFRESH_MAX_PAGES):
+            try:
+                json_result = await self.client_wrapper.call_pixiv_api(
+                    self.client.search_illust, **next_params
+                )
+            except Exception as api_e:
+                logger.warning(f"标签 {raw_tag} 的候选池增量刷新失败: {api_e}")
+                break
+            if not json_result or not getattr(json_result, "illusts", None):
+                break
+
+            reached_known = False
+            for illust in json_result.illusts:
+                if illust.id <= known_illust_id:
+                    reached_known = True
+                    break
+                new_illusts.append(illust)
+            if reached_known or not json_result.next_url:
+                break
+            next_params = self.client.parse_qs(json_result.next_url)
+
+        logger.info(f"标签 {raw_tag} 的候选池增量刷新：新增 {len(new_illusts)} 个作品")
+        return new_illusts
+
+    async def _fetch_tag_candidates(self, search_tags: str, raw_tag: str) -> list:
+        """按 deep_search_depth 深度搜索标签，返回所有页的作品"""
+        # 准备搜索参数，参考 pixiv_deepsearch 的实现
+        search_params = {
+            "word": search_tags,
+            "search_target": "partial_match_for_tags",
+            "sort": "popular_desc",
+            "filter": "for_ios",
+            "req_auth": True,
+        }
+
+        # 执行深度搜索，完全参考 pixiv_deepsearch 的实现
+        all_illusts = []
+        page_count = 0
+        deep_search_depth = self.pixiv_config.deep_search_depth
+        next_params = search_params.copy()
+
+        # 循环获取多页结果
+        while next_params:
+            # 限制页数
+            if deep_search_depth > 0 and page_count >= deep_search_depth:
+                break
+
+            # 搜索当前页，使用与 pixiv_deepsearch 相同的方式
+            try:
+                json_result = await self.client_wrapper.call_pixiv_api(
+                    self.client.search_illust, **next_params
+                )
+            except Exception as api_e:
+                logger.warning(
+                    f"标签 {raw_tag} 的随机搜索第 {page_count + 1} 页请求失败: {api_e}"
+                )
+                break
+
+            if not json_result or not hasattr(json_result, "illusts"):
+                break
+
+            # 收集当前页的插画
+            current_illusts = json_result.illusts
+            if current_illusts:
+                all_illusts.extend(current_illusts)
+                page_count += 1
+                logger.info(
+                    f"标签 {raw_tag} 的随机搜索：已获取第 {page_count} 页，找到 {len(current_illusts)} 个插画"
+                )
+
+                # 发送进度更新（每3页更新一次，与 pixiv_deepsearch 保持一致）
+                if page_count % 3 == 0:
+                    logger.info(
+                        f"标签 {raw_tag} 搜索进行中：已获取 {page_count} 页，共 {len(all_illusts)} 个结果..."
+                    )
+            else:
+                break
+
+            # 获取下一页参数，使用与 pixiv_deepsearch 相同的方式
+            next_url = json_result.next_url
+            next_params = self.client.parse_qs(next_url) if next_url else None
+
+            # 避免请求过于频繁，与 pixiv_deepsearch 保持一致的延迟
+            if next_params:
+                await asyncio.sleep(0.5)  # 添加延迟，避免请求过快
+
+        if all_illusts:
+            logger.info(
+                f"标签 {raw_tag} 的深度搜索完成，共获取 {page_count} 页，找到 {len(all_illusts)} 个插画"
+            )
+        return all_illusts
 
-    async def _execute_tag_search(self, chat_id: str, selected_tag_entry):
-        """执行标签搜索"""
+    async def _prepare_tag_push(self, chat_id: str, selected_tag_entry):
+        """执行标签搜索并构建待发送的消息链"""
         raw_tag = selected_tag_entry.tag
         session_id = selected_tag_entry.session_id
 
@@ -270,7 +697,7 @@ class RandomSearchService:
         # 如果需要则认证
         if not await self.client_wrapper.authenticate():
             logger.error(f"群组 {chat_id} 的随机搜索失败: 认证失败。")
-            return
+            return None
 
         # 处理标签
         tag_result = validate_and_process_tags(raw_tag)
@@ -278,75 +705,34 @@ class RandomSearchService:
             logger.warning(
                 f"标签 {raw_tag} 的随机搜索验证失败: {tag_result['error_message']}"
             )
-            return
+            return None
 
         search_tags = tag_result["search_tags"]
         exclude_tags = tag_result["exclude_tags"]
         display_tags = tag_result["display_tags"]
 
+        messages = []
         try:
-            # 准备搜索参数，参考 pixiv_deepsearch 的实现
-            search_params = {
-                "word": search_tags,
-                "search_target": "partial_match_for_tags",
-                "sort": "popular_desc",
-                "filter": "for_ios",
-                "req_auth": True,
-            }
-
-            # 执行深度搜索，完全参考 pixiv_deepsearch 的实现
-            all_illusts = []
-            page_count = 0
-            deep_search_depth = self.pixiv_config.deep_search_depth
-            next_params = search_params.copy()
-
-            # 循环获取多页结果
-            while next_params:
-                # 限制页数
-                if deep_search_depth > 0 and page_count >= deep_search_depth:
-                    break
+            all_illusts = await self._get_tag_candidates(search_tags, raw_tag)
 
-                # 搜索当前页，使用与 pixiv_deepsearch 相同的方式
-                json_result = await asyncio.to_thread(
-                    self.client.search_illust, **next_params
+            if not all_illusts and self.pixiv_config.illust_cache_enabled:
+                # API 失败或限流时，从本地已见过的作品中取样
+                all_illusts = await asyncio.to_thread(
+                    search_illust_metadata, tag_result["include_tags"]
                 )
-
-                if not json_result or not hasattr(json_result, "illusts"):
-                    break
-
-                # 收集当前页的插画
-                current_illusts = json_result.illusts
-                if current_illusts:
-                    all_illusts.extend(current_illusts)
-                    page_count += 1
+                if all_illusts:
                     logger.info(
-                        f"标签 {raw_tag} 的随机搜索：已获取第 {page_count} 页，找到 {len(current_illusts)} 个插画"
+                        f"标签 {raw_tag} 的随机搜索未从 API 获取到结果，改用本地缓存中的 {len(all_illusts)} 个作品"
                     )
 
-                    # 发送进度更新（每3页更新一次，与 pixiv_deepsearch 保持一致）
-                    if page_count % 3 == 0:
-                        logger.info(
-                            f"标签 {raw_tag} 搜索进行中：已获取 {page_count} 页，共 {len(all_illusts)} 个结果..."
-                        )
-                else:
-                    break
-
-                # 获取下一页参数，使用与 pixiv_deepsearch 相同的方式
-                next_url = json_result.next_url
-                next_params = self.client.parse_qs(next_url) if next_url else None
-
-                # 避免请求过于频繁，与 pixiv_deepsearch 保持一致的延迟
-                if next_params:
-                    await asyncio.sleep(0.5)  # 添加延迟，避免请求过快
-
             if not all_illusts:
                 logger.info(f"标签 {raw_tag} 的随机搜索未返回结果。")
-                return
+                return None
 
             # 记录找到的总数量，与 pixiv_deepsearch 保持一致
             initial_count = len(all_illusts)
             logger.info(
-                f"标签 {raw_tag} 的随机搜索完成，共获取 {page_count} 页，找到 {initial_count} 个插画，开始过滤处理..."
+                f"标签 {raw_tag} 的随机搜索共有 {initial_count} 个候选插画，开始过滤处理..."
             )
 
             # 过滤已发送的作品
@@ -354,7 +740,7 @@ class RandomSearchService:
 
             if not initial_illusts:
                 logger.info(f"标签 {raw_tag} 的随机搜索过滤后无可用作品。")
-                return
+                return None
 
             # 发送配置
             config = FilterConfig(
@@ -367,6 +753,8 @@ class RandomSearchService:
                 excluded_tags=exclude_tags or [],
                 forward_threshold=self.pixiv_config.forward_threshold,
                 show_details=self.pixiv_config.show_details,
+                # 随机推送直接发送作品，不使用拼图
+                collage=False,
             )
 
             # 创建模拟事件以捕获输出
@@ -392,9 +780,7 @@ class RandomSearchService:
 
             mock_event = MockEvent()
 
-            # 复用 process_and_send_illusts
-            sent_illust_ids = set()  # 记录已发送的作品ID
-
+            # 复用 process_and_send_illusts，只构建消息链，发送由 _deliver_push 完成
             async for message_content, related_illust_ids in process_and_send_illusts(
                 initial_illusts,
                 config,
@@ -407,48 +793,23 @@ class RandomSearchService:
                 include_related_ids=True,
             ):
                 if message_content:
-                    logger.info(f"准备向 session_id: {session_id} 发送消息")
-                    if hasattr(message_content, "chain"):
-                        logger.info(f"消息链长度: {len(message_content.chain)}")
-
-                    try:
-                        if hasattr(message_content, "chain"):
-                            await self.context.send_message(session_id, message_content)
-                            sent_illust_ids.update(related_illust_ids or [])
-                        else:
-                            # 纯文本或列表的回退
-                            if isinstance(message_content, list):
-                                logger.warning(
-                                    "在 random_search 中收到列表而不是 MessageChain"
-                                )
-                                pass
-                            elif isinstance(message_content, MessageChain):
-                                await self.context.send_message(
-                                    session_id, message_content
-                                )
-                                sent_illust_ids.update(related_illust_ids or [])
-                            else:
-                                # 尝试字符串转换
-                                chain = MessageChain().message(str(message_content))
-                                await self.context.send_message(session_id, chain)
-                                sent_illust_ids.update(related_illust_ids or [])
-                        logger.info(f"消息已发送至 {session_id}")
-                    except Exception as e:
-                        logger.error(f"向 {session_id} 发送消息失败: {e}")
-
-            # 记录已发送的作品ID到数据库
-            for illust_id in sent_illust_ids:
-                add_sent_illust(illust_id, chat_id)
-            if sent_illust_ids:
-                logger.info(
-                    f"群组 {chat_id}: 已记录 {len(sent_illust_ids)} 个作品的发送记录"
-                )
-
+                    message_chain = self._to_message_chain(message_content)
+                    if message_chain is not None:
+                        # 消息链延后发送，先为临时文件增加引用
+                        hold_message_files(message_chain)
+                        messages.append((message_chain, related_illust_ids))
+            return session_id, messages
+
+        except asyncio.CancelledError:
+            # 超时或配置变化导致取消时，释放已持有的临时文件
+            self._release_messages(messages)
+            raise
         except Exception as e:
             logger.error(f"为群组 {chat_id} 执行随机标签搜索时出错: {e}")
+            return None
 
-    async def _execute_ranking_search(self, chat_id: str, ranking_config):
-        """执行排行榜搜索"""
+    async def _prepare_ranking_push(self, chat_id: str, ranking_config):
+        """执行排行榜搜索并构建待发送的消息链"""
         mode = ranking_config.mode
         date = ranking_config.date
         session_id = ranking_config.session_id
@@ -459,17 +820,18 @@ class RandomSearchService:
 
         if not await self.client_wrapper.authenticate():
             logger.error(f"群组 {chat_id} 的随机排行榜搜索失败: 认证失败。")
-            return
+            return None
 
+        messages = []
         try:
-            ranking_result = await asyncio.to_thread(
-                self.client.illust_ranking, mode=mode, date=date
+            # 从共享的排行榜缓存中取完整排行榜，扩大随机推送的候选范围
+            initial_illusts = await self.client_wrapper.ranking_store.get_ranking(
+                mode, date, depth=RANKING_MAX_ENTRIES
             )
-            initial_illusts = ranking_result.illusts if ranking_result.illusts else []
 
             if not initial_illusts:
                 logger.info(f"排行榜 {mode} 的随机搜索未返回结果。")
-                return
+                return None
 
             # Pixiv 排行榜接口在非 manga 模式下也可能混入 type=manga 的作品，这里主动过滤掉
             if mode and "manga" not in str(mode).lower():
@@ -488,7 +850,7 @@ class RandomSearchService:
 
             if not initial_illusts:
                 logger.info(f"排行榜 {mode} 的随机搜索过滤后无可用作品。")
-                return
+                return None
 
             config = FilterConfig(
                 r18_mode=self.pixiv_config.r18_mode,
@@ -500,6 +862,8 @@ class RandomSearchService:
                 excluded_tags=[],
                 forward_threshold=self.pixiv_config.forward_threshold,
                 show_details=self.pixiv_config.show_details,
+                # 随机推送直接发送作品，不使用拼图
+                collage=False,
             )
 
             class MockEvent:
@@ -523,7 +887,6 @@ class RandomSearchService:
                     return None
 
             mock_event = MockEvent()
-            sent_illust_ids = set()
 
             async for message_content, related_illust_ids in process_and_send_illusts(
                 initial_illusts,
@@ -537,36 +900,26 @@ class RandomSearchService:
                 include_related_ids=True,
             ):
                 if message_content:
-                    try:
-                        if hasattr(message_content, "chain"):
-                            await self.context.send_message(session_id, message_content)
-                            sent_illust_ids.update(related_illust_ids or [])
-                        elif isinstance(message_content, MessageChain):
-                            await self.context.send_message(session_id, message_content)
-                            sent_illust_ids.update(related_illust_ids or [])
-                        else:
-                            chain = MessageChain().message(str(message_content))
-                            await self.context.send_message(session_id, chain)
-                            sent_illust_ids.update(related_illust_ids or [])
-                        logger.info(f"排行榜消息已发送至 {session_id}")
-                    except Exception as e:
-                        logger.error(f"向 {session_id} 发送排行榜消息失败: {e}")
-
-            for illust_id in sent_illust_ids:
-                add_sent_illust(illust_id, chat_id)
-            if sent_illust_ids:
-                logger.info(
-                    f"群组 {chat_id}: 已记录 {len(sent_illust_ids)} 个排行榜作品的发送记录"
-                )
-
+                    message_chain = self._to_message_chain(message_content)
+                    if message_chain is not None:
+                        # 消息链延后发送，先为临时文件增加引用
+                        hold_message_files(message_chain)
+                        messages.append((message_chain, related_illust_ids))
+            return session_id, messages
+
+        except asyncio.CancelledError:
+            self._release_messages(messages)
+            raise
         except Exception as e:
             logger.error(f"为群组 {chat_id} 执行随机排行榜搜索时出错: {e}")
+            return None
 
     def suspend_group_search(self, chat_id: str):
         """暂停指定群组的随机搜索"""
         try:
-            # 移除该群组的调度时间
+            # 移除该群组的调度时间，并丢弃已提前准备的推送
             remove_schedule_time(chat_id)
+            self._discard_prepared_push(chat_id)
             logger.info(f"已移除群组 {chat_id} 的调度时间")
         except Exception as e:
             logger.error(f"移除群组 {chat_id} 调度时间失败: {e}")
@@ -594,26 +947,32 @@ class RandomSearchService:
 
     def get_queue_status(self) -> dict:
         """获取队列状态信息，用于调试和监控"""
+        worker_count = len([task for task in self._worker_tasks if not task.done()])
         return {
             "queue_size": self.task_queue.qsize(),
-            "is_queue_processor_running": self.is_queue_processor_running,
-            "execution_locks": dict(self.execution_locks),
+            "is_queue_processor_running": worker_count > 0,
+            "worker_count": worker_count,
+            "execution_locks": {
+                chat_id: lock.locked() for chat_id, lock in self.execution_locks.items()
+            },
             "active_groups": [
-                chat_id for chat_id, locked in self.execution_locks.items() if locked
+                chat_id
+                for chat_id, lock in self.execution_locks.items()
+                if lock.locked()
             ],
         }
 
     async def force_execute_group(self, chat_id: str) -> bool:
         """强制执行指定群组的随机搜索（用于调试）"""
-        if chat_id not in self.execution_locks:
-            self.execution_locks[chat_id] = False
-
-        if self.execution_locks[chat_id]:
+        if self._get_execution_lock(chat_id).locked():
             logger.warning(f"群组 {chat_id} 已在执行状态，无法强制执行")
             return False
 
         try:
-            await self.task_queue.put(chat_id)
+            self._ensure_workers()
+            if not await self._enqueue_group(chat_id):
+                logger.info(f"群组 {chat_id} 已在执行队列中")
+                return True
             logger.info(f"群组 {chat_id} 已强制加入执行队列")
             return True
         except Exception as e:
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from astrbot.api import logger
+
+from .database import (
+    get_ranking_cache,
+    save_ranking_cache,
+    load_illusts_by_ids,
+)
+
+# 排行榜最多缓存的名次数（Pixiv 排行榜最多 500 名）及每页数量
+RANKING_MAX_ENTRIES = 500
+RANKING_PAGE_SIZE = 30
+# Pixiv 排行榜每天在日本时间中午前后更新
+RANKING_UPDATE_HOUR_JST = 12
+JST = timezone(timedelta(hours=9))
+
+
+def _latest_ranking_update(now: datetime = None) -> datetime:
+    """返回最近一次排行榜更新的时间点（本地时区 naive datetime）"""
+    now_jst = (now or datetime.now()).astimezone(JST)
+    boundary = now_jst.replace(
+        hour=RANKING_UPDATE_HOUR_JST, minute=0, second=0, microsecond=0
+    )
+    if boundary > now_jst:
+        boundary -= timedelta(days=1)
+    return boundary.astimezone().replace(tzinfo=None)
+
+
+def _response_field(result, key):
+    """读取 API 响应字段，兼容 dict 与对象；字段缺失时返回 None"""
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        return result.get(key)
+    return getattr(result, key, None)
+
+
+class RankingStore:
+    """
+    排行榜本地缓存。每个 (mode, date) 在一次排行榜更新周期内只拉取一次，
+    按需向后翻页（最多 500 名），由 /pixiv_ranking 与随机排行榜推送共享。
+    """
+
+    def __init__(self, client_wrapper):
+        self.client_wrapper = client_wrapper
+        self._locks = {}
+
+    async def get_ranking(
+        self, mode: str, date: str = None, depth: int = RANKING_MAX_ENTRIES
+    ) -> list:
+        """
+        获取排行榜前 depth 名作品，缓存不足时才请求 API
+
+        :return: 与 API 返回结构兼容的作品对象列表，按名次排列
+        """
+        depth = max(1, min(depth, RANKING_MAX_ENTRIES))
+        date_key = date or ""
+        lock = self._locks.setdefault((mode, date_key), asyncio.Lock())
+        async with lock:
+            cache = await asyncio.to_thread(get_ranking_cache, mode, date_key)
+            # 最新排行榜在每次更新后失效；指定日期的排行榜不会再变化
+            if cache and not date_key and cache.fetched_at < _latest_ranking_update():
+                cache = None
+
+            illust_ids = json.loads(cache.illust_ids) if cache else []
+            complete = cache.complete if cache else False
+            fetched_at = cache.fetched_at if cache else datetime.now()
+            fetched = []
+
+            if len(illust_ids) < depth and not complete:
+                fetched, complete = await self._fetch_pages(
+                    mode, date, len(illust_ids), depth - len(illust_ids)
+                )
+                known = set(illust_ids)
+                for illust in fetched:
+                    if illust.id not in known:
+                        known.add(illust.id)
+                        illust_ids.append(illust.id)
+                if fetched:
+                    await asyncio.to_thread(
+                        save_ranking_cache,
+                        mode,
+                        date_key,
+                        fetched,
+                        illust_ids,
+                        complete,
+                        fetched_at,
+                    )
+
+            illusts = await asyncio.to_thread(load_illusts_by_ids, illust_ids[:depth])
+            if not illusts and fetched:
+                # 元数据缓存不可用时直接使用本次拉取的结果
+                return fetched[:depth]
+            return illusts
+
+    async def _fetch_pages(self, mode: str, date: str, offset: int, count: int):
+        """
+        从 offset 开始向后翻页拉取排行榜
+
+        :return: (作品列表, 是否已到排行榜末尾)
+        """
+        api = self.client_wrapper.client_api
+        illusts = []
+        complete = False
+        while len(illusts) < count:
+            kwargs = {"mode": mode, "date": date}
+            if offset:
+                kwargs["offset"] = offset
+            result = await self.client_wrapper.call_pixiv_api(
+                api.illust_ranking, **kwargs
+            )
+            page = _response_field(result, "illusts")
+            if page is None:
+                # 错误或限流响应：只保存已拉取的部分，下次请求从当前位置继续
+                logger.warning(
+                    f"Pixiv 插件：排行榜 {mode} {date or '最新'} 在第 {offset} 名处拉取失败"
+                )
+                break
+            illusts.extend(page)
+            offset += len(page)
+            if not _response_field(result, "next_url") or offset >= RANKING_MAX_ENTRIES:
+                complete = True
+                break
+            if not page:
+                break
+
+        logger.info(
+            f"Pixiv 插件：排行榜 {mode} {date or '最新'} 已缓存至第 {offset} 名"
+        )
+        return illusts, complete
@@ -0,0 +1,200 @@
+"""
+recent_results.py
+按会话记录最近一次发送的作品列表，供“原图 <编号>”等后续命令按编号取回作品；
+渐进发送模式下在后台预取这些作品的原图，放入有字节上限的内存缓存，
+用户索要原图时可直接从缓存发送。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+from astrbot.api import logger
+
+from .records import IllustRecord
+
+# 最多记录的会话数，超出时淘汰最久未使用的会话
+RECENT_RESULTS_MAX_SESSIONS = 256
+# 结果集的保留时间（秒）
+RECENT_RESULTS_TTL_SECONDS = 60 * 60
+# 原图缓存的总字节上限
+ORIGINAL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# 后台预取原图的并发数
+ORIGINAL_PREFETCH_CONCURRENCY = 2
+# 每个结果集只预取前几个作品的原图，其余在用户索要时再下载
+ORIGINAL_PREFETCH_MAX_ITEMS = 4
+
+# 下载函数签名：(session, url) -> 图片字节或 None
+Fetcher = Callable[[aiohttp.ClientSession, str], Awaitable[Optional[bytes]]]
+
+
+class _ResultSet:
+    __slots__ = ("illusts", "expires_at", "prefetch_task")
+
+    def __init__(self, illusts: List[IllustRecord]):
+        self.illusts = illusts
+        self.expires_at = time.monotonic() + RECENT_RESULTS_TTL_SECONDS
+        self.prefetch_task: Optional[asyncio.Task] = None
+
+
+def first_page_original(illust) -> Optional[str]:
+    """作品第一页的原图地址"""
+    if (getattr(illust, "page_count", 1) or 1) > 1 and illust.meta_pages:
+        return getattr(illust.meta_pages[0].image_urls, "original", None)
+    return getattr(illust.meta_single_page, "original_image_url", None)
+
+
+class RecentResults:
+    """
+    会话结果记忆与原图缓存
+
+    - remember: 记录会话最近一次的作品列表，可选地在后台预取原图
+    - get: 按从 1 开始的编号取回作品
+    - fetch_original: 读取原图，命中缓存或等待进行中的预取，否则现场下载
+    """
+
+    def __init__(
+        self,
+        fetch: Fetcher,
+        max_sessions: int = RECENT_RESULTS_MAX_SESSIONS,
+        cache_bytes: int = ORIGINAL_CACHE_MAX_BYTES,
+    ):
+        self._fetch = fetch
+        self.max_sessions = max_sessions
+        self.cache_bytes = cache_bytes
+        self._sessions: "OrderedDict[str, _ResultSet]" = OrderedDict()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 每个进行中的下载当前的等待方数量，归零时取消下载
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._semaphore = asyncio.Semaphore(ORIGINAL_PREFETCH_CONCURRENCY)
+        self._http: Optional[aiohttp.ClientSession] = None
+
+    def remember(self, session_id: str, illusts, prefetch: bool = False) -> None:
+        """记录会话的最新结果集，替换并取消该会话之前的预取"""
+        if not session_id or not illusts:
+            return
+        records = [
+            item if isinstance(item, IllustRecord) else IllustRecord.from_api(item)
+            for item in illusts
+        ]
+        previous = self._sessions.pop(session_id, None)
+        if previous and previous.prefetch_task:
+            previous.prefetch_task.cancel()
+
+        result_set = _ResultSet(records)
+        self._sessions[session_id] = result_set
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            if evicted.prefetch_task:
+                evicted.prefetch_task.cancel()
+
+        if prefetch:
+            urls = [
+                first_page_original(illust)
+                for illust in records[:ORIGINAL_PREFETCH_MAX_ITEMS]
+            ]
+            result_set.prefetch_task = asyncio.create_task(
+                self._prefetch([url for url in urls if url])
+            )
+
+    def get(self, session_id: str, index: int):
+        """按编号（从 1 开始）取回会话最近结果中的作品，不存在或已过期时返回 None"""
+        result_set = self._sessions.get(session_id)
+        if result_set is None:
+            return None
+        if result_set.expires_at <= time.monotonic():
+            self._sessions.pop(session_id, None)
+            return None
+        self._sessions.move_to_end(session_id)
+        if 1 <= index <= len(result_set.illusts):
+            return result_set.illusts[index - 1]
+        return None
+
+    def size(self, session_id: str) -> int:
+        """会话最近结果集中的作品数"""
+        result_set = self._sessions.get(session_id)
+        if result_set is None or result_set.expires_at <= time.monotonic():
+            return 0
+        return len(result_set.illusts)
+
+    async def fetch_original(self, url: str) -> Optional[bytes]:
+        """读取原图：优先缓存，其次等待同一地址进行中的下载"""
+        data = self._cache.get(url)
+        if data is not None:
+            self._cache.move_to_end(url)
+            return data
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._start_download(url)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield：某个等待方被取消时不影响共享同一下载的其他等待方
+            return await asyncio.shield(task)
+        finally:
+            remaining = self._waiters.pop(task) - 1
+            if remaining:
+                self._waiters[task] = remaining
+            elif not task.done():
+                # 最后一个等待方已被取消，没有必要继续下载
+                self._forget_download(url, task)
+                task.cancel()
+
+    async def close(self) -> None:
+        """取消全部预取并释放缓存"""
+        for result_set in self._sessions.values():
+            if result_set.prefetch_task:
+                result_set.prefetch_task.cancel()
+        for task in self._inflight.values():
+            task.cancel()
+        self._sessions.clear()
+        self._inflight.clear()
+        self._waiters.clear()
+        self._cache.clear()
+        self._cached_bytes = 0
+        if self._http and not self._http.closed:
+            await self._http.close()
+
+    def _start_download(self, url: str) -> asyncio.Task:
+        task = asyncio.create_task(self._download(url))
+        self._inflight[url] = task
+        task.add_done_callback(lambda _: self._forget_download(url, task))
+        return task
+
+    def _forget_download(self, url: str, task: asyncio.Task) -> None:
+        # 只移除对应的任务，避免误删同一地址随后发起的新下载
+        if self._inflight.get(url) is task:
+            del self._inflight[url]
+
+    async def _download(self, url: str) -> Optional[bytes]:
+        async with self._semaphore:
+            if self._http is None or self._http.closed:
+                self._http = aiohttp.ClientSession()
+            data = await self._fetch(self._http, url)
+        if data:
+            self._store(url, data)
+        return data
+
+    async def _prefetch(self, urls: List[str]) -> None:
+        for url in urls:
+            if url in self._cache:
+                continue
+            try:
+                await self.fetch_original(url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Pixiv 插件：预取原图失败 {url} - {e}")
+
+    def _store(self, url: str, data: bytes) -> None:
+        """写入缓存并按最久未使用淘汰；单张超过上限四分之一的图片不缓存"""
+        if len(data) > self.cache_bytes // 4 or url in self._cache:
+            return
+        self._cache[url] = data
+        self._cached_bytes += len(data)
+        while self._cached_bytes > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
@@ -0,0 +1,285 @@
+"""
+records.py
+API 边界的精简作品记录：pixivpy3 返回的完整 JsonDict 包含简介、全部尺寸的图片地址、
+用户头像等大量字段，深度搜索时成千上万个这样的对象会一直驻留内存。
+这里只保留过滤、详情消息与发送所需的字段，并使用 __slots__ 存储。
+"""
+
+import sys
+
+# 页面图片地址在元组中的顺序；发送只用到这三种尺寸，缩略图 square_medium 不保留
+PAGE_URL_KEYS = ("original", "large", "medium")
+
+
+def _field(source, key, default=None):
+    """从 dict 或对象中读取字段"""
+    if source is None:
+        return default
+    if isinstance(source, dict):
+        return source.get(key, default)
+    return getattr(source, key, default)
+
+
+def _intern(value):
+    """标签名在大量作品间高度重复，驻留后可共享同一个字符串对象"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class TagRecord:
+    __slots__ = ("name", "translated_name")
+
+    def __init__(self, name, translated_name=None):
+        self.name = _intern(name)
+        self.translated_name = _intern(translated_name)
+
+
+class UserRecord:
+    __slots__ = ("id", "name", "account")
+
+    def __init__(self, id, name, account=None):
+        self.id = id
+        self.name = name
+        self.account = account
+
+
+class ImageUrls:
+    __slots__ = PAGE_URL_KEYS
+
+    def __init__(self, original=None, large=None, medium=None):
+        self.original = original
+        self.large = large
+        self.medium = medium
+
+
+class PageRecord:
+    __slots__ = ("image_urls",)
+
+    def __init__(self, image_urls: ImageUrls):
+        self.image_urls = image_urls
+
+
+class SinglePageRecord:
+    __slots__ = ("original_image_url",)
+
+    def __init__(self, original_image_url=None):
+        self.original_image_url = original_image_url
+
+
+class SeriesRecord:
+    __slots__ = ("id", "title")
+
+    def __init__(self, id, title):
+        self.id = id
+        self.title = title
+
+
+def _project_user(user) -> UserRecord:
+    return UserRecord(
+        _field(user, "id"), _field(user, "name", ""), _field(user, "account")
+    )
+
+
+def _project_tags(tags) -> tuple:
+    records = []
+    for tag in tags or []:
+        if isinstance(tag, str):
+            records.append(TagRecord(tag))
+        else:
+            name = _field(tag, "name")
+            if name:
+                records.append(TagRecord(name, _field(tag, "translated_name")))
+    return tuple(records)
+
+
+class IllustRecord:
+    """
+    精简插画记录，属性与 pixivpy3 的插画对象保持兼容
+
+    各页图片地址以元组形式紧凑存储，image_urls / meta_single_page / meta_pages
+    在访问时才构造出兼容对象。
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "type",
+        "user",
+        "tags",
+        "create_date",
+        "page_count",
+        "total_bookmarks",
+        "total_view",
+        "x_restrict",
+        "illust_ai_type",
+        "_page_urls",
+    )
+
+    def __init__(
+        self,
+        id,
+        title="",
+        type="illust",
+        user=None,
+        tags=(),
+        create_date=None,
+        page_count=1,
+        total_bookmarks=None,
+        total_view=None,
+        x_restrict=0,
+        illust_ai_type=0,
+        page_urls=(),
+    ):
+        self.id = id
+        self.title = title
+        self.type = type
+        self.user = user
+        self.tags = tags
+        self.create_date = create_date
+        self.page_count = page_count
+        self.total_bookmarks = total_bookmarks
+        self.total_view = total_view
+        self.x_restrict = x_restrict
+        self.illust_ai_type = illust_ai_type
+        self._page_urls = page_urls
+
+    @classmethod
+    def from_api(cls, illust) -> "IllustRecord":
+        """从 API 返回的插画对象投影出精简记录"""
+        page_urls = []
+        for page in _field(illust, "meta_pages") or []:
+            urls = _field(page, "image_urls")
+            page_urls.append(tuple(_field(urls, key) for key in PAGE_URL_KEYS))
+        if not page_urls:
+            image_urls = _field(illust, "image_urls")
+            page_urls.append(
+                (
+                    _field(_field(illust, "meta_single_page"), "original_image_url"),
+                    _field(image_urls, "large"),
+                    _field(image_urls, "medium"),
+                )
+            )
+
+        return cls(
+            id=_field(illust, "id"),
+            title=_field(illust, "title", ""),
+            type=_field(illust, "type", "illust"),
+            user=_project_user(_field(illust, "user")),
+            tags=_project_tags(_field(illust, "tags")),
+            create_date=_field(illust, "create_date"),
+            page_count=_field(illust, "page_count", 1),
+            total_bookmarks=_field(illust, "total_bookmarks"),
+            total_view=_field(illust, "total_view"),
+            x_restrict=_field(illust, "x_restrict", 0),
+            illust_ai_type=_field(illust, "illust_ai_type", 0),
+            page_urls=tuple(page_urls),
+        )
+
+    @property
+    def image_urls(self) -> ImageUrls:
+        first = self._page_urls[0] if self._page_urls else ()
+        return ImageUrls(*first)
+
+    @property
+    def meta_single_page(self) -> SinglePageRecord:
+        first = self._page_urls[0] if self._page_urls else (None,)
+        return SinglePageRecord(first[0])
+
+    @property
+    def meta_pages(self) -> list:
+        if (self.page_count or 1) <= 1:
+            return []
+        return [PageRecord(ImageUrls(*urls)) for urls in self._page_urls]
+
+
+class NovelRecord:
+    """精简小说记录，属性与 pixivpy3 的小说对象保持兼容"""
+
+    __slots__ = (
+        "id",
+        "title",
+        "user",
+        "tags",
+        "create_date",
+        "page_count",
+        "text_length",
+        "series",
+        "total_bookmarks",
+        "total_view",
+        "x_restrict",
+        "novel_ai_type",
+    )
+
+    def __init__(
+        self,
+        id,
+        title="",
+        user=None,
+        tags=(),
+        create_date=None,
+        page_count=1,
+        text_length=None,
+        series=None,
+        total_bookmarks=None,
+        total_view=None,
+        x_restrict=0,
+        novel_ai_type=0,
+    ):
+        self.id = id
+        self.title = title
+        self.user = user
+        self.tags = tags
+        self.create_date = create_date
+        self.page_count = page_count
+        self.text_length = text_length
+        self.series = series
+        self.total_bookmarks = total_bookmarks
+        self.total_view = total_view
+        self.x_restrict = x_restrict
+        self.novel_ai_type = novel_ai_type
+
+    @classmethod
+    def from_api(cls, novel) -> "NovelRecord":
+        """从 API 返回的小说对象投影出精简记录"""
+        series = _field(novel, "series")
+        series_title = _field(series, "title")
+        return cls(
+            id=_field(novel, "id"),
+            title=_field(novel, "title", ""),
+            user=_project_user(_field(novel, "user")),
+            tags=_project_tags(_field(novel, "tags")),
+            create_date=_field(novel, "create_date"),
+            page_count=_field(novel, "page_count", 1),
+            text_length=_field(novel, "text_length"),
+            series=(
+                SeriesRecord(_field(series, "id"), series_title)
+                if series_title
+                else None
+            ),
+            total_bookmarks=_field(novel, "total_bookmarks"),
+            total_view=_field(novel, "total_view"),
+            x_restrict=_field(novel, "x_restrict", 0),
+            novel_ai_type=_field(novel, "novel_ai_type", 0),
+        )
+
+
+def slim_api_response(result):
+    """
+    将 API 列表结果中的 illusts / novels 原地替换为精简记录
+
+    单个作品详情（illust / novel）保持原样，供需要完整字段的命令使用。
+    """
+    if result is None:
+        return result
+    for key, record_cls in (("illusts", IllustRecord), ("novels", NovelRecord)):
+        items = _field(result, key)
+        if not isinstance(items, list) or not items:
+            continue
+        slim_items = [
+            item if isinstance(item, record_cls) else record_cls.from_api(item)
+            for item in items
+        ]
+        if isinstance(result, dict):
+            result[key] = slim_items
+        else:
+            setattr(result, key, slim_items)
+    return result
@@ -1,4 +1,7 @@
 import asyncio
+import heapq
+import random
+import time
 from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from astrbot.api import logger
@@ -6,10 +9,42 @@ from pixivpy3 import AppPixivAPI
 from ..utils.pixiv_utils import (
     filter_items,
     send_pixiv_image,
+    hold_message_files,
+    release_message_files,
 )
 
-from .database import get_all_subscriptions, update_last_notified_id
+from .database import (
+    get_all_subscriptions,
+    get_artist_poll_states,
+    mark_subscriptions_checked,
+    save_artist_poll_state,
+    update_last_notified_ids,
+)
 from .tag import build_detail_message
+from .poll_schedule import estimate_poll_interval
+
+# 关注动态模式：单轮最多翻页数，防止长时间停机后无限翻页
+FOLLOW_FEED_MAX_PAGES = 10
+# 关注动态模式：重新拉取账号关注列表的间隔（秒），以感知手动取消关注
+FOLLOW_SYNC_INTERVAL_SECONDS = 24 * 3600
+# 自适应检查：提前量，避免下次检查时间略晚于定时触发而被推迟一整轮
+POLL_DUE_GRACE = timedelta(minutes=1)
+# 订阅通知投递：同时投递的会话数与单个会话的最大尝试次数
+SEND_CONCURRENCY = 5
+SEND_RETRY_TIMES = 3
+# 启动补检：过期订阅分散在检查间隔的前这部分时间内执行，留出余量避免与下一轮重叠
+BOOT_SPREAD_RATIO = 0.8
+
+
+def _parse_create_date(value):
+    """将作品的 create_date (ISO 字符串) 转换为本地时区的 naive datetime"""
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
 
 
 class SubscriptionService:
@@ -20,16 +55,33 @@ class SubscriptionService:
         self.context = context
         self.scheduler = AsyncIOScheduler(timezone="Asia/Shanghai")
         self.job = None
+        # 关注动态模式下账号已关注的画师ID集合及其同步时间
+        self._followed_ids = None
+        self._followed_synced_at = 0.0
+        # 关注动态中上一轮已看到的最新作品ID，重启后以订阅水位线代替
+        self._feed_cursor = None
+        # 定时检查与启动补检互斥，避免同一画师被同时检查而重复推送
+        self._check_lock = asyncio.Lock()
 
     def start(self):
         """启动后台任务"""
         if not self.scheduler.running:
+            interval = self.pixiv_config.subscription_check_interval_minutes
+            # max_instances=1 + coalesce: 上一轮未结束时跳过本轮，积压的触发合并为一次
+            # 首次完整检查推迟一个间隔，启动时只补检已过期的订阅
             self.job = self.scheduler.add_job(
                 self.check_subscriptions,
                 "interval",
-                minutes=self.pixiv_config.subscription_check_interval_minutes,
-                next_run_time=datetime.now()
-                + timedelta(seconds=10),  # 10秒后第一次运行
+                minutes=interval,
+                next_run_time=datetime.now() + timedelta(minutes=interval),
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=60,
+            )
+            self.scheduler.add_job(
+                self.check_overdue_on_boot,
+                "date",
+                run_date=datetime.now() + timedelta(seconds=10),  # 10秒后开始补检
             )
             self.scheduler.start()
 
@@ -40,7 +92,14 @@ class SubscriptionService:
             logger.info("订阅检查服务已停止。")
 
     async def check_subscriptions(self):
-        """检查所有订阅并推送更新"""
+        """检查所有订阅并推送更新（同一画师只请求一次，再分发给所有订阅者）"""
+        if self._check_lock.locked():
+            logger.info("订阅检查：启动补检尚未完成，等待其结束后再开始本轮检查。")
+        # 订阅在持锁后读取，保证拿到补检更新后的推送水位线
+        async with self._check_lock:
+            await self._check_all_subscriptions()
+
+    async def _check_all_subscriptions(self):
         if not await self.client_wrapper.authenticate():
             logger.error("订阅检查失败：Pixiv API 认证失败。")
             return
@@ -49,46 +108,416 @@ class SubscriptionService:
         if not subscriptions:
             return
 
+        artist_subs = self._group_artist_subscriptions(subscriptions)
+        concurrency = max(1, int(self.pixiv_config.subscription_check_concurrency))
+        logger.info(
+            f"订阅检查开始：{len(subscriptions)} 条订阅，涉及 {len(artist_subs)} 位画师，并发 {concurrency}。"
+        )
+
+        report = {"checked": 0, "failed": 0, "delivered": 0}
+        start_time = time.monotonic()
+        # 自适应模式下按本轮开始时间计算下次检查时间，避免轮次较长时靠后的画师被推迟一整轮
+        cycle_started_at = datetime.now()
+
+        # 关注动态模式：已关注画师通过时间线统一检查，其余画师仍逐个轮询
+        if self.pixiv_config.subscription_follow_feed_mode:
+            try:
+                artist_subs = await self.check_follow_feed(artist_subs, report)
+            except Exception as e:
+                logger.error(f"检查关注动态时发生错误，本轮回退为逐个画师检查: {e}")
+
+        if self.pixiv_config.subscription_adaptive_interval:
+            artist_subs = self._select_due_artists(artist_subs)
+
+        queue = asyncio.Queue()
+        for target_id, subs in artist_subs.items():
+            queue.put_nowait((target_id, subs))
+
+        workers = [
+            asyncio.create_task(
+                self._subscription_worker(queue, report, cycle_started_at)
+            )
+            for _ in range(min(concurrency, len(artist_subs)))
+        ]
+        await asyncio.gather(*workers)
+
+        elapsed = time.monotonic() - start_time
+        throughput = report["checked"] / elapsed * 60 if elapsed > 0 else 0
+        logger.info(
+            f"订阅检查完成：检查 {report['checked']} 位画师（失败 {report['failed']}），"
+            f"推送 {report['delivered']} 条更新，耗时 {elapsed:.1f} 秒，"
+            f"吞吐 {throughput:.1f} 位画师/分钟。"
+        )
+        interval_seconds = self.pixiv_config.subscription_check_interval_minutes * 60
+        if elapsed > interval_seconds * 0.8:
+            logger.warning(
+                f"订阅检查耗时 {elapsed:.1f} 秒，已接近检查间隔 {interval_seconds} 秒，"
+                "建议提高 subscription_check_concurrency 或延长检查间隔。"
+            )
+
+    async def check_overdue_on_boot(self):
+        """启动后只检查已过期的订阅，并在检查间隔内带随机抖动地错开执行"""
+        async with self._check_lock:
+            await self._check_overdue_subscriptions()
+
+    async def _check_overdue_subscriptions(self):
+        if not await self.client_wrapper.authenticate():
+            logger.error("启动补检失败：Pixiv API 认证失败。")
+            return
+
+        artist_subs = self._group_artist_subscriptions(get_all_subscriptions())
+        if not artist_subs:
+            return
+
+        report = {"checked": 0, "failed": 0, "delivered": 0}
+        if self.pixiv_config.subscription_follow_feed_mode:
+            try:
+                artist_subs = await self.check_follow_feed(artist_subs, report)
+            except Exception as e:
+                logger.error(f"启动补检关注动态时发生错误: {e}")
+
+        overdue = self._select_overdue_artists(artist_subs)
+        if not overdue:
+            logger.info("启动补检：没有过期的订阅。")
+            return
+
+        window = (
+            self.pixiv_config.subscription_check_interval_minutes
+            * 60
+            * BOOT_SPREAD_RATIO
+        )
+        offsets = sorted(random.uniform(0, window) for _ in overdue)
+        logger.info(
+            f"启动补检：{len(overdue)}/{len(artist_subs)} 位画师已过期，"
+            f"将在 {window / 60:.0f} 分钟内错开检查。"
+        )
+
+        start_time = time.monotonic()
+        for offset, (target_id, subs) in zip(offsets, overdue.items()):
+            delay = offset - (time.monotonic() - start_time)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                report["delivered"] += await self.check_artist_updates(target_id, subs)
+                report["checked"] += 1
+            except Exception as e:
+                report["failed"] += 1
+                logger.error(f"启动补检 artist: {target_id} 时发生错误: {e}")
+
+        logger.info(
+            f"启动补检完成：检查 {report['checked']} 位画师（失败 {report['failed']}），"
+            f"推送 {report['delivered']} 条更新。"
+        )
+
+    @staticmethod
+    def _group_artist_subscriptions(subscriptions: list) -> dict:
+        """按画师分组: {target_id: [sub, ...]}"""
+        artist_subs = {}
         for sub in subscriptions:
+            if sub.sub_type == "artist":
+                artist_subs.setdefault(sub.target_id, []).append(sub)
+        return artist_subs
+
+    def _select_overdue_artists(self, artist_subs: dict) -> dict:
+        """选出已超过检查间隔未检查的画师（自适应模式下按持久化的下次检查时间）"""
+        if self.pixiv_config.subscription_adaptive_interval:
+            return self._select_due_artists(artist_subs)
+
+        cutoff = datetime.now() - timedelta(
+            minutes=self.pixiv_config.subscription_check_interval_minutes
+        )
+        return {
+            target_id: subs
+            for target_id, subs in artist_subs.items()
+            if any(
+                sub.last_checked_at is None or sub.last_checked_at <= cutoff
+                for sub in subs
+            )
+        }
+
+    async def _subscription_worker(
+        self, queue: asyncio.Queue, report: dict, cycle_started_at: datetime = None
+    ):
+        """订阅检查工作协程：从队列中取出画师并检查，API 请求节奏由全局限速控制"""
+        while True:
             try:
-                if sub.sub_type == "artist":
-                    await self.check_artist_updates(sub)
+                target_id, subs = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                report["delivered"] += await self.check_artist_updates(
+                    target_id, subs, cycle_started_at
+                )
+                report["checked"] += 1
             except Exception as e:
-                logger.error(
-                    f"检查订阅 {sub.sub_type}: {sub.target_id} 时发生错误: {e}"
+                report["failed"] += 1
+                logger.error(f"检查订阅 artist: {target_id} 时发生错误: {e}")
+
+    def _select_due_artists(self, artist_subs: dict) -> dict:
+        """按下次检查时间从优先队列中取出已到期的画师，最久未检查的排在最前"""
+        states = get_artist_poll_states()
+        heap = []
+        for target_id in artist_subs:
+            state = states.get(target_id)
+            next_check_at = state.next_check_at if state else datetime.min
+            heap.append((next_check_at, target_id))
+        heapq.heapify(heap)
+
+        now = datetime.now() + POLL_DUE_GRACE
+        due_subs = {}
+        while heap and heap[0][0] <= now:
+            _, target_id = heapq.heappop(heap)
+            due_subs[target_id] = artist_subs[target_id]
+
+        logger.info(f"自适应检查：本轮到期 {len(due_subs)}/{len(artist_subs)} 位画师。")
+        return due_subs
+
+    def _schedule_next_check(
+        self, target_id: str, illusts: list, checked_at: datetime = None
+    ):
+        """
+        根据画师最近作品估算并持久化下次检查时间
+
+        :param checked_at: 计算下次检查时间的基准，定时检查传入本轮开始时间
+        """
+        min_minutes = self.pixiv_config.subscription_check_interval_minutes
+        max_minutes = max(
+            min_minutes, self.pixiv_config.subscription_max_check_interval_minutes
+        )
+        create_dates = [_parse_create_date(i.create_date) for i in illusts]
+        now = datetime.now()
+        interval = estimate_poll_interval(create_dates, min_minutes, max_minutes, now)
+        last_post_at = max((d for d in create_dates if d), default=None)
+        save_artist_poll_state(
+            target_id,
+            (checked_at or now) + timedelta(minutes=interval),
+            interval,
+            last_post_at,
+        )
+
+    async def check_follow_feed(self, artist_subs: dict, report: dict) -> dict:
+        """
+        轮询账号关注动态，将新作品按画师分发给订阅的会话
+
+        :param artist_subs: {target_id: [sub, ...]}
+        :return: 未被关注动态覆盖、仍需逐个轮询的画师分组
+        """
+        feed_ids = await self._sync_follows(set(artist_subs))
+        if not feed_ids:
+            return artist_subs
+
+        # 只翻页到上一轮看到的最新作品（首轮为已通知过的最新作品）为止
+        stop_id = self._feed_cursor
+        if stop_id is None:
+            stop_id = max(
+                sub.last_notified_illust_id
+                for target_id in feed_ids
+                for sub in artist_subs[target_id]
+            )
+        api: AppPixivAPI = self.client
+        feed_illusts = {}
+        newest_id = None
+        next_params = {"restrict": "public"}
+        page_count = 0
+        reached = False
+        while next_params and page_count < FOLLOW_FEED_MAX_PAGES:
+            json_result = await self.client_wrapper.call_pixiv_api(
+                api.illust_follow, **next_params
+            )
+            if not json_result or not json_result.illusts:
+                break
+            if page_count == 0:
+                newest_id = json_result.illusts[0].id
+            page_count += 1
+            for illust in json_result.illusts:
+                if illust.id <= stop_id:
+                    reached = True
+                    break
+                user_id = str(illust.user.id)
+                if user_id in feed_ids:
+                    feed_illusts.setdefault(user_id, []).append(illust)
+            if reached:
+                break
+            next_url = json_result.next_url
+            next_params = api.parse_qs(next_url) if next_url else None
+
+        if not reached and next_params:
+            logger.warning(
+                f"关注动态翻页已达上限 {FOLLOW_FEED_MAX_PAGES} 页，部分较早的更新可能被跳过。"
+            )
+        logger.info(
+            f"关注动态检查：翻页 {page_count} 页，覆盖 {len(feed_ids)} 位画师，"
+            f"其中 {len(feed_illusts)} 位有新作品。"
+        )
+
+        if newest_id is not None:
+            self._feed_cursor = max(newest_id, stop_id)
+
+        mark_subscriptions_checked("artist", feed_ids, datetime.now())
+
+        for target_id in feed_ids:
+            illusts = feed_illusts.get(target_id)
+            try:
+                if illusts:
+                    report["delivered"] += await self._dispatch_new_illusts(
+                        artist_subs[target_id], illusts
+                    )
+                report["checked"] += 1
+            except Exception as e:
+                report["failed"] += 1
+                logger.error(f"分发关注动态 artist: {target_id} 时发生错误: {e}")
+
+        return {
+            target_id: subs
+            for target_id, subs in artist_subs.items()
+            if target_id not in feed_ids
+        }
+
+    async def _sync_follows(self, subscribed_ids: set) -> set:
+        """
+        让账号关注所有被订阅的画师（只增不减）
+
+        :return: 本轮可通过关注动态检查的画师ID集合（不含本轮新关注的画师）
+        """
+        api: AppPixivAPI = self.client
+        now = time.monotonic()
+        if (
+            self._followed_ids is None
+            or now - self._followed_synced_at > FOLLOW_SYNC_INTERVAL_SECONDS
+        ):
+            self._followed_ids = await self._fetch_following_ids()
+            self._followed_synced_at = now
+
+        newly_followed = set()
+        for target_id in subscribed_ids - self._followed_ids:
+            try:
+                result = await self.client_wrapper.call_pixiv_api(
+                    api.user_follow_add, int(target_id)
                 )
-            await asyncio.sleep(5)
+                if result and "error" in result:
+                    logger.warning(f"关注画师 {target_id} 失败: {result.error}")
+                    continue
+                self._followed_ids.add(target_id)
+                newly_followed.add(target_id)
+            except Exception as e:
+                logger.warning(f"关注画师 {target_id} 失败: {e}")
+
+        if newly_followed:
+            logger.info(f"关注动态模式：已自动关注 {len(newly_followed)} 位订阅画师。")
+        # 新关注的画师在本轮仍逐个轮询，避免其已有作品在时间线中的位置早于水位线而被漏掉
+        return (subscribed_ids & self._followed_ids) - newly_followed
+
+    async def _fetch_following_ids(self) -> set:
+        """获取账号当前公开关注的全部画师ID"""
+        api: AppPixivAPI = self.client
+        following_ids = set()
+        next_params = {"user_id": api.user_id, "restrict": "public"}
+        while next_params:
+            json_result = await self.client_wrapper.call_pixiv_api(
+                api.user_following, **next_params
+            )
+            if not json_result or not json_result.user_previews:
+                break
+            for preview in json_result.user_previews:
+                following_ids.add(str(preview.user.id))
+            next_url = json_result.next_url
+            next_params = api.parse_qs(next_url) if next_url else None
+        logger.info(f"关注动态模式：账号当前关注 {len(following_ids)} 位画师。")
+        return following_ids
 
-    async def check_artist_updates(self, sub):
-        """检查画师更新"""
+    async def check_artist_updates(
+        self, target_id: str, subs: list, cycle_started_at: datetime = None
+    ) -> int:
+        """
+        检查画师更新，并按每个订阅者各自的 last_notified_illust_id 分发新作品
+
+        :param cycle_started_at: 所属检查轮次的开始时间，用于计算下次检查时间
+        :return: 本次推送的更新条数
+        """
         api: AppPixivAPI = self.client
-        json_result = await asyncio.to_thread(api.user_illusts, sub.target_id)
+        json_result = await self.client_wrapper.call_pixiv_api(
+            api.user_illusts, target_id
+        )
 
-        if not json_result or not json_result.illusts:
-            return
+        mark_subscriptions_checked("artist", [target_id], datetime.now())
+        illusts = None
+        if isinstance(json_result, dict):
+            illusts = json_result.get("illusts")
+        elif json_result is not None:
+            illusts = getattr(json_result, "illusts", None)
+        # 只有成功的响应才重新估算；限流、认证失败等错误响应不含 illusts，
+        # 保持原下次检查时间不变，画师在下一轮仍然到期并重试
+        if self.pixiv_config.subscription_adaptive_interval and illusts is not None:
+            self._schedule_next_check(target_id, illusts, cycle_started_at)
 
+        if not illusts:
+            return 0
+
+        return await self._dispatch_new_illusts(subs, illusts)
+
+    async def _dispatch_new_illusts(self, subs: list, illusts: list) -> int:
+        """
+        将同一画师的作品（按 ID 降序）分发给各订阅者，并批量更新水位线
+
+        :return: 本次推送的更新条数
+        """
+        # 以所有订阅者中最旧的水位线为界收集新作品
+        oldest_watermark = min(sub.last_notified_illust_id for sub in subs)
         new_illusts = []
-        for illust in json_result.illusts:
-            if illust.id > sub.last_notified_illust_id:
+        for illust in illusts:
+            if illust.id > oldest_watermark:
                 new_illusts.append(illust)
             else:
                 break
 
-        if new_illusts:
-            new_illusts.reverse()
-            latest_id = new_illusts[-1].id
-            update_last_notified_id(sub.chat_id, sub.sub_type, sub.target_id, latest_id)
+        if not new_illusts:
+            return 0
 
-            for illust in new_illusts:
-                filtered_illusts, _ = filter_items(
-                    [illust], f"画师订阅: {sub.target_name}"
+        new_illusts.reverse()
+        latest_id = new_illusts[-1].id
+
+        # 每个订阅者只接收比自己水位线更新的作品，水位线在一个事务中批量更新
+        deliveries = []
+        watermark_updates = []
+        for sub in subs:
+            pending = [i for i in new_illusts if i.id > sub.last_notified_illust_id]
+            if pending:
+                deliveries.append((sub, pending))
+                watermark_updates.append(
+                    (sub.chat_id, sub.sub_type, sub.target_id, latest_id)
                 )
-                if filtered_illusts:
-                    await self.send_update(sub, filtered_illusts[0])
-                    await asyncio.sleep(2)
+        update_last_notified_ids(watermark_updates)
+
+        # 过滤结果与订阅者无关，每个作品只过滤一次
+        target_name = subs[0].target_name
+        allowed_ids = set()
+        for illust in new_illusts:
+            filtered_illusts, _ = filter_items([illust], f"画师订阅: {target_name}")
+            if filtered_illusts:
+                allowed_ids.add(illust.id)
 
-    async def send_update(self, sub, illust):
-        """发送更新通知"""
+        # 每个新作品只渲染一次（下载/压缩/动图转码），再并发投递给所有待通知的会话
+        delivered = 0
+        for illust in new_illusts:
+            if illust.id not in allowed_ids:
+                continue
+            targets = [sub for sub, pending in deliveries if illust in pending]
+            if not targets:
+                continue
+            chains = await self.render_update(targets[0], illust)
+            if chains:
+                try:
+                    delivered += await self.deliver_update(
+                        [sub.session_id for sub in targets], chains
+                    )
+                finally:
+                    # 所有会话投递结束后释放消息链引用的临时文件
+                    release_message_files(chains)
+            await asyncio.sleep(2)
+        return delivered
+
+    async def render_update(self, sub, illust) -> list:
+        """渲染更新通知，返回可直接发送给任意会话的消息链列表"""
         try:
             # 导入 MessageChain 类
             from astrbot.core.message.message_event_result import MessageChain
@@ -107,7 +536,6 @@ class SubscriptionService:
 
             mock_event = MockEvent()
 
-            session_id_str = sub.session_id
             detail_message = (
                 f"您订阅的 {sub.sub_type} [{sub.target_name}] 有新作品啦！\n"
             )
@@ -115,6 +543,7 @@ class SubscriptionService:
 
             # 使用 async for 循环来驱动 send_pixiv_image 生成器
             # 并通过 mock_event 捕获其 yield 的结果
+            chains = []
             async for message_content in send_pixiv_image(
                 self.client,
                 mock_event,
@@ -124,15 +553,48 @@ class SubscriptionService:
             ):
                 if message_content:
                     if hasattr(message_content, "chain"):
-                        await self.context.send_message(session_id_str, message_content)
+                        # 投递在渲染之后进行，先为临时文件增加引用
+                        hold_message_files(message_content)
+                        chains.append(message_content)
                     else:
                         # 如果不是 MessageChain 对象，创建一个
                         message_chain = MessageChain()
                         message_chain.message(str(message_content))
-                        await self.context.send_message(session_id_str, message_chain)
+                        chains.append(message_chain)
+            return chains
 
         except Exception as e:
-            logger.error(f"发送订阅更新时出错: {e}")
+            logger.error(f"渲染订阅更新时出错: {e}")
             import traceback
 
             logger.error(traceback.format_exc())
+            return []
+
+    async def deliver_update(self, session_ids: list, chains: list) -> int:
+        """
+        将已渲染的消息链并发投递给多个会话，单个会话失败时按退避重试
+
+        :return: 投递成功的会话数量
+        """
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+
+        async def deliver(session_id: str) -> bool:
+            async with semaphore:
+                # 重试时从失败的那条消息继续，避免重复发送已成功的部分
+                sent = 0
+                for attempt in range(1, SEND_RETRY_TIMES + 1):
+                    try:
+                        while sent < len(chains):
+                            await self.context.send_message(session_id, chains[sent])
+                            sent += 1
+                        return True
+                    except Exception as e:
+                        logger.warning(
+                            f"发送订阅更新到 {session_id} 失败（第 {attempt}/{SEND_RETRY_TIMES} 次）: {e}"
+                        )
+                        if attempt < SEND_RETRY_TIMES:
+                            await asyncio.sleep(2**attempt)
+                return False
+
+        results = await asyncio.gather(*(deliver(sid) for sid in session_ids))
+        return sum(1 for ok in results if ok)
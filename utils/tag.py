@@ -5,13 +5,30 @@ tag.py
 
 from dataclasses import dataclass
 from typing import List, Optional, Callable
+import heapq
 import random
+import re
+
+from .collage import collage_available
 
 # R18 与 AI 敏感词列表
 R18_BADWORDS = [s.lower() for s in ["R-18", "R18", "R-18G", "R18G", "R18+", "R18+G"]]
 AI_BADWORDS = [s.lower() for s in ["AI", "AI生成", "AI-generated", "AI辅助"]]
 
+# 多标签拼接时使用的分隔符，保证关键词不会跨标签命中
+_TAG_SEPARATOR = " \x00 "
+
+# 流式 Top-K 收集时保留的候选数量为 K 的倍数
+TOP_K_OVERSAMPLE = 2
+# 拼图模式下至少需要的作品数，单个作品仍直接发送
+COLLAGE_MIN_ITEMS = 2
+# 拼图下方的提示
+COLLAGE_FOOTER = (
+    "使用 /pixiv_original <编号> 获取原图，或 /pixiv_specific <ID> 查看完整作品"
+)
+
 _FILTER_CONFIG_SOURCE = None
+_NO_VALUE = object()
 
 
 def set_filter_config_source(config) -> None:
@@ -39,6 +56,7 @@ class FilterConfig:
     min_views: Optional[int] = None
     min_likes: Optional[int] = None
     enable_stat_filters: bool = True
+    collage: Optional[bool] = None  # 为 None 时读取插件配置 collage_mode
 
 
 def _get_value(source, *keys):
@@ -50,8 +68,9 @@ def _get_value(source, *keys):
         return None
 
     for key in keys:
-        if hasattr(source, key):
-            return getattr(source, key)
+        value = getattr(source, key, _NO_VALUE)
+        if value is not _NO_VALUE:
+            return value
     return None
 
 
@@ -84,6 +103,25 @@ def _resolve_threshold(config: FilterConfig, attr_name: str) -> int:
     return _normalize_threshold(value)
 
 
+def _use_collage(config: FilterConfig, items, is_novel: bool = False) -> bool:
+    """多个作品时是否改为发送一张缩略图拼图"""
+    if is_novel or len(items) < COLLAGE_MIN_ITEMS:
+        return False
+    enabled = config.collage
+    if enabled is None and _FILTER_CONFIG_SOURCE is not None:
+        enabled = getattr(_FILTER_CONFIG_SOURCE, "collage_mode", False)
+    return bool(enabled) and collage_available()
+
+
+def _remember_results(event, illusts, is_novel: bool) -> None:
+    """记录本次发送的作品，供按编号获取原图；延迟导入避免与 pixiv_utils 循环导入"""
+    if is_novel or not illusts:
+        return
+    from .pixiv_utils import remember_results
+
+    remember_results(event, illusts)
+
+
 def _is_below_threshold(value, threshold: int) -> bool:
     """Treat missing metrics as unknown instead of auto-failing the item."""
     return threshold > 0 and value is not None and value < threshold
@@ -120,46 +158,80 @@ def _extract_tag_names(tags) -> List[str]:
     return [name] if name else []
 
 
-def is_r18(item):
-    """检查作品是否为R18内容"""
-    x_restrict = _to_int(_get_value(item, "x_restrict", "xRestrict"))
-    if x_restrict is not None and x_restrict > 0:
-        return True
+def _compile_keywords(keywords, whole_word: bool = False):
+    """
+    将关键词列表编译为单个多模式匹配器，一次扫描即可判断是否命中任意关键词
 
-    for name in _extract_tag_names(_get_value(item, "tags") or []):
-        lname = name.lower()
-        # 精确匹配或作为独立词匹配
-        if lname in R18_BADWORDS or any(
-            bad
-            for bad in R18_BADWORDS
-            if f" {bad} " in f" {lname} "
-            or lname.startswith(f"{bad} ")
-            or lname.endswith(f" {bad}")
-        ):
-            return True
-    return False
+    whole_word=True 时关键词需以独立词（空格分隔）出现在标签中
+    """
+    patterns = sorted({k for k in keywords if k}, key=len, reverse=True)
+    if not patterns:
+        return None
+    if whole_word:
+        patterns = [f" {k} " for k in patterns]
+    return re.compile("|".join(re.escape(k) for k in patterns))
 
 
-def is_ai(item):
-    """检查作品是否为AI生成内容"""
+_R18_MATCHER = _compile_keywords(R18_BADWORDS, whole_word=True)
+_AI_MATCHER = _compile_keywords(AI_BADWORDS, whole_word=True)
+
+
+def _item_tag_names(item) -> List[str]:
+    """提取作品的标签名列表（_extract_tag_names 的热路径版本）"""
+    tags = _get_value(item, "tags") or []
+    if not isinstance(tags, (list, tuple, set)):
+        return _extract_tag_names(tags)
+
+    # 内联 _extract_tag_name，避免逐个标签的多层函数调用
+    names = []
+    for tag in tags:
+        if isinstance(tag, str):
+            name = tag
+        elif isinstance(tag, dict):
+            name = tag.get("name")
+        else:
+            name = getattr(tag, "name", None)
+        if isinstance(name, str):
+            name = name.strip()
+            if name:
+                names.append(name)
+    return names
+
+
+def _build_tag_text(item) -> str:
+    """将作品的全部标签小写后拼接为一个字符串，每个标签两侧补空格便于整词匹配"""
+    names = _item_tag_names(item)
+    if not names:
+        return ""
+    return f" {_TAG_SEPARATOR.join(names).lower()} "
+
+
+def _has_r18_flag(item) -> bool:
+    x_restrict = _to_int(_get_value(item, "x_restrict", "xRestrict"))
+    return x_restrict is not None and x_restrict > 0
+
+
+def _has_ai_flag(item) -> bool:
     ai_type = _to_int(
         _get_value(item, "illust_ai_type", "illustAiType", "ai_type", "aiType")
     )
-    if ai_type is not None and ai_type > 0:
+    return ai_type is not None and ai_type > 0
+
+
+def is_r18(item):
+    """检查作品是否为R18内容"""
+    if _has_r18_flag(item):
         return True
+    # 标签精确匹配或作为独立词匹配
+    return _R18_MATCHER.search(_build_tag_text(item)) is not None
 
-    for name in _extract_tag_names(_get_value(item, "tags") or []):
-        lname = name.lower()
-        # 精确匹配或作为独立词匹配
-        if lname in AI_BADWORDS or any(
-            bad
-            for bad in AI_BADWORDS
-            if f" {bad} " in f" {lname} "
-            or lname.startswith(f"{bad} ")
-            or lname.endswith(f" {bad}")
-        ):
-            return True
-    return False
+
+def is_ai(item):
+    """检查作品是否为AI生成内容"""
+    if _has_ai_flag(item):
+        return True
+    # 标签精确匹配或作为独立词匹配
+    return _AI_MATCHER.search(_build_tag_text(item)) is not None
 
 
 def is_ugoira(item):
@@ -167,8 +239,17 @@ def is_ugoira(item):
     return getattr(item, "type", None) == "ugoira"
 
 
+def _fast_int_field(item, key):
+    """热路径：直接读取常见的整数字段，非 int 时返回 None 交由通用逻辑处理"""
+    value = item.get(key) if isinstance(item, dict) else getattr(item, key, None)
+    return value if type(value) is int else None
+
+
 def _get_bookmark_count(item):
     """读取作品书签数。"""
+    value = _fast_int_field(item, "total_bookmarks")
+    if value is not None:
+        return value
     return _to_int(
         _get_value(
             item,
@@ -182,6 +263,9 @@ def _get_bookmark_count(item):
 
 def _get_view_count(item):
     """读取作品阅读量。"""
+    value = _fast_int_field(item, "total_view")
+    if value is not None:
+        return value
     return _to_int(
         _get_value(item, "total_view", "totalView", "view_count", "viewCount")
     )
@@ -202,60 +286,148 @@ def _get_like_count(item):
     )
 
 
-def _get_low_stat_reasons(illusts: List, config: FilterConfig) -> List[str]:
-    """生成命中的互动阈值原因列表。"""
-    reasons = []
-    min_bookmarks = _resolve_threshold(config, "min_bookmarks")
-    min_views = _resolve_threshold(config, "min_views")
-    min_likes = _resolve_threshold(config, "min_likes")
+@dataclass
+class FilterStats:
+    """一次过滤过程中各过滤条件的命中计数"""
 
-    if min_bookmarks > 0 and any(
-        _is_below_threshold(_get_bookmark_count(item), min_bookmarks)
-        for item in illusts
-    ):
-        reasons.append(f"书签数低于 {min_bookmarks}")
-    if min_views > 0 and any(
-        _is_below_threshold(_get_view_count(item), min_views) for item in illusts
-    ):
-        reasons.append(f"阅读量低于 {min_views}")
-    if min_likes > 0 and any(
-        _is_below_threshold(_get_like_count(item), min_likes) for item in illusts
-    ):
-        reasons.append(f"点赞数低于 {min_likes}")
+    r18: int = 0  # R18 作品数
+    ai: int = 0  # AI 作品数
+    excluded: int = 0  # 含排除标签的作品数
+    low_bookmarks: int = 0  # 书签数低于阈值的作品数
+    low_views: int = 0  # 阅读量低于阈值的作品数
+    low_likes: int = 0  # 点赞数低于阈值的作品数
 
-    return reasons
 
+class CompiledFilter:
+    """
+    由 FilterConfig 编译得到的过滤谓词
 
-def _apply_filters(item, config: FilterConfig) -> bool:
-    """应用所有过滤条件"""
-    if config.r18_mode == "过滤 R18" and is_r18(item):
-        return False
-    if config.r18_mode == "仅 R18" and not is_r18(item):
-        return False
-    if config.ai_filter_mode == "过滤 AI 作品" and is_ai(item):
-        return False
-    if config.ai_filter_mode == "仅 AI 作品" and not is_ai(item):
-        return False
-    if config.excluded_tags and has_excluded_tags(item, config.excluded_tags):
-        return False
-    if config.enable_stat_filters:
-        if _is_below_threshold(
-            _get_bookmark_count(item), _resolve_threshold(config, "min_bookmarks")
+    过滤模式与互动阈值在编译时解析一次；每个作品的标签只提取并小写一次，
+    R18/AI 敏感词与排除标签均通过预编译的多模式匹配器单次扫描完成。
+    """
+
+    __slots__ = (
+        "r18_mode",
+        "ai_mode",
+        "excluded_matcher",
+        "min_bookmarks",
+        "min_views",
+        "min_likes",
+    )
+
+    def __init__(self, config: FilterConfig):
+        # "filter" 表示过滤命中项，"only" 表示仅保留命中项，None 表示不检查
+        self.r18_mode = {"过滤 R18": "filter", "仅 R18": "only"}.get(config.r18_mode)
+        self.ai_mode = {"过滤 AI 作品": "filter", "仅 AI 作品": "only"}.get(
+            config.ai_filter_mode
+        )
+        self.excluded_matcher = _compile_keywords(config.excluded_tags or [])
+        if config.enable_stat_filters:
+            self.min_bookmarks = _resolve_threshold(config, "min_bookmarks")
+            self.min_views = _resolve_threshold(config, "min_views")
+            self.min_likes = _resolve_threshold(config, "min_likes")
+        else:
+            self.min_bookmarks = self.min_views = self.min_likes = 0
+
+    def __call__(self, item) -> bool:
+        """判断作品是否通过全部过滤条件"""
+        # 先做廉价的数值阈值检查，未通过时无需再扫描标签
+        if self.min_bookmarks and _is_below_threshold(
+            _get_bookmark_count(item), self.min_bookmarks
         ):
             return False
-        if _is_below_threshold(
-            _get_view_count(item), _resolve_threshold(config, "min_views")
+        if self.min_views and _is_below_threshold(
+            _get_view_count(item), self.min_views
         ):
             return False
-        if _is_below_threshold(
-            _get_like_count(item), _resolve_threshold(config, "min_likes")
+        if self.min_likes and _is_below_threshold(
+            _get_like_count(item), self.min_likes
         ):
             return False
-    return True
+
+        # 标签文本按需构建，且每个作品最多构建一次
+        tag_text = None
+        if self.r18_mode:
+            r18 = _has_r18_flag(item)
+            if not r18:
+                tag_text = _build_tag_text(item)
+                r18 = _R18_MATCHER.search(tag_text) is not None
+            if r18 != (self.r18_mode == "only"):
+                return False
+        if self.ai_mode:
+            ai = _has_ai_flag(item)
+            if not ai:
+                if tag_text is None:
+                    tag_text = _build_tag_text(item)
+                ai = _AI_MATCHER.search(tag_text) is not None
+            if ai != (self.ai_mode == "only"):
+                return False
+        if self.excluded_matcher is not None:
+            if tag_text is None:
+                tag_text = _build_tag_text(item)
+            if self.excluded_matcher.search(tag_text) is not None:
+                return False
+        return True
+
+    def inspect(self, item, stats: FilterStats) -> bool:
+        """判断作品是否通过过滤，并将命中的每一项条件累计到 stats（不短路）"""
+        passed = True
+        if self.min_bookmarks and _is_below_threshold(
+            _get_bookmark_count(item), self.min_bookmarks
+        ):
+            stats.low_bookmarks += 1
+            passed = False
+        if self.min_views and _is_below_threshold(
+            _get_view_count(item), self.min_views
+        ):
+            stats.low_views += 1
+            passed = False
+        if self.min_likes and _is_below_threshold(
+            _get_like_count(item), self.min_likes
+        ):
+            stats.low_likes += 1
+            passed = False
+
+        if not (self.r18_mode or self.ai_mode or self.excluded_matcher is not None):
+            return passed
+
+        tag_text = _build_tag_text(item)
+        if self.r18_mode:
+            r18 = _has_r18_flag(item) or _R18_MATCHER.search(tag_text) is not None
+            stats.r18 += r18
+            if r18 != (self.r18_mode == "only"):
+                passed = False
+        if self.ai_mode:
+            ai = _has_ai_flag(item) or _AI_MATCHER.search(tag_text) is not None
+            stats.ai += ai
+            if ai != (self.ai_mode == "only"):
+                passed = False
+        if (
+            self.excluded_matcher is not None
+            and self.excluded_matcher.search(tag_text) is not None
+        ):
+            stats.excluded += 1
+            passed = False
+        return passed
+
+    def low_stat_reasons(self, stats: FilterStats) -> List[str]:
+        """根据计数生成命中的互动阈值原因列表"""
+        reasons = []
+        if stats.low_bookmarks:
+            reasons.append(f"书签数低于 {self.min_bookmarks}")
+        if stats.low_views:
+            reasons.append(f"阅读量低于 {self.min_views}")
+        if stats.low_likes:
+            reasons.append(f"点赞数低于 {self.min_likes}")
+        return reasons
 
 
 def _generate_filter_messages(
-    initial_count: int, filtered_count: int, config: FilterConfig, illusts: List
+    initial_count: int,
+    filtered_count: int,
+    config: FilterConfig,
+    predicate: CompiledFilter,
+    stats: FilterStats,
 ) -> List[str]:
     """生成过滤结果消息"""
     filter_msgs = []
@@ -272,8 +444,7 @@ def _generate_filter_messages(
             filter_reasons.append("AI")
         if config.excluded_tags:
             filter_reasons.append("排除标签")
-        if config.enable_stat_filters:
-            filter_reasons.extend(_get_low_stat_reasons(illusts, config))
+        filter_reasons.extend(predicate.low_stat_reasons(stats))
 
         if filter_reasons:
             filter_msgs.append(
@@ -288,32 +459,34 @@ def _generate_filter_messages(
 
     # 处理无结果的情况
     if filtered_count == 0:
-        filter_msgs.extend(_generate_no_result_messages(initial_count, config, illusts))
+        filter_msgs.extend(
+            _generate_no_result_messages(initial_count, config, predicate, stats)
+        )
 
     return filter_msgs
 
 
 def _generate_no_result_messages(
-    initial_count: int, config: FilterConfig, illusts: List
+    initial_count: int,
+    config: FilterConfig,
+    predicate: CompiledFilter,
+    stats: FilterStats,
 ) -> List[str]:
     """生成无结果时的详细消息"""
     msgs = []
     no_result_reason = []
 
-    if config.r18_mode == "过滤 R18" and any(is_r18(i) for i in illusts):
+    if predicate.r18_mode == "filter" and stats.r18:
         no_result_reason.append("R18 内容")
-    if config.ai_filter_mode == "过滤 AI 作品" and any(is_ai(i) for i in illusts):
+    if predicate.ai_mode == "filter" and stats.ai:
         no_result_reason.append("AI 作品")
-    if config.r18_mode == "仅 R18" and not any(is_r18(i) for i in illusts):
+    if predicate.r18_mode == "only" and not stats.r18:
         no_result_reason.append("非 R18 内容")
-    if config.ai_filter_mode == "仅 AI 作品" and not any(is_ai(i) for i in illusts):
+    if predicate.ai_mode == "only" and not stats.ai:
         no_result_reason.append("非 AI 作品")
-    if config.excluded_tags and any(
-        has_excluded_tags(i, config.excluded_tags) for i in illusts
-    ):
+    if stats.excluded:
         no_result_reason.append("包含排除标签")
-    if config.enable_stat_filters:
-        no_result_reason.extend(_get_low_stat_reasons(illusts, config))
+    no_result_reason.extend(predicate.low_stat_reasons(stats))
 
     if no_result_reason and initial_count > 0:
         msgs.append(
@@ -346,16 +519,75 @@ def _generate_no_result_messages(
 def filter_illusts_with_reason(illusts, config: FilterConfig):
     """统一 R18/AI/排除标签/互动阈值过滤逻辑，返回过滤后的作品列表和提示。"""
     initial_count = len(illusts)
-    filtered_list = [item for item in illusts if _apply_filters(item, config)]
-    filtered_count = len(filtered_list)
+    predicate = CompiledFilter(config)
+    if not config.show_filter_result:
+        # 不展示过滤原因时无需统计，使用可短路的谓词
+        return [item for item in illusts if predicate(item)], []
 
+    # 单次遍历完成过滤并统计各项原因，提示消息直接由计数生成
+    stats = FilterStats()
+    filtered_list = [item for item in illusts if predicate.inspect(item, stats)]
     filter_msgs = _generate_filter_messages(
-        initial_count, filtered_count, config, illusts
+        initial_count, len(filtered_list), config, predicate, stats
     )
 
     return filtered_list, filter_msgs
 
 
+class TopKCollector:
+    """
+    流式 Top-K 收集器：逐页消费作品，过滤后只保留书签数最高的 k × TOP_K_OVERSAMPLE 个候选
+
+    内存占用与翻页数无关；过滤计数与 filter_illusts_with_reason 一致，可生成相同的提示消息。
+    """
+
+    def __init__(self, config: FilterConfig, k: int):
+        self.config = config
+        self.capacity = max(1, k) * TOP_K_OVERSAMPLE
+        self.predicate = CompiledFilter(config)
+        self.stats = FilterStats()
+        self.seen_count = 0  # 已消费的作品数
+        self.passed_count = 0  # 通过过滤的作品数
+        self.top_bookmark = 0  # 过滤前的最高书签数
+        # 最小堆，元素为 (书签数, -序号, 作品)；书签数相同时先淘汰较晚到达的作品
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, illusts) -> None:
+        """消费一页作品"""
+        for illust in illusts or []:
+            self.seen_count += 1
+            bookmarks = _get_bookmark_count(illust) or 0
+            if bookmarks > self.top_bookmark:
+                self.top_bookmark = bookmarks
+            if not self.predicate.inspect(illust, self.stats):
+                continue
+            self.passed_count += 1
+            entry = (bookmarks, -self.seen_count, illust)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+
+    def results(self) -> list:
+        """按书签数降序返回候选（书签数相同按到达顺序）"""
+        return [
+            entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)
+        ]
+
+    def filter_messages(self) -> List[str]:
+        """根据收集过程中的计数生成过滤提示消息"""
+        return _generate_filter_messages(
+            self.seen_count,
+            self.passed_count,
+            self.config,
+            self.predicate,
+            self.stats,
+        )
+
+
 def format_tags(tags) -> str:
     """
     将Pixiv标签结构（支持list/dict/str）格式化为:
@@ -437,14 +669,10 @@ def has_excluded_tags(item, excluded_tags):
     Returns:
         bool: 如果包含排除标签返回True，否则返回False
     """
-    if not excluded_tags:
+    matcher = _compile_keywords(excluded_tags or [])
+    if matcher is None:
         return False
-
-    for name in _extract_tag_names(_get_value(item, "tags") or []):
-        lname = name.lower()
-        if any(excluded_tag in lname for excluded_tag in excluded_tags):
-            return True
-    return False
+    return matcher.search(_build_tag_text(item)) is not None
 
 
 async def process_and_send_illusts(
@@ -525,8 +753,23 @@ async def process_and_send_illusts(
     if not illusts_to_send:
         return
 
+    _remember_results(event, illusts_to_send, is_novel)
+
     # 根据配置决定发送方式
-    if config.forward_threshold:
+    if _use_collage(config, illusts_to_send, is_novel):
+        # 拼图模式：一张缩略图网格代替多张大图；延迟导入避免与 pixiv_utils 循环导入
+        from .pixiv_utils import send_collage
+
+        related_ids = [
+            illust_id
+            for illust_id in map(_get_illust_id, illusts_to_send)
+            if illust_id is not None
+        ]
+        async for result in send_collage(
+            client, event, illusts_to_send, footer=COLLAGE_FOOTER
+        ):
+            yield _wrap_result(result, related_ids)
+    elif config.forward_threshold:
         # 启用转发时使用转发消息（无论图片数量多少）
         related_ids = []
         for illust in illusts_to_send:
@@ -683,9 +926,8 @@ def sample_illusts(illusts, count, shuffle=False):
         return []
 
 
-async def process_and_send_illusts_sorted(
-    sorted_illusts,
-    config: FilterConfig,
+async def process_and_send_top_illusts(
+    collector: TopKCollector,
     client,
     event,
     build_detail_message_func,
@@ -693,29 +935,34 @@ async def process_and_send_illusts_sorted(
     send_forward_message_func,
     is_novel=False,
 ):
-    """
-    处理已排序的作品列表并发送
-    """
-    filtered_illusts, filter_msgs = filter_illusts_with_reason(sorted_illusts, config)
-
+    """发送流式 Top-K 收集器中书签数最高的 return_count 个作品"""
+    config = collector.config
+    illusts_to_send = collector.results()[: config.return_count]
+    filter_msgs = collector.filter_messages()
     if config.show_filter_result:
         for msg in filter_msgs:
             yield event.plain_result(msg)
 
-    if not filtered_illusts:
+    if collector.passed_count == 0:
         if config.show_filter_result and not filter_msgs:
             yield event.plain_result("筛选后没有符合条件的作品可发送。")
         elif not config.show_filter_result:
             yield event.plain_result("没有找到符合条件的作品。")
         return
 
-    count_to_send = min(len(filtered_illusts), config.return_count)
-    illusts_to_send = filtered_illusts[:count_to_send]
-
     if not illusts_to_send:
         return
 
-    if config.forward_threshold:
+    _remember_results(event, illusts_to_send, is_novel)
+
+    if _use_collage(config, illusts_to_send, is_novel):
+        from .pixiv_utils import send_collage
+
+        async for result in send_collage(
+            client, event, illusts_to_send, footer=COLLAGE_FOOTER
+        ):
+            yield result
+    elif config.forward_threshold:
         async for result in send_forward_message_func(
             client,
             event,
@@ -0,0 +1,176 @@
+"""
+temp_files.py
+临时文件生命周期管理：登记插件写入临时目录的文件并做引用计数，
+最后一个引用释放时删除；一直未释放的文件超过保留时间后由登记表清理。
+热路径上不扫描目录，只在启动时一次性清理上次运行遗留的文件。
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import aiofiles
+from astrbot.api import logger
+
+# 未释放的临时文件最长保留时间（秒），需覆盖提前准备的随机推送等延迟发送场景
+TEMP_FILE_TTL_SECONDS = 3 * 60 * 60
+# 两次过期清理之间的最短间隔（秒）
+TEMP_SWEEP_INTERVAL_SECONDS = 60
+# 本地文件消息组件的 URI 前缀
+FILE_URI_PREFIX = "file:///"
+
+
+class _TempEntry:
+    __slots__ = ("refs", "expires_at")
+
+    def __init__(self, expires_at: float):
+        self.refs = 1
+        self.expires_at = expires_at
+
+
+def _remove_path(path: str) -> None:
+    """删除临时文件或目录，文件已不存在时忽略"""
+    target = Path(path)
+    try:
+        if target.is_dir():
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            target.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"[PixivPlugin] 删除临时项失败: {path}，原因: {e}")
+
+
+class TempFileManager:
+    """
+    引用计数的临时文件管理器
+
+    write / mkdtemp 创建的路径初始持有 1 个引用（属于创建者）。
+    消息链需要延后发送时，由持有方调用 hold 增加引用，发送完成后 release_message 释放；
+    引用归零即删除文件。
+    """
+
+    def __init__(self, temp_dir: Path, ttl: float = TEMP_FILE_TTL_SECONDS):
+        # 与 Image.fromFileSystem 生成的 file:/// 路径保持一致
+        self.temp_dir = Path(os.path.abspath(temp_dir))
+        self.ttl = ttl
+        self._entries: dict[str, _TempEntry] = {}
+        self._last_sweep = time.monotonic()
+
+    def cleanup_orphans(self) -> int:
+        """启动时清理临时目录中未登记的文件（上次运行遗留），返回删除的条目数"""
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        removed = 0
+        for entry in self.temp_dir.iterdir():
+            if str(entry) in self._entries:
+                continue
+            _remove_path(str(entry))
+            removed += 1
+        if removed:
+            logger.info(f"[PixivPlugin] 已清理 {removed} 个遗留的临时文件")
+        return removed
+
+    def _register(self, path: Path) -> str:
+        self._sweep_expired()
+        key = str(path)
+        self._entries[key] = _TempEntry(time.monotonic() + self.ttl)
+        return key
+
+    async def write(
+        self, data: bytes, ext: str = ".jpg", prefix: str = "pixiv_"
+    ) -> Path:
+        """写入新的临时文件并登记，调用方持有 1 个引用"""
+        path = self.temp_dir / f"{prefix}{uuid.uuid4().hex}{ext}"
+        key = self._register(path)
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                await f.write(data)
+        except Exception:
+            self.release(key)
+            raise
+        return path
+
+    async def mkdtemp(self, prefix: str = "pixiv_") -> Path:
+        """创建并登记一个临时工作目录，用完后调用 discard 删除"""
+        path = await asyncio.to_thread(
+            tempfile.mkdtemp, prefix=prefix, dir=self.temp_dir
+        )
+        self._register(Path(path))
+        return Path(path)
+
+    async def discard(self, path) -> None:
+        """不论引用数立即注销并在线程中删除（用于体积较大的工作目录）"""
+        key = str(path)
+        self._entries.pop(key, None)
+        await asyncio.to_thread(_remove_path, key)
+
+    def acquire(self, path) -> bool:
+        """为已登记的路径增加一个引用；未登记或已删除时返回 False"""
+        entry = self._entries.get(str(path))
+        if entry is None:
+            return False
+        entry.refs += 1
+        return True
+
+    def release(self, path) -> None:
+        """释放一个引用，归零时删除；未登记的路径忽略"""
+        key = str(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.refs -= 1
+        if entry.refs <= 0:
+            del self._entries[key]
+            _remove_path(key)
+
+    def hold(self, *messages) -> None:
+        """为消息（结果、消息链或组件列表）引用的全部临时文件增加引用"""
+        for path in self._message_paths(messages):
+            self.acquire(path)
+
+    def release_message(self, *messages) -> None:
+        """释放消息引用的全部临时文件"""
+        for path in self._message_paths(messages):
+            self.release(path)
+
+    def _message_paths(self, obj) -> Iterator[str]:
+        """遍历消息结构，找出其中引用的已登记临时文件"""
+        if obj is None or isinstance(obj, (str, bytes)):
+            return
+        if isinstance(obj, (list, tuple)):
+            for item in obj:
+                yield from self._message_paths(item)
+            return
+        for attr in ("chain", "nodes", "content"):
+            children = getattr(obj, attr, None)
+            if isinstance(children, (list, tuple)):
+                yield from self._message_paths(children)
+                return
+        seen = set()
+        for candidate in (getattr(obj, "path", None), getattr(obj, "file", None)):
+            if not isinstance(candidate, str):
+                continue
+            if candidate.startswith(FILE_URI_PREFIX):
+                candidate = candidate[len(FILE_URI_PREFIX) :]
+            if candidate in self._entries and candidate not in seen:
+                seen.add(candidate)
+                yield candidate
+
+    def _sweep_expired(self) -> None:
+        """删除超过保留时间仍未释放的临时文件（只遍历登记表，不扫描目录）"""
+        now = time.monotonic()
+        if now - self._last_sweep < TEMP_SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        expired = [
+            key for key, entry in self._entries.items() if entry.expires_at <= now
+        ]
+        for key in expired:
+            del self._entries[key]
+            _remove_path(key)
+        if expired:
+            logger.info(f"[PixivPlugin] 已清理 {len(expired)} 个超时未释放的临时文件")